@@ -0,0 +1,29 @@
+"""add rolling conversation summaries
+
+Revision ID: context_summary
+Revises: initial
+Create Date: 2024-03-04 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'context_summary'
+down_revision = 'initial'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('chat_contexts', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_contexts', sa.Column('summary_until', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_chat_messages_context_id_created_at',
+        'chat_messages',
+        ['context_id', 'created_at'],
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_context_id_created_at', table_name='chat_messages')
+    op.drop_column('chat_contexts', 'summary_until')
+    op.drop_column('chat_contexts', 'summary')
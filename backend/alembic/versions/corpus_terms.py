@@ -0,0 +1,26 @@
+"""corpus term statistics
+
+Revision ID: corpus_terms
+Revises: document_batches
+Create Date: 2024-04-02 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'corpus_terms'
+down_revision = 'document_batches'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'corpus_terms',
+        sa.Column('term', sa.String(), nullable=False),
+        sa.Column('document_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('term')
+    )
+
+def downgrade() -> None:
+    op.drop_table('corpus_terms')
@@ -0,0 +1,39 @@
+"""bulk upload batches
+
+Revision ID: document_batches
+Revises: document_fingerprints
+Create Date: 2024-03-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_batches'
+down_revision = 'document_fingerprints'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'document_batches',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('folder_id', sa.String(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('rejected', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['folder_id'], ['folders.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('documents', sa.Column('batch_id', sa.String(), nullable=True))
+    op.create_foreign_key(
+        'fk_documents_batch_id', 'documents', 'document_batches',
+        ['batch_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_documents_batch_id', 'documents', ['batch_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_batch_id', table_name='documents')
+    op.drop_constraint('fk_documents_batch_id', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'batch_id')
+    op.drop_table('document_batches')
@@ -0,0 +1,21 @@
+"""track vector chunks per document
+
+Revision ID: document_chunks
+Revises: context_summary
+Create Date: 2024-03-11 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_chunks'
+down_revision = 'context_summary'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('chunk_count', sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('documents', 'chunk_count')
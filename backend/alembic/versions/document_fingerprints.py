@@ -0,0 +1,23 @@
+"""fingerprint document contents
+
+Revision ID: document_fingerprints
+Revises: retrieval_scope_indexes
+Create Date: 2024-03-25 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_fingerprints'
+down_revision = 'retrieval_scope_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
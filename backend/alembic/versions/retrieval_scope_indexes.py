@@ -0,0 +1,25 @@
+"""index documents for scoped retrieval
+
+Revision ID: retrieval_scope_indexes
+Revises: document_chunks
+Create Date: 2024-03-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'retrieval_scope_indexes'
+down_revision = 'document_chunks'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_documents_folder_id', 'documents', ['folder_id'])
+    op.create_index('ix_documents_tags', 'documents', ['tags'], postgresql_using='gin')
+    op.create_index('ix_folders_parent_id', 'folders', ['parent_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_folders_parent_id', table_name='folders')
+    op.drop_index('ix_documents_tags', table_name='documents')
+    op.drop_index('ix_documents_folder_id', table_name='documents')
@@ -1,10 +1,15 @@
-from typing import List
+from typing import AsyncIterator, List
+from contextlib import aclosing
+import json
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_db, get_current_user
 from app.schemas.chat import Message, ChatResponse, ChatContext
 from app.services.chat import ChatService
+from app.services.scheduler import LLMOverloadedError
 
 router = APIRouter()
 
@@ -19,8 +24,24 @@ async def chat_websocket(
         while True:
             data = await websocket.receive_json()
             message = Message(**data)
-            response = await chat_service.process_message(message)
-            await websocket.send_json(response.dict())
+            try:
+                if message.stream:
+                    # aclosing() makes a failed send (client gone) close the
+                    # generator right away, which cancels the upstream request.
+                    async with aclosing(chat_service.stream_message(message)) as events:
+                        async for event in events:
+                            await websocket.send_json(jsonable_encoder(event))
+                    continue
+                response = await chat_service.process_message(message)
+                await websocket.send_json(jsonable_encoder(response))
+            except LLMOverloadedError as e:
+                # Reject this message but keep the connection open
+                await websocket.send_json({
+                    "type": "error",
+                    "error": str(e),
+                    "status": 503,
+                    "retry_after": e.retry_after,
+                })
     except WebSocketDisconnect:
         pass
     except Exception as e:
@@ -35,6 +56,31 @@ async def send_message(
     chat_service = ChatService(db)
     return await chat_service.process_message(message)
 
+@router.post("/messages/stream")
+async def stream_message(
+    message: Message,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+) -> StreamingResponse:
+    chat_service = ChatService(db)
+
+    async def event_stream() -> AsyncIterator[str]:
+        # Starlette cancels this generator when the client disconnects
+        try:
+            async with aclosing(chat_service.stream_message(message)) as events:
+                async for event in events:
+                    yield f"event: {event.type}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+        except LLMOverloadedError as e:
+            # Headers are already sent, so report the rejection in-band
+            error = {"error": str(e), "status": 503, "retry_after": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/contexts", response_model=List[ChatContext])
 async def list_contexts(
     skip: int = 0,
@@ -1,11 +1,23 @@
 from typing import List
-from fastapi import APIRouter, Depends, File, UploadFile, BackgroundTasks, Form
+from fastapi import APIRouter, Depends, File, UploadFile, BackgroundTasks, Form, HTTPException
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_db, get_current_user
-from app.schemas.document import DocumentCreate, DocumentResponse, FolderCreate, FolderResponse
-from app.services.document_processor import DocumentProcessor
-from app.models.document import Document
+from app.schemas.document import (
+    DocumentCreate,
+    DocumentResponse,
+    FolderCreate,
+    FolderResponse,
+    DocumentBulkDelete,
+    DeletionResponse,
+    BulkUploadResponse,
+    BatchProgress,
+)
+from app.services.bulk_upload import BulkUploadError, BulkUploadService
+from app.services.document_cleanup import DocumentCleanupService, delete_in_background
+from app.services.document_processor import DocumentProcessor, UploadTooLargeError
+from app.services.ingestion import schedule_batch_ingestion, schedule_ingestion
+from app.models.document import Document, Folder
 
 router = APIRouter()
 
@@ -13,22 +25,90 @@ router = APIRouter()
 async def upload_document(
     file: UploadFile = File(...),
     folder_id: str = Form(None),
+    # Opt-in: re-index the folder's document of the same name in place
+    # instead of creating a second one
+    replace: bool = Form(False),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user),
 ):
     processor = DocumentProcessor(db)
-    document = await processor.create_document(file, folder_id)
+    # The file is saved while the request is open; ingestion only gets ids,
+    # never the UploadFile, which is closed with the request
+    try:
+        upload = await processor.save_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    processor.store_upload(upload)
+    document = await processor.create_document(file, folder_id, replace, upload)
     
-    # Process document in background
-    background_tasks.add_task(
-        processor.process_document,
-        document.id,
-        file
-    )
+    # Process document on the ingestion workers
+    await schedule_ingestion(background_tasks, document.id, upload.content_hash)
     
     return document
 
+@router.post("/bulk-upload", response_model=BulkUploadResponse, status_code=202)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    folder_id: str = Form(None),
+    replace: bool = Form(False),
+    extract_archives: bool = Form(True),
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    # Any mix of files and zip/tar archives; all documents are created in
+    # one transaction and processed by the shared ingestion pipeline
+    bulk = BulkUploadService(db)
+    try:
+        for file in files:
+            await bulk.add_file(file, extract_archives)
+        batch, jobs = bulk.create_documents(folder_id, replace)
+    except BulkUploadError as e:
+        bulk.discard()
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        bulk.discard()
+        raise
+
+    await schedule_batch_ingestion(background_tasks, jobs)
+    return BulkUploadResponse(batch_id=batch.id, documents=len(jobs), rejected=bulk.rejected)
+
+@router.get("/batches/{batch_id}", response_model=BatchProgress)
+async def get_batch_progress(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    progress = BulkUploadService(db).progress(batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+@router.post("/{document_id}/reindex", response_model=DocumentResponse)
+async def reindex_document(
+    document_id: str,
+    force: bool = False,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    # Conditional, so a deletion flagged in between is not undone
+    updated = db.query(Document)\
+        .filter(Document.id == document_id, Document.status != "deleting")\
+        .update({Document.status: "processing"}, synchronize_session=False)
+    db.commit()
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not updated:
+        raise HTTPException(status_code=409, detail="Document is being deleted")
+
+    # Only chunks that changed since the last run are re-embedded; force
+    # re-indexes even if the file itself is unchanged
+    await schedule_ingestion(background_tasks, document_id, None, force)
+    return document
+
 @router.post("/folders", response_model=FolderResponse)
 async def create_folder(
     folder: FolderCreate,
@@ -46,7 +126,7 @@ async def list_documents(
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user),
 ):
-    query = db.query(Document)
+    query = db.query(Document).filter(Document.status != "deleting")
     if folder_id:
         query = query.filter(Document.folder_id == folder_id)
     documents = query.offset(skip).limit(limit).all()
@@ -61,14 +141,41 @@ async def get_document(
     document = db.query(Document).filter(Document.id == document_id).first()
     return document
 
-@router.delete("/{document_id}")
+@router.post("/bulk-delete", response_model=DeletionResponse, status_code=202)
+async def bulk_delete_documents(
+    request: DocumentBulkDelete,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    document_ids = DocumentCleanupService(db).mark_for_deletion(request.document_ids)
+    # Rows, vectors and files are removed in batches after the response
+    background_tasks.add_task(delete_in_background, document_ids)
+    return DeletionResponse(status="accepted", documents=len(document_ids))
+
+@router.delete("/folders/{folder_id}", response_model=DeletionResponse, status_code=202)
+async def delete_folder(
+    folder_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    if not db.query(Folder).filter(Folder.id == folder_id).first():
+        raise HTTPException(status_code=404, detail="Folder not found")
+    cleanup = DocumentCleanupService(db)
+    folders = cleanup.folder_tree([folder_id])
+    document_ids = cleanup.mark_for_deletion([], [id for id, _ in folders])
+    background_tasks.add_task(delete_in_background, document_ids, folders)
+    return DeletionResponse(status="accepted", documents=len(document_ids), folders=len(folders))
+
+@router.delete("/{document_id}", response_model=DeletionResponse, status_code=202)
 async def delete_document(
     document_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user),
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if document:
-        db.delete(document)
-        db.commit()
-    return {"status": "success"}
\ No newline at end of file
+    document_ids = DocumentCleanupService(db).mark_for_deletion([document_id])
+    if document_ids:
+        background_tasks.add_task(delete_in_background, document_ids)
+    return DeletionResponse(status="accepted", documents=len(document_ids))
@@ -7,8 +7,14 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
 )
 
+# Ingestion stages are routed per stage, so each gets its own workers and
+# concurrency: extraction and chunking are CPU-bound, embedding and indexing
+# wait on Ollama and the vector store
 celery_app.conf.task_routes = {
-    "app.worker.process_document": "main-queue",
+    "app.worker.extract_document": "main-queue",
+    "app.worker.chunk_document": "main-queue",
+    "app.worker.embed_document": "embed-queue",
+    "app.worker.index_document": "index-queue",
     "app.worker.train_model": "training-queue",
 }
 
@@ -21,4 +27,5 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=3600,  # 1 hour
     worker_max_memory_per_child=200000,  # 200MB
+    worker_prefetch_multiplier=1,  # long tasks: don't hoard messages other workers could take
 )
\ No newline at end of file
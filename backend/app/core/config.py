@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -25,18 +25,128 @@ class Settings(BaseSettings):
     # LLM
     OLLAMA_HOST: str = "http://ollama:11434"
     DEFAULT_MODEL: str = "llama2"
+    EMBEDDING_MODEL: Optional[str] = None  # defaults to DEFAULT_MODEL
+    OLLAMA_KEEP_ALIVE: str = "30m"  # how long Ollama keeps models loaded
+    OLLAMA_LOAD_TIMEOUT: float = 300.0
+    MODEL_WARMUP_ENABLED: bool = True
+    MODEL_WARMUP_INTERVAL: int = 10 * 60  # seconds, below OLLAMA_KEEP_ALIVE
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_READ_TIMEOUT: float = 120.0
+    OLLAMA_MAX_CONCURRENT_REQUESTS: int = 8  # per model, unless overridden below
+
+    # LLM scheduling
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {}
+    LLM_INTERACTIVE_RESERVED: int = 2  # slots per model only chat may use
+    LLM_QUEUE_SIZE_INTERACTIVE: int = 64
+    LLM_QUEUE_SIZE_BACKGROUND: int = 128
+    LLM_QUEUE_SIZE_BULK: int = 1024
+    LLM_QUEUE_TIMEOUT_INTERACTIVE: float = 10.0  # seconds
+    LLM_QUEUE_TIMEOUT_BACKGROUND: float = 60.0
+    LLM_QUEUE_TIMEOUT_BULK: float = 600.0
+    LLM_RETRY_AFTER: int = 5
+
+    # Embedding cache
+    EMBEDDING_CACHE_SIZE: int = 10000  # in-process LRU entries
+    EMBEDDING_CACHE_REDIS: bool = True
+    EMBEDDING_CACHE_TTL: int = 7 * 24 * 60 * 60  # 7 days
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0
+
+    # Semantic response cache
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # cosine similarity
+    SEMANTIC_CACHE_TTL: int = 60 * 60  # 1 hour
+    SEMANTIC_CACHE_SIZE: int = 1000
+
+    # Prompt assembly (token counts are estimates)
+    CONTEXT_TOKEN_BUDGET: int = 3072
+    CONTEXT_DOCUMENT_TOKENS: int = 1536
+    HISTORY_MAX_MESSAGES: int = 50
+    HISTORY_SUMMARY_TOKENS: int = 256
+
+    # Ollama context token reuse across turns
+    KV_CONTEXT_ENABLED: bool = True
+    KV_CONTEXT_TTL: int = 30 * 60  # 30 minutes
+    KV_CONTEXT_MAX_TOKENS: int = 4096
     
     # Vector Store
+    VECTOR_BACKEND: str = "chroma"  # "chroma" or "local" (single process, needs INGESTION_CELERY=false)
     CHROMADB_HOST: str = "chromadb"
     CHROMADB_PORT: int = 8000
+    VECTOR_STORE_THREADS: int = 8  # blocking vector/lexical calls in flight
+    VECTOR_STORE_BATCH_SIZE: int = 1000  # ids per Chroma request
+    VECTOR_INDEX_DIR: str = "/app/data/vector_index"
+    VECTOR_INDEX_NPROBE: int = 16  # IVF lists scanned per query
+    VECTOR_INDEX_MIN_TRAIN_SIZE: int = 4096  # exact search below this size
+    VECTOR_INDEX_TRAIN_SAMPLE: int = 50000
+    # Local index only: "none", "int8" (4x smaller) or "pq" (product
+    # quantization, one byte per subvector). Shortlisted hits are re-scored
+    # against the full-precision vectors.
+    VECTOR_QUANTIZATION: str = "none"
+    # Bytes per vector; rounded down to a divisor of the embedding size, so
+    # 192 is 16x smaller at 768 dims but 128 bytes (8x) at 256 dims
+    VECTOR_PQ_SUBVECTORS: int = 192
+    VECTOR_RESCORE_FACTOR: int = 10  # candidates re-scored per requested hit
+    HYBRID_SEARCH_ENABLED: bool = True  # fuse BM25 hits with vector hits
+    LEXICAL_INDEX_PATH: str = "/app/data/lexical.sqlite"
+    RRF_K: int = 60  # reciprocal rank fusion constant
+    RERANK_ENABLED: bool = True  # diversify hits with maximal marginal relevance
+    RERANK_CANDIDATES: int = 40  # chunks over-fetched per search
+    MMR_LAMBDA: float = 0.5  # 1.0 = pure relevance, 0.0 = pure diversity
+    RERANK_MIN_SCORE: Optional[float] = None  # minimum cosine similarity of vector hits
+    # Scoped retrieval: scopes up to this many documents are filtered inside
+    # the index, larger ones are filtered after an over-fetched search
+    SCOPE_PREFILTER_MAX_DOCUMENTS: int = 256
+    SCOPE_POSTFILTER_OVERFETCH: int = 4
     
     # File Storage
     UPLOAD_DIR: str = "/app/uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read from the request at a time
+    UPLOAD_FORM_OVERHEAD: int = 64 * 1024  # multipart framing allowed on top of the file
+    # Bulk uploads: many files and/or zip/tar archives in one request; each
+    # file or archive entry is still limited to MAX_UPLOAD_SIZE
+    BULK_UPLOAD_MAX_SIZE: int = 1024 * 1024 * 1024  # whole request
+    BULK_UPLOAD_MAX_EXTRACTED_SIZE: int = 4 * 1024 * 1024 * 1024  # all entries, uncompressed
+    BULK_UPLOAD_MAX_FILES: int = 10_000
+    BULK_INGEST_CONCURRENCY: int = 4  # documents ingested at once without Celery
+    
+    # Ingestion
+    CHUNK_SIZE: int = 1500  # characters
+    CHUNK_OVERLAP: int = 200
+    CHUNK_INSERT_BATCH: int = 64  # chunks embedded and inserted together
+    CHUNK_SEARCH_OVERFETCH: int = 4  # chunk hits fetched per document returned
+    DOCUMENT_CONTENT_MAX_CHARS: int = 1_000_000  # text kept on the Document row
+    TEXT_READ_BLOCK_SIZE: int = 64 * 1024
+    # Text extraction runs in a pool of worker processes with per-file limits
+    EXTRACTION_WORKERS: int = 2
+    EXTRACTION_CPU_LIMIT: int = 120  # CPU seconds per file
+    EXTRACTION_TIMEOUT: int = 300  # wall-clock seconds per file
+    EXTRACTION_MEMORY_LIMIT: int = 1024 * 1024 * 1024  # address space per worker, 0 = unlimited
+    EXTRACTION_MAX_CHARS: int = 20_000_000  # extracted text kept per file
+    # Extractive summaries and keyword tags, weighted by corpus-wide
+    # document frequencies
+    SUMMARY_SENTENCES: int = 3
+    SUMMARY_MAX_CHARS: int = 600
+    SUMMARY_MAX_SENTENCES: int = 300  # sentences ranked per document
+    DOCUMENT_TAGS: int = 8
+    TEXT_ANALYSIS_MAX_CHARS: int = 200_000  # leading text analyzed per document
+    DOCUMENT_DELETE_BATCH: int = 100  # documents removed per transaction
+    # Periodic purge of vectors and files without a document row; 0 disables
+    DOCUMENT_COMPACTION_INTERVAL: int = 6 * 60 * 60
+    DOCUMENT_COMPACTION_GRACE: int = 60 * 60  # never purge files younger than this
     
     # Celery
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    # Ingestion runs as a chain of Celery tasks; False runs every stage in
+    # the API process instead, for deployments without workers
+    INGESTION_CELERY: bool = True
+    INGESTION_MAX_RETRIES: int = 5
+    INGESTION_RETRY_BACKOFF_MAX: int = 600  # seconds
     
     model_config = SettingsConfigDict(case_sensitive=True)
 
@@ -0,0 +1,30 @@
+from typing import Optional
+import httpx
+
+from app.core.config import settings
+
+# One pooled client per worker process, created lazily and closed by the
+# application lifespan.
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.OLLAMA_READ_TIMEOUT,
+                connect=settings.OLLAMA_CONNECT_TIMEOUT,
+            ),
+        )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,24 @@
+from typing import Optional
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+# Shared asyncio Redis connection pool for caches, closed by the
+# application lifespan.
+_client: Optional[Redis] = None
+
+def get_redis_client() -> Redis:
+    global _client
+    if _client is None:
+        _client = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+        )
+    return _client
+
+async def close_redis_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,36 @@
+from typing import Callable, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Bounded pool for blocking storage clients (Chroma, SQLite indexes), kept
+# apart from the default executor so slow vector queries cannot starve
+# other threaded work. Created lazily and shut down by the application
+# lifespan.
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.VECTOR_STORE_THREADS,
+            thread_name_prefix="vector-store",
+        )
+    return _executor
+
+async def run_in_thread_pool(func: Callable[..., T], *args, **kwargs) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_thread_pool(),
+        functools.partial(func, *args, **kwargs),
+    )
+
+def close_thread_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = None
@@ -0,0 +1,68 @@
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+def upload_limit(path: str) -> int:
+    if path.endswith("/bulk-upload"):
+        return settings.BULK_UPLOAD_MAX_SIZE
+    return settings.MAX_UPLOAD_SIZE
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds the maximum size of {limit} bytes"
+
+# Enforces the upload size limit on multipart requests while the body is
+# being received, before the form parser spools any of it to disk. A
+# request whose Content-Length is over the limit is rejected without
+# reading the body; one without a Content-Length (chunked) is cut off with
+# 413 as soon as the bytes received cross the limit. Pure ASGI, since the
+# limit has to sit between the server and whatever reads the body.
+class UploadSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = upload_limit(scope["path"])
+        allowed = limit + settings.UPLOAD_FORM_OVERHEAD
+        length = headers.get("content-length")
+        if length and length.isdigit() and int(length) > allowed:
+            await JSONResponse(status_code=413, content={"detail": _too_large(limit)})(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > allowed:
+                    # Raised into the form parser; the exception handlers
+                    # turn it into the response
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        async def tracked_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            # Body read outside the exception handlers
+            if e.status_code != 413 or response_started:
+                raise
+            await JSONResponse(status_code=413, content={"detail": e.detail})(scope, receive, send)
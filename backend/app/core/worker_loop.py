@@ -0,0 +1,43 @@
+from typing import Awaitable, Optional, TypeVar
+import asyncio
+import threading
+
+from app.core.http_client import close_http_client
+from app.core.redis_client import close_redis_client
+from app.core.thread_pool import close_thread_pool
+
+T = TypeVar("T")
+
+# Celery tasks are synchronous, so the async services run on one event loop
+# per worker process, in a background thread. The loop-bound clients (HTTP
+# pool, Redis, embedding batchers) are created once and shared by every
+# task; on a thread pool worker, the embedding requests of concurrently
+# running tasks are coalesced into the same upstream batches. Started lazily,
+# so a forked pool process creates its own.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="worker-loop", daemon=True).start()
+    return _loop
+
+def run_async(coroutine: Awaitable[T]) -> T:
+    return asyncio.run_coroutine_threadsafe(coroutine, get_worker_loop()).result()
+
+def close_worker_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(_close_clients(), _loop).result()
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+    close_thread_pool()
+
+async def _close_clients():
+    await close_http_client()
+    await close_redis_client()
@@ -1,4 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import logging
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -7,16 +10,58 @@ import uvicorn
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.deps import get_db, get_redis
+from app.core.http_client import close_http_client
+from app.core.redis_client import close_redis_client
+from app.core.thread_pool import close_thread_pool
+from app.core.upload_limit import UploadSizeLimitMiddleware
 from app.db.base import Base
 from app.db.session import engine
+from app.services.document_cleanup import run_compaction
+from app.services.model_warmup import get_model_warmup
+from app.services.response_cache import listen_for_invalidations
+from app.services.scheduler import LLMOverloadedError
+from app.services.text_extraction import close_extraction_engine
+from app.services.vector_backends import get_vector_backend
+from app.services.vector_store import VectorStoreService
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    vector_store = VectorStoreService()
+    try:
+        # Connect once up front; backends retry lazily if this fails
+        await vector_store.initialize()
+    except Exception as e:
+        logger.error(f"Vector store unavailable at startup: {str(e)}")
+
+    tasks = []
+    if settings.MODEL_WARMUP_ENABLED:
+        # Runs in the background so startup is not blocked on model loads
+        tasks.append(asyncio.create_task(get_model_warmup().run()))
+    if settings.SEMANTIC_CACHE_ENABLED:
+        tasks.append(asyncio.create_task(listen_for_invalidations()))
+    if settings.DOCUMENT_COMPACTION_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_compaction()))
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await vector_store.cleanup()
+    close_thread_pool()
+    close_extraction_engine()
+    await close_http_client()
+    await close_redis_client()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Middleware
@@ -33,6 +78,16 @@ app.add_middleware(
     allowed_hosts=["*"],
 )
 
+app.add_middleware(UploadSizeLimitMiddleware)
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -44,8 +99,11 @@ async def health_check():
         # Check Redis connection
         redis = get_redis()
         redis.ping()
+
+        # Check the vector store; retrieval and ingestion fail without it
+        await get_vector_backend().heartbeat()
         
-        return {"status": "healthy"}
+        return {"status": "healthy", "llm": get_model_warmup().status()}
     except Exception as e:
         raise HTTPException(status_code=503, detail=str(e))
 
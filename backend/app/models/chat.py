@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -14,11 +14,18 @@ class ChatMessage(Base):
 
     context = relationship("Context", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_chat_messages_context_id_created_at", "context_id", "created_at"),
+    )
+
 class Context(Base):
     __tablename__ = "chat_contexts"
 
     id = Column(String, primary_key=True)
     title = Column(String, nullable=True)
+    # Rolling summary of all messages up to and including summary_until
+    summary = Column(Text, nullable=True)
+    summary_until = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
     messages = relationship("ChatMessage", back_populates="context")
\ No newline at end of file
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, ARRAY
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, ARRAY, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from app.db.base import Base
 
 class Document(Base):
@@ -13,6 +13,9 @@ class Document(Base):
     status = Column(String, nullable=False)
     folder_id = Column(String, ForeignKey("folders.id"), nullable=True)
     embedding_id = Column(String, nullable=True)
+    chunk_count = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of the file
+    batch_id = Column(String, ForeignKey("document_batches.id", ondelete="SET NULL"), nullable=True)
     content = Column(Text, nullable=True)
     summary = Column(Text, nullable=True)
     tags = Column(ARRAY(String), nullable=True)
@@ -22,6 +25,32 @@ class Document(Base):
 
     folder = relationship("Folder", back_populates="documents")
 
+    __table_args__ = (
+        Index("ix_documents_folder_id", "folder_id"),
+        Index("ix_documents_tags", "tags", postgresql_using="gin"),
+        Index("ix_documents_content_hash", "content_hash"),
+        Index("ix_documents_batch_id", "batch_id"),
+    )
+
+# One bulk upload; progress is aggregated from the statuses of its documents
+class DocumentBatch(Base):
+    __tablename__ = "document_batches"
+
+    id = Column(String, primary_key=True)
+    folder_id = Column(String, ForeignKey("folders.id", ondelete="SET NULL"), nullable=True)
+    total = Column(Integer, nullable=False)  # documents created or replaced
+    rejected = Column(Integer, nullable=False, default=0)  # entries that were not stored
+    created_at = Column(DateTime, server_default=func.now())
+
+# Corpus-wide document frequencies for TF-IDF weighting of summaries and
+# tags. The row with the empty term (never a real term) holds the number of
+# documents counted.
+class CorpusTerm(Base):
+    __tablename__ = "corpus_terms"
+
+    term = Column(String, primary_key=True)
+    document_count = Column(Integer, nullable=False, default=0)
+
 class Folder(Base):
     __tablename__ = "folders"
 
@@ -32,5 +61,9 @@ class Folder(Base):
 
     documents = relationship("Document", back_populates="folder")
     children = relationship("Folder", 
-                          backref=relationship("Folder", remote_side=[id]),
-                          cascade="all, delete-orphan")
\ No newline at end of file
+                          backref=backref("parent", remote_side=[id]),
+                          cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_folders_parent_id", "parent_id"),
+    )
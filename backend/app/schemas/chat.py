@@ -7,6 +7,12 @@ class Message(BaseModel):
     role: str = "user"
     context_id: Optional[str] = None
     created_at: Optional[datetime] = None
+    stream: bool = False
+    # Restrict retrieval to these folders (including subfolders), documents
+    # and/or tags
+    folder_ids: Optional[List[str]] = None
+    document_ids: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
 
 class ChatResponse(BaseModel):
     content: str
@@ -17,4 +23,9 @@ class ChatResponse(BaseModel):
 class ChatContext(BaseModel):
     id: str
     title: Optional[str] = None
-    created_at: datetime = datetime.now()
\ No newline at end of file
+    created_at: datetime = datetime.now()
+
+class ChatStreamEvent(BaseModel):
+    type: str  # "token" or "done"
+    content: str
+    context_documents: Optional[List[str]] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 class DocumentBase(BaseModel):
@@ -20,10 +20,40 @@ class DocumentResponse(DocumentBase):
     error: Optional[str] = None
     summary: Optional[str] = None
     tags: Optional[List[str]] = None
+    batch_id: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class RejectedFile(BaseModel):
+    name: str
+    reason: str
+
+class BulkUploadResponse(BaseModel):
+    batch_id: str
+    documents: int
+    rejected: List[RejectedFile] = []
+
+class BatchProgress(BaseModel):
+    id: str
+    folder_id: Optional[str] = None
+    total: int
+    rejected: int
+    statuses: Dict[str, int]  # document count per status
+    ready: int
+    failed: int
+    pending: int
+    complete: bool
+    created_at: datetime
+
+class DocumentBulkDelete(BaseModel):
+    document_ids: List[str]
+
+class DeletionResponse(BaseModel):
+    status: str
+    documents: int
+    folders: int = 0
+
 class FolderBase(BaseModel):
     name: str
     parent_id: Optional[str] = None
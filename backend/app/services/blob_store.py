@@ -0,0 +1,65 @@
+from typing import Iterator, Optional, Tuple
+import os
+
+from app.core.config import settings
+from app.models.document import Document
+
+BLOB_DIR = "blobs"
+
+# Content-addressed file storage: every distinct file is stored once, at
+# {UPLOAD_DIR}/blobs/<first two hex digits>/<sha256>, and documents refer to
+# it through Document.content_hash. A blob's reference count is the number
+# of documents with its hash; unreferenced blobs are removed by the
+# document cleanup once they are older than the compaction grace period.
+class BlobStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(settings.UPLOAD_DIR, BLOB_DIR)
+
+    def path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def exists(self, content_hash: Optional[str]) -> bool:
+        return bool(content_hash) and os.path.exists(self.path(content_hash))
+
+    def put(self, file_path: str, content_hash: str) -> str:
+        # Moves a fully written file into the store, or drops it if the same
+        # bytes are already there. Must happen before the referencing row
+        # is committed: the refreshed mtime keeps the blob clear of cleanup
+        # until then.
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            os.utime(path)
+            os.remove(file_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(file_path, path)
+        return path
+
+    def document_path(self, document: Document) -> str:
+        if self.exists(document.content_hash):
+            return self.path(document.content_hash)
+        # Uploads stored before content addressing
+        return os.path.join(settings.UPLOAD_DIR, document.id)
+
+    def blobs(self) -> Iterator[Tuple[str, float]]:
+        # (content hash, mtime) of every stored blob
+        if not os.path.isdir(self.root):
+            return
+        with os.scandir(self.root) as prefixes:
+            for prefix in prefixes:
+                if not prefix.is_dir():
+                    continue
+                with os.scandir(prefix.path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            yield entry.name, entry.stat().st_mtime
+
+    def remove(self, content_hash: str, older_than: float) -> bool:
+        path = self.path(content_hash)
+        try:
+            if os.stat(path).st_mtime >= older_than:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,328 @@
+from typing import BinaryIO, List, Optional, Tuple
+from dataclasses import dataclass
+import bz2
+import gzip
+import hashlib
+import lzma
+import mimetypes
+import os
+import tarfile
+import uuid
+import zipfile
+import zlib
+
+from fastapi import UploadFile
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.thread_pool import run_in_thread_pool
+from app.models.document import Document, DocumentBatch
+from app.schemas.document import BatchProgress, RejectedFile
+from app.services.document_processor import DocumentProcessor, StoredUpload, UploadTooLargeError
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_TYPES = {
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/x-tar",
+    "application/x-gtar",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+}
+# (magic bytes, file suffix, decompressor) of single-file compression formats
+COMPRESSED_FORMATS = (
+    (b"\x1f\x8b", ".gz", lambda file: gzip.GzipFile(fileobj=file, mode="rb")),
+    (b"BZh", ".bz2", bz2.BZ2File),
+    (b"\xfd7zXZ\x00", ".xz", lzma.LZMAFile),
+)
+NAME_LOOKUP_BATCH = 1000  # names per IN (...) when matching existing documents
+
+# Statuses that end a document's ingestion
+FINISHED_STATUSES = ("ready", "error", "deleting")
+
+class BulkUploadError(Exception):
+    pass
+
+@dataclass
+class BulkEntry:
+    name: str
+    content_type: str
+    upload: StoredUpload
+
+def is_archive(name: Optional[str], content_type: Optional[str]) -> bool:
+    return (name or "").lower().endswith(ARCHIVE_SUFFIXES) or content_type in ARCHIVE_TYPES
+
+# Stores the files of one bulk upload, unpacking zip/tar archives entry by
+# entry, then creates all of their Document rows in one transaction. Archive
+# entries are named by their path inside the archive; names are only used
+# as document names, never as paths on disk. Files that cannot be stored
+# are reported as rejected instead of failing the whole upload; only the
+# batch-wide limits abort it.
+class BulkUploadService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.processor = DocumentProcessor(db)
+        self.entries: List[BulkEntry] = []
+        self.rejected: List[RejectedFile] = []
+        self._extracted = 0
+
+    async def add_file(self, file: UploadFile, extract_archives: bool = True):
+        if extract_archives and is_archive(file.filename, file.content_type):
+            # The form parser has already spooled the archive to a temporary
+            # file; its entries are streamed out of it
+            await run_in_thread_pool(self._add_archive, file.file, file.filename, file.content_type)
+            return
+        try:
+            upload = await self.processor.save_upload(file)
+        except UploadTooLargeError as e:
+            self._reject(file.filename, str(e))
+            return
+        self._add(file.filename, file.content_type, upload)
+
+    def create_documents(
+        self,
+        folder_id: Optional[str] = None,
+        replace: bool = False,
+    ) -> Tuple[DocumentBatch, List[Tuple[str, str]]]:
+        # Returns the batch and the (document id, content hash) of every
+        # document to ingest
+        entries = self.entries
+        existing = {}
+        if replace:
+            # Later entries with the same name win, as if they had been
+            # uploaded one after another
+            by_name = {entry.name: entry for entry in entries}
+            for entry in entries:
+                if by_name[entry.name] is not entry:
+                    os.remove(entry.upload.path)
+                    self._reject(entry.name, "Replaced by a later file of the same name in this upload")
+            entries = list(by_name.values())
+            names = list(by_name)
+            for start in range(0, len(names), NAME_LOOKUP_BATCH):
+                existing.update({
+                    name: (id, content_hash, processed_at)
+                    for id, name, content_hash, processed_at in self.db.query(
+                        Document.id,
+                        Document.name,
+                        Document.content_hash,
+                        Document.processed_at,
+                    ).filter(
+                        Document.folder_id == folder_id,
+                        Document.name.in_(names[start:start + NAME_LOOKUP_BATCH]),
+                        Document.status != "deleting",
+                    )
+                })
+
+        batch = DocumentBatch(
+            id=str(uuid.uuid4()),
+            folder_id=folder_id,
+            total=len(entries),
+            rejected=len(self.rejected),
+        )
+        inserts = []
+        updates = []
+        jobs = []
+        for entry in entries:
+            values = {
+                "type": entry.content_type,
+                "size": entry.upload.size,
+                "content_hash": entry.upload.content_hash,
+                "status": "processing",
+                "error": None,
+                "batch_id": batch.id,
+            }
+            if entry.name in existing:
+                id, content_hash, processed_at = existing[entry.name]
+                # Unchanged contents keep their index
+                if content_hash != entry.upload.content_hash:
+                    processed_at = None
+                updates.append({"id": id, "processed_at": processed_at, **values})
+            else:
+                id = str(uuid.uuid4())
+                inserts.append({"id": id, "name": entry.name, "folder_id": folder_id, **values})
+            jobs.append((id, entry))
+
+        # Blobs first: a committed row never points at a missing file
+        for entry in entries:
+            self.processor.store_upload(entry.upload)
+        self.db.add(batch)
+        self.db.flush()
+        if inserts:
+            self.db.execute(insert(Document), inserts)
+        if updates:
+            self.db.execute(update(Document), updates)
+        self.db.commit()
+        self.entries = []
+        return batch, [(id, entry.upload.content_hash) for id, entry in jobs]
+
+    def discard(self):
+        # Removes the files of an upload that was aborted; blobs already
+        # stored are left to the cleanup, as other documents may share them
+        for entry in self.entries:
+            try:
+                os.remove(entry.upload.path)
+            except FileNotFoundError:
+                pass
+        self.entries = []
+
+    def progress(self, batch_id: str) -> Optional[BatchProgress]:
+        batch = self.db.query(DocumentBatch).filter(DocumentBatch.id == batch_id).first()
+        if batch is None:
+            return None
+        statuses = dict(
+            self.db.query(Document.status, func.count(Document.id))
+            .filter(Document.batch_id == batch_id)
+            .group_by(Document.status)
+        )
+        pending = sum(
+            count for status, count in statuses.items()
+            if status not in FINISHED_STATUSES
+        )
+        return BatchProgress(
+            id=batch.id,
+            folder_id=batch.folder_id,
+            total=batch.total,
+            rejected=batch.rejected,
+            statuses=statuses,
+            ready=statuses.get("ready", 0),
+            failed=statuses.get("error", 0),
+            pending=pending,
+            complete=pending == 0,
+            created_at=batch.created_at,
+        )
+
+    def _add(self, name: str, content_type: Optional[str], upload: StoredUpload):
+        if len(self.entries) >= settings.BULK_UPLOAD_MAX_FILES:
+            os.remove(upload.path)
+            raise BulkUploadError(
+                f"Bulk upload exceeds the maximum of {settings.BULK_UPLOAD_MAX_FILES} files"
+            )
+        content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.entries.append(BulkEntry(name=name, content_type=content_type, upload=upload))
+
+    def _reject(self, name: Optional[str], reason: str):
+        self.rejected.append(RejectedFile(name=name or "", reason=reason))
+
+    def _add_archive(self, file: BinaryIO, archive_name: str, content_type: Optional[str]):
+        members = 0
+        try:
+            file.seek(0)
+            if zipfile.is_zipfile(file):
+                file.seek(0)
+                with zipfile.ZipFile(file) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not self._wanted(info.filename):
+                            continue
+                        if info.file_size > settings.MAX_UPLOAD_SIZE:
+                            self._reject(info.filename, self._too_large())
+                            continue
+                        self._add_zip_entry(archive, info)
+            else:
+                file.seek(0)
+                # Stream mode: members are read in order, without seeking
+                with tarfile.open(fileobj=file, mode="r|*") as archive:
+                    for member in archive:
+                        members += 1
+                        if not member.isfile() or not self._wanted(member.name):
+                            continue
+                        if member.size > settings.MAX_UPLOAD_SIZE:
+                            self._reject(member.name, self._too_large())
+                            continue
+                        self._add_entry(self._entry_name(member.name), None, archive.extractfile(member))
+        except tarfile.ReadError as e:
+            if members or (archive_name or "").lower().endswith(ARCHIVE_SUFFIXES):
+                self._reject(archive_name, f"Could not read archive: {str(e)}")
+                return
+            # A single compressed file (e.g. notes.txt.gz), not a tar archive
+            self._add_compressed(file, archive_name, content_type)
+        except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+            # Entries read before the damage are kept
+            self._reject(archive_name, f"Could not read archive: {str(e)}")
+
+    def _add_zip_entry(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        # Entries are stored and compressed independently, so one that
+        # cannot be read is rejected and the others are still extracted
+        try:
+            with archive.open(info) as stream:
+                self._add_entry(self._entry_name(info.filename), None, stream)
+        except (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error, lzma.LZMAError, EOFError) as e:
+            # Encrypted (no password is ever given), an unsupported
+            # compression method, or a damaged entry
+            self._reject(info.filename, f"Could not read archive entry: {str(e)}")
+
+    def _add_compressed(self, file: BinaryIO, name: Optional[str], content_type: Optional[str]):
+        # Stored decompressed, under its name without the compression suffix
+        name = name or ""
+        file.seek(0)
+        magic = file.read(6)
+        file.seek(0)
+        for prefix, suffix, open_stream in COMPRESSED_FORMATS:
+            if magic.startswith(prefix):
+                break
+        else:
+            self._add_entry(name, content_type, file)
+            return
+        decompressed_name = name
+        if name.lower().endswith(suffix):
+            decompressed_name, content_type = name[:-len(suffix)], None
+        try:
+            with open_stream(file) as stream:
+                self._add_entry(decompressed_name, content_type, stream)
+        except (OSError, EOFError, zlib.error, lzma.LZMAError) as e:
+            self._reject(name, f"Could not decompress file: {str(e)}")
+
+    def _add_entry(self, name: str, content_type: Optional[str], stream: BinaryIO):
+        try:
+            upload = self._save_stream(stream)
+        except UploadTooLargeError as e:
+            self._reject(name, str(e))
+            return
+        self._add(name, content_type, upload)
+
+    def _save_stream(self, stream: BinaryIO) -> StoredUpload:
+        # Same as DocumentProcessor.save_upload, for a synchronous stream;
+        # the declared entry size is not trusted
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4()}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, 'wb') as f:
+                while True:
+                    block = stream.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    self._extracted += len(block)
+                    if size > settings.MAX_UPLOAD_SIZE:
+                        raise UploadTooLargeError(settings.MAX_UPLOAD_SIZE)
+                    if self._extracted > settings.BULK_UPLOAD_MAX_EXTRACTED_SIZE:
+                        raise BulkUploadError(
+                            "Archive contents exceed the maximum of "
+                            f"{settings.BULK_UPLOAD_MAX_EXTRACTED_SIZE} bytes"
+                        )
+                    digest.update(block)
+                    f.write(block)
+        except BaseException:
+            os.remove(path)
+            raise
+        return StoredUpload(path=path, size=size, content_hash=digest.hexdigest())
+
+    @staticmethod
+    def _entry_name(path: str) -> str:
+        # The entry's path inside the archive, so README.md files from
+        # different directories stay separate documents
+        return "/".join(part for part in path.replace("\\", "/").split("/") if part not in ("", "."))
+
+    @staticmethod
+    def _wanted(path: str) -> bool:
+        # Skips hidden files and the resource forks macOS adds to zips
+        parts = path.replace("\\", "/").split("/")
+        return bool(parts[-1]) and not parts[-1].startswith(".") and "__MACOSX" not in parts
+
+    @staticmethod
+    def _too_large() -> str:
+        return str(UploadTooLargeError(settings.MAX_UPLOAD_SIZE))
@@ -1,64 +1,256 @@
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
+import asyncio
+import logging
 import uuid
 from datetime import datetime
 
-from app.schemas.chat import Message, ChatResponse, ChatContext
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.chat import Message, ChatResponse, ChatContext, ChatStreamEvent
+from app.services.context_builder import ConversationContextBuilder
+from app.services.kv_context import KVContextStore
 from app.services.llm import LLMService
+from app.services.response_cache import get_response_cache
+from app.services.retrieval_scope import RetrievalScopeResolver
 from app.services.vector_store import VectorStoreService
 from app.models.chat import ChatMessage, Context
 
+logger = logging.getLogger(__name__)
+
+# Summary updates in flight in this process, one per conversation
+_summary_tasks: Dict[str, asyncio.Task] = {}
+
 class ChatService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        llm: Optional[LLMService] = None,
+        vector_store: Optional[VectorStoreService] = None,
+    ):
         self.db = db
-        self.llm = LLMService()
-        self.vector_store = VectorStoreService()
+        self.llm = llm or LLMService()
+        self.vector_store = vector_store or VectorStoreService(self.llm)
+        self.context_builder = ConversationContextBuilder(db, self.llm)
+        self.kv_contexts = KVContextStore()
+        self.scopes = RetrievalScopeResolver(db)
 
     async def process_message(self, message: Message) -> ChatResponse:
-        # Store user message
-        chat_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            content=message.content,
-            role="user",
-            context_id=message.context_id,
-        )
-        self.db.add(chat_message)
-        self.db.commit()
+        previous_message_id = self._latest_message_id(message.context_id)
+        self._store_message(message.content, "user", message.context_id)
 
         try:
-            # Get relevant context from vector store
-            context_docs = []
-            if message.context_id:
-                context_docs = await self.vector_store.search_similar(
-                    message.content,
-                    limit=5
-                )
+            query_embedding = await self._embed_query(message)
+            cached = self._get_cached_response(message, query_embedding)
+            if cached:
+                self._store_message(cached.content, "assistant", message.context_id)
+                return cached
 
-            # Generate response using LLM
-            llm_response = await self.llm.generate_response(
-                message.content,
-                context=[doc["content"] for doc in context_docs]
+            context_docs = await self._get_context_docs(message, query_embedding)
+            prompt, kv_context = await self._build_prompt(
+                message,
+                context_docs,
+                previous_message_id,
             )
 
-            # Store assistant response
-            assistant_message = ChatMessage(
-                id=str(uuid.uuid4()),
+            # Generate response using LLM
+            result = await self.llm.generate(prompt, context=kv_context)
+            llm_response = result["response"]
+
+            assistant_message = self._store_message(llm_response, "assistant", message.context_id)
+            await self._remember_kv_context(message, assistant_message, result)
+            schedule_summary_update(message.context_id, self.llm)
+
+            response = ChatResponse(
                 content=llm_response,
-                role="assistant",
-                context_id=message.context_id,
+                context_documents=[doc["id"] for doc in context_docs],
             )
-            self.db.add(assistant_message)
-            self.db.commit()
+            self._cache_response(message, query_embedding, response)
+            return response
 
-            return ChatResponse(
+        except Exception as e:
+            self.db.rollback()
+            raise
+
+    async def stream_message(self, message: Message) -> AsyncIterator[ChatStreamEvent]:
+        previous_message_id = self._latest_message_id(message.context_id)
+        self._store_message(message.content, "user", message.context_id)
+
+        try:
+            query_embedding = await self._embed_query(message)
+            cached = self._get_cached_response(message, query_embedding)
+            if cached:
+                self._store_message(cached.content, "assistant", message.context_id)
+                yield ChatStreamEvent(type="token", content=cached.content)
+                yield ChatStreamEvent(
+                    type="done",
+                    content=cached.content,
+                    context_documents=cached.context_documents,
+                )
+                return
+
+            context_docs = await self._get_context_docs(message, query_embedding)
+            prompt, kv_context = await self._build_prompt(
+                message,
+                context_docs,
+                previous_message_id,
+            )
+
+            # Forward tokens as they arrive; the assistant message is only
+            # persisted once the generation has completed. If the consumer
+            # stops iterating (client disconnect) the upstream request is
+            # closed and nothing is stored.
+            tokens = []
+            result = {}
+            async for chunk in self.llm.stream_response(prompt, context=kv_context):
+                token = chunk.get("response", "")
+                if token:
+                    tokens.append(token)
+                    yield ChatStreamEvent(type="token", content=token)
+                if chunk.get("done"):
+                    result = chunk
+
+            llm_response = "".join(tokens)
+            assistant_message = self._store_message(llm_response, "assistant", message.context_id)
+            await self._remember_kv_context(message, assistant_message, result)
+            self._cache_response(
+                message,
+                query_embedding,
+                ChatResponse(
+                    content=llm_response,
+                    context_documents=[doc["id"] for doc in context_docs],
+                ),
+            )
+
+            yield ChatStreamEvent(
+                type="done",
                 content=llm_response,
                 context_documents=[doc["id"] for doc in context_docs],
             )
+            schedule_summary_update(message.context_id, self.llm)
 
         except Exception as e:
             self.db.rollback()
             raise
 
+    async def _embed_query(self, message: Message) -> Optional[List[float]]:
+        if not self._uses_retrieval(message) and not settings.SEMANTIC_CACHE_ENABLED:
+            return None
+        return await self.llm.generate_embedding(message.content)
+
+    async def _get_context_docs(
+        self,
+        message: Message,
+        query_embedding: Optional[List[float]],
+    ) -> List[dict]:
+        # Get relevant context from vector store
+        if not self._uses_retrieval(message):
+            return []
+        return await self.vector_store.search_similar(
+            message.content,
+            limit=5,
+            query_embedding=query_embedding,
+            document_ids=self.scopes.resolve(message),
+        )
+
+    def _uses_retrieval(self, message: Message) -> bool:
+        return bool(message.context_id) or self.scopes.is_scoped(message)
+
+    async def _build_prompt(
+        self,
+        message: Message,
+        context_docs: List[dict],
+        previous_message_id: Optional[str],
+    ) -> Tuple[str, Optional[List[int]]]:
+        kv_context = None
+        if settings.KV_CONTEXT_ENABLED and message.context_id:
+            kv_context = await self.kv_contexts.get(
+                message.context_id,
+                self.llm.default_model,
+                previous_message_id,
+            )
+
+        # Earlier turns are already encoded in reusable context tokens, so
+        # only the new turn needs to be sent and prefilled.
+        prompt = self.context_builder.build_prompt(
+            message.content,
+            None if kv_context else message.context_id,
+            context_docs,
+        )
+        return prompt, kv_context
+
+    async def _remember_kv_context(
+        self,
+        message: Message,
+        assistant_message: ChatMessage,
+        result: dict,
+    ):
+        if settings.KV_CONTEXT_ENABLED and message.context_id:
+            await self.kv_contexts.set(
+                message.context_id,
+                self.llm.default_model,
+                assistant_message.id,
+                result.get("context") or [],
+            )
+
+    def _latest_message_id(self, context_id: Optional[str]) -> Optional[str]:
+        if not settings.KV_CONTEXT_ENABLED or not context_id:
+            return None
+        return self.db.query(ChatMessage.id)\
+            .filter(ChatMessage.context_id == context_id)\
+            .order_by(ChatMessage.created_at.desc())\
+            .limit(1)\
+            .scalar()
+
+    def _retrieval_scope(self, message: Message) -> str:
+        # Cached answers are only reused for queries retrieving from the same
+        # set of documents, within the same conversation.
+        return self.scopes.scope_key(message)
+
+    def _get_cached_response(
+        self,
+        message: Message,
+        query_embedding: Optional[List[float]],
+    ) -> Optional[ChatResponse]:
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return None
+        cached = get_response_cache().lookup(
+            self._retrieval_scope(message),
+            query_embedding,
+        )
+        if cached is None:
+            return None
+        return cached.model_copy(update={"created_at": datetime.now()})
+
+    def _cache_response(
+        self,
+        message: Message,
+        query_embedding: Optional[List[float]],
+        response: ChatResponse,
+    ):
+        if settings.SEMANTIC_CACHE_ENABLED:
+            get_response_cache().store(
+                self._retrieval_scope(message),
+                query_embedding,
+                response,
+            )
+
+    def _store_message(
+        self,
+        content: str,
+        role: str,
+        context_id: Optional[str],
+    ) -> ChatMessage:
+        chat_message = ChatMessage(
+            id=str(uuid.uuid4()),
+            content=content,
+            role=role,
+            context_id=context_id,
+        )
+        self.db.add(chat_message)
+        self.db.commit()
+        return chat_message
+
     async def create_context(self, title: str) -> ChatContext:
         context = Context(
             id=str(uuid.uuid4()),
@@ -88,4 +280,26 @@ class ChatService:
                 created_at=ctx.created_at,
             )
             for ctx in contexts
-        ]
\ No newline at end of file
+        ]
+
+def schedule_summary_update(context_id: Optional[str], llm: LLMService):
+    # Runs after the response: the summary waits for BACKGROUND LLM capacity,
+    # which the user's next turn must not queue behind
+    if not context_id or context_id in _summary_tasks:
+        return
+    task = asyncio.create_task(update_summary_in_background(context_id, llm))
+    _summary_tasks[context_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(context_id, None))
+
+async def update_summary_in_background(context_id: str, llm: LLMService):
+    # Outlives the request, so it uses its own session rather than the
+    # request's
+    db = SessionLocal()
+    try:
+        await ConversationContextBuilder(db, llm).update_summary(context_id)
+    except Exception as e:
+        # A failed summary only means a longer prompt next turn
+        db.rollback()
+        logger.warning(f"Failed to update conversation summary: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,133 @@
+from typing import List, Tuple
+from dataclasses import dataclass
+import hashlib
+import re
+
+from app.core.config import settings
+
+# A unit ends at a paragraph break or after sentence punctuation (plus any
+# closing quotes/brackets) followed by whitespace. The separator stays with
+# the unit so offsets into the original text remain exact.
+BOUNDARY = re.compile(r"\n\s*\n|(?<=[.!?])[\"')\]]*\s+")
+PARAGRAPH_END = re.compile(r"\n\s*\n$")
+
+@dataclass
+class Chunk:
+    index: int
+    text: str
+    start: int  # character offsets into the document text
+    end: int
+
+    @property
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+# Incremental chunker: feed() text blocks as they are read and collect the
+# chunks completed so far, then call finish(). Memory use is bounded by the
+# chunk size, not the document size.
+class TextChunker:
+    def __init__(
+        self,
+        chunk_size: int = settings.CHUNK_SIZE,
+        overlap: int = settings.CHUNK_OVERLAP,
+    ):
+        if overlap >= chunk_size:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+        self._buffer_start = 0
+        self._current: List[Tuple[int, str]] = []
+        self._current_length = 0
+        self._has_new_text = False
+        self._index = 0
+
+    def feed(self, text: str) -> List[Chunk]:
+        self._buffer += text
+        return self._pack(self._take_units(final=False))
+
+    def finish(self) -> List[Chunk]:
+        chunks = self._pack(self._take_units(final=True))
+        if self._has_new_text:
+            self._emit(chunks)
+        return chunks
+
+    def _take_units(self, final: bool) -> List[Tuple[int, str]]:
+        units = []
+        position = 0
+        for match in BOUNDARY.finditer(self._buffer):
+            if not final and match.end() == len(self._buffer):
+                # The separator may continue in the next block
+                break
+            units.append((self._buffer_start + position, self._buffer[position:match.end()]))
+            position = match.end()
+
+        rest = self._buffer[position:]
+        if final:
+            if rest:
+                units.append((self._buffer_start + position, rest))
+                position += len(rest)
+        elif len(rest) > self.chunk_size:
+            # Text without any boundary still has to be cut eventually. Only
+            # the pieces _split_long would cut from the whole unit are taken,
+            # so the chunks do not depend on how the text was fed.
+            for piece_start, piece in self._split_long(self._buffer_start + position, rest)[:-1]:
+                units.append((piece_start, piece))
+                position += len(piece)
+
+        self._buffer = self._buffer[position:]
+        self._buffer_start += position
+        return units
+
+    def _pack(self, units: List[Tuple[int, str]]) -> List[Chunk]:
+        chunks = []
+        for start, text in units:
+            for piece_start, piece in self._split_long(start, text):
+                if self._current and self._current_length + len(piece) > self.chunk_size:
+                    if self._has_new_text:
+                        self._emit(chunks)
+                    if self._current_length + len(piece) > self.chunk_size:
+                        self._current = []
+                        self._current_length = 0
+                self._current.append((piece_start, piece))
+                self._current_length += len(piece)
+                self._has_new_text = True
+                # Ending chunks at paragraph breaks keeps boundaries stable,
+                # so an edit only changes the chunks around it and
+                # re-indexing can skip the rest
+                if self._current_length >= self.chunk_size // 2 and PARAGRAPH_END.search(piece):
+                    self._emit(chunks)
+        return chunks
+
+    def _split_long(self, start: int, text: str) -> List[Tuple[int, str]]:
+        pieces = []
+        while len(text) > self.chunk_size:
+            # Prefer to cut on whitespace within the allowed size
+            cut = text.rfind(" ", self.chunk_size // 2, self.chunk_size) + 1 or self.chunk_size
+            pieces.append((start, text[:cut]))
+            start += cut
+            text = text[cut:]
+        if text:
+            pieces.append((start, text))
+        return pieces
+
+    def _emit(self, chunks: List[Chunk]):
+        start = self._current[0][0]
+        text = "".join(piece for _, piece in self._current)
+        # Whitespace-only chunks are dropped before they take an index, so
+        # indexes stay contiguous: readers go by 0..chunk_count - 1
+        if text.strip():
+            chunks.append(Chunk(index=self._index, text=text, start=start, end=start + len(text)))
+            self._index += 1
+
+        # Carry trailing units over as overlap into the next chunk
+        kept = []
+        length = 0
+        for piece_start, piece in reversed(self._current):
+            if length + len(piece) > self.overlap:
+                break
+            kept.insert(0, (piece_start, piece))
+            length += len(piece)
+        self._current = kept
+        self._current_length = length
+        self._has_new_text = False
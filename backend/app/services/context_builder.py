@@ -0,0 +1,175 @@
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.chat import ChatMessage, Context
+from app.services.llm import LLMService
+from app.services.scheduler import Priority
+
+SUMMARY_PROMPT = """Update the running summary of a conversation with the new turns below.
+Keep names, facts, decisions and open questions. Reply with the summary only.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token) that avoids loading a
+    # model-specific tokenizer on every request.
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    max_chars = tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+class ConversationContextBuilder:
+    def __init__(self, db: Session, llm: LLMService):
+        self.db = db
+        self.llm = llm
+
+    def build_prompt(
+        self,
+        question: str,
+        context_id: Optional[str],
+        context_docs: List[dict],
+    ) -> str:
+        sections = []
+        budget = settings.CONTEXT_TOKEN_BUDGET
+
+        if context_docs:
+            documents = self._format_documents(context_docs)
+            sections.append(f"Relevant documents:\n{documents}")
+            budget -= estimate_tokens(documents)
+
+        context = self.db.get(Context, context_id) if context_id else None
+        if context is not None and context.summary:
+            sections.append(f"Summary of the earlier conversation:\n{context.summary}")
+            budget -= estimate_tokens(context.summary)
+
+        # The current question is stored before the prompt is built, so it is
+        # the newest message of the conversation.
+        messages = self._load_recent_messages(context) if context is not None else []
+        if not messages or messages[-1].content != question:
+            turns = [self._format_turn("user", question)]
+        else:
+            turns = [self._format_turn("user", messages.pop().content)]
+        budget -= estimate_tokens(turns[0])
+
+        for message in reversed(messages):
+            turn = self._format_turn(message.role, message.content)
+            cost = estimate_tokens(turn)
+            if cost > budget:
+                break
+            turns.append(turn)
+            budget -= cost
+
+        sections.append("Conversation:\n" + "\n".join(reversed(turns)) + "\nAssistant:")
+        return "\n\n".join(sections)
+
+    async def update_summary(self, context_id: Optional[str]):
+        # Folds the oldest unsummarized turns into the stored summary once the
+        # history outgrows its budget, so the work per request stays bounded
+        # no matter how long the conversation gets. Safe to run concurrently:
+        # each fold only commits on top of the summary it started from.
+        if not context_id:
+            return
+        context = self.db.get(Context, context_id)
+        if context is None:
+            return
+        summary, summary_until = context.summary, context.summary_until
+
+        # Token estimates of every unsummarized message, oldest first,
+        # without loading their contents
+        lengths = self._unsummarized(context_id, summary_until)\
+            .with_entities(func.length(ChatMessage.content))\
+            .order_by(ChatMessage.created_at)\
+            .all()
+        costs = [length // 4 + 1 for (length,) in lengths]
+        history_budget = settings.CONTEXT_TOKEN_BUDGET - settings.CONTEXT_DOCUMENT_TOKENS
+        total = sum(costs)
+        if total <= history_budget and len(costs) < settings.HISTORY_MAX_MESSAGES:
+            return
+
+        fold = 0
+        # Fold down to half the limits so summaries are not rebuilt every turn
+        while fold < len(costs) and (
+            total > history_budget // 2
+            or len(costs) - fold > settings.HISTORY_MAX_MESSAGES // 2
+        ):
+            total -= costs[fold]
+            fold += 1
+
+        # One summary request per page of turns, oldest first
+        page_size = max(settings.HISTORY_MAX_MESSAGES // 2, 1)
+        while fold > 0:
+            folded = self._unsummarized(context_id, summary_until)\
+                .order_by(ChatMessage.created_at)\
+                .limit(min(fold, page_size))\
+                .all()
+            if not folded:
+                return
+            turns = "\n".join(
+                self._format_turn(
+                    m.role,
+                    truncate_to_tokens(m.content, settings.HISTORY_SUMMARY_TOKENS),
+                )
+                for m in folded
+            )
+            updated = await self.llm.generate_response(
+                SUMMARY_PROMPT.format(summary=summary or "(none)", turns=turns),
+                priority=Priority.BACKGROUND,
+            )
+            updated = truncate_to_tokens(updated.strip(), settings.HISTORY_SUMMARY_TOKENS)
+            if not self._save_summary(context_id, summary_until, updated, folded[-1].created_at):
+                # Another run folded these turns first
+                return
+            summary, summary_until = updated, folded[-1].created_at
+            fold -= len(folded)
+
+    def _unsummarized(self, context_id: str, summary_until: Optional[datetime]):
+        query = self.db.query(ChatMessage).filter(ChatMessage.context_id == context_id)
+        if summary_until is not None:
+            query = query.filter(ChatMessage.created_at > summary_until)
+        return query
+
+    def _save_summary(
+        self,
+        context_id: str,
+        previous_until: Optional[datetime],
+        summary: str,
+        summary_until: datetime,
+    ) -> bool:
+        # Compare-and-set on summary_until
+        if previous_until is None:
+            condition = Context.summary_until.is_(None)
+        else:
+            condition = Context.summary_until == previous_until
+        updated = self.db.query(Context)\
+            .filter(Context.id == context_id, condition)\
+            .update({Context.summary: summary, Context.summary_until: summary_until},
+                    synchronize_session=False)
+        self.db.commit()
+        return updated > 0
+
+    def _load_recent_messages(self, context: Context) -> List[ChatMessage]:
+        messages = self._unsummarized(context.id, context.summary_until)\
+            .order_by(ChatMessage.created_at.desc())\
+            .limit(settings.HISTORY_MAX_MESSAGES)\
+            .all()
+        return messages[::-1]
+
+    def _format_documents(self, context_docs: List[dict]) -> str:
+        per_document = settings.CONTEXT_DOCUMENT_TOKENS // len(context_docs)
+        return "\n\n".join(
+            f"[{i + 1}] {truncate_to_tokens(doc['content'], per_document)}"
+            for i, doc in enumerate(context_docs)
+        )
+
+    def _format_turn(self, role: str, content: str) -> str:
+        return f"{'User' if role == 'user' else 'Assistant'}: {content}"
@@ -0,0 +1,68 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+from collections import Counter
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.document import CorpusTerm
+
+DOCUMENTS = ""  # term of the row that counts documents
+TERM_BATCH = 1000  # terms per statement
+
+# Corpus document frequencies in Postgres, updated incrementally as
+# documents are indexed, re-indexed and deleted. Updates join the caller's
+# transaction, so they commit together with the document row. Every update
+# is one upsert of signed per-term deltas in sorted term order, so
+# concurrent updates lock rows in the same order and cannot deadlock.
+class CorpusStatistics:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def frequencies(self, terms: Iterable[str]) -> Tuple[Dict[str, int], int]:
+        # (document count per term, number of documents)
+        terms = sorted(set(terms) | {DOCUMENTS})
+        counts = {}
+        for start in range(0, len(terms), TERM_BATCH):
+            counts.update(
+                self.db.query(CorpusTerm.term, CorpusTerm.document_count)
+                .filter(CorpusTerm.term.in_(terms[start:start + TERM_BATCH]))
+            )
+        return counts, counts.pop(DOCUMENTS, 0)
+
+    def update_document(self, previous: Optional[Set[str]], current: Set[str]):
+        # previous is None for a document that was not counted before
+        if previous is None:
+            self._apply(Counter(current | {DOCUMENTS}))
+            return
+        deltas = Counter(current - previous)
+        deltas.subtract(previous - current)
+        self._apply(deltas)
+
+    def remove_documents(self, documents: Iterable[Set[str]]):
+        deltas = Counter()
+        for terms in documents:
+            deltas.subtract(terms | {DOCUMENTS})
+        self._apply(deltas)
+
+    def _apply(self, deltas: Dict[str, int]):
+        terms = sorted(term for term, delta in deltas.items() if delta)
+        for start in range(0, len(terms), TERM_BATCH):
+            batch = terms[start:start + TERM_BATCH]
+            statement = insert(CorpusTerm).values([
+                {"term": term, "document_count": deltas[term]} for term in batch
+            ])
+            self.db.execute(statement.on_conflict_do_update(
+                index_elements=[CorpusTerm.term],
+                set_={"document_count": func.greatest(
+                    CorpusTerm.document_count + statement.excluded.document_count, 0
+                )},
+            ))
+            # Documents indexed before the statistics existed were never
+            # counted; a decrement that found no row inserted a negative
+            # one. These rows are already locked by this transaction.
+            decremented = [term for term in batch if deltas[term] < 0]
+            if decremented:
+                self.db.query(CorpusTerm)\
+                    .filter(CorpusTerm.term.in_(decremented), CorpusTerm.document_count < 0)\
+                    .update({CorpusTerm.document_count: 0}, synchronize_session=False)
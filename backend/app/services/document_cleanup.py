@@ -0,0 +1,231 @@
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+import asyncio
+import logging
+import os
+import shutil
+import time
+
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.core.thread_pool import run_in_thread_pool
+from app.db.session import SessionLocal
+from app.models.document import Document, Folder
+from app.services.blob_store import BlobStore
+from app.services.corpus_statistics import CorpusStatistics
+from app.services.ingestion import WORK_DIR, IngestionPipeline
+from app.services.response_cache import publish_invalidation
+from app.services.text_analysis import document_terms
+from app.services.vector_store import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_LOCK = "documents:compaction"
+
+# Removes documents completely: Postgres rows, vectors/lexical entries and
+# the uploaded files (blobs no other document shares), in batches. Also runs
+# the periodic compaction that purges vectors, files and blobs whose
+# document row no longer exists (e.g. a document deleted while it was still
+# being indexed).
+class DocumentCleanupService:
+    def __init__(self, db: Session, vector_store: Optional[VectorStoreService] = None):
+        self.db = db
+        self.vector_store = vector_store or VectorStoreService()
+        self.blobs = BlobStore()
+        self.corpus = CorpusStatistics(db)
+
+    def folder_tree(self, folder_ids: List[str]) -> List[Tuple[str, int]]:
+        # (folder id, depth) for the folders and all of their subfolders
+        tree = select(Folder.id, literal_column("0").label("depth"))\
+            .where(Folder.id.in_(folder_ids))\
+            .cte("folder_tree", recursive=True)
+        tree = tree.union_all(
+            select(Folder.id, tree.c.depth + 1).where(Folder.parent_id == tree.c.id)
+        )
+        return [
+            (id, depth)
+            for id, depth in self.db.execute(
+                select(tree.c.id, func.max(tree.c.depth)).group_by(tree.c.id)
+            )
+        ]
+
+    def mark_for_deletion(
+        self,
+        document_ids: List[str],
+        folder_ids: List[str] = (),
+    ) -> List[str]:
+        # Flags the documents (including everything under the folders) as
+        # deleting so they drop out of listings and scoped retrieval right
+        # away, and returns the ids the background job has to remove
+        conditions = []
+        if document_ids:
+            conditions.append(Document.id.in_(document_ids))
+        if folder_ids:
+            conditions.append(Document.folder_id.in_(folder_ids))
+        if not conditions:
+            return []
+        documents = self.db.query(Document).filter(or_(*conditions))
+        ids = [id for (id,) in documents.with_entities(Document.id)]
+        documents.update({Document.status: "deleting"}, synchronize_session=False)
+        self.db.commit()
+        return ids
+
+    async def delete_documents(self, document_ids: List[str]):
+        batch_size = settings.DOCUMENT_DELETE_BATCH
+        for start in range(0, len(document_ids), batch_size):
+            batch = document_ids[start:start + batch_size]
+            hashes = {
+                content_hash
+                for (content_hash,) in self.db.query(Document.content_hash)
+                .filter(Document.id.in_(batch), Document.content_hash.isnot(None))
+            }
+            # Index entries first: if this fails the rows still exist and
+            # the deletion can be retried
+            await self.vector_store.delete_documents(batch)
+            await run_in_thread_pool(self._remove_files, batch)
+            # Only the analyzed prefix of the content contributed terms
+            contents = [
+                content
+                for (content,) in self.db.query(
+                    func.substr(Document.content, 1, settings.TEXT_ANALYSIS_MAX_CHARS)
+                ).filter(Document.id.in_(batch), Document.content.isnot(None))
+            ]
+            self.corpus.remove_documents(
+                await run_in_thread_pool(lambda: [document_terms(content) for content in contents])
+            )
+            self.db.query(Document)\
+                .filter(Document.id.in_(batch))\
+                .delete(synchronize_session=False)
+            self.db.commit()
+            await publish_invalidation(batch)
+            # Blobs shared with remaining documents stay
+            await self.remove_unreferenced_blobs(hashes)
+
+    def delete_folders(self, folders: List[Tuple[str, int]]):
+        # Children before parents, so no parent_id ever points at a
+        # deleted folder
+        for id, _ in sorted(folders, key=lambda folder: -folder[1]):
+            self.db.query(Folder).filter(Folder.id == id).delete(synchronize_session=False)
+        self.db.commit()
+
+    async def compact(self) -> dict:
+        # Read the index before the rows, so a document created in between
+        # is never mistaken for an orphan
+        indexed = await self.vector_store.document_ids()
+        existing = {id for (id,) in self.db.query(Document.id)}
+
+        orphaned = sorted(indexed - existing)
+        if orphaned:
+            batch_size = settings.DOCUMENT_DELETE_BATCH
+            for start in range(0, len(orphaned), batch_size):
+                await self.vector_store.delete_documents(orphaned[start:start + batch_size])
+            await self.vector_store.optimize()
+
+        files = await run_in_thread_pool(self._remove_orphaned_files, existing)
+        blobs = await self.remove_unreferenced_blobs()
+        if orphaned or files or blobs:
+            logger.info(
+                f"Compaction removed {len(orphaned)} orphaned documents from the "
+                f"index, {files} orphaned files and {blobs} unreferenced blobs"
+            )
+        return {"documents": len(orphaned), "files": files, "blobs": blobs}
+
+    async def remove_unreferenced_blobs(self, hashes: Optional[Set[str]] = None) -> int:
+        # Blobs no document refers to (all of them if hashes is None). Blobs
+        # written or re-referenced within the grace period are kept, as an
+        # upload stores its blob before committing the row that refers to it.
+        cutoff = time.time() - settings.DOCUMENT_COMPACTION_GRACE
+        if hashes is None:
+            hashes = {
+                content_hash
+                for content_hash, mtime in await run_in_thread_pool(list, self.blobs.blobs())
+                if mtime < cutoff
+            }
+        candidates = sorted(hashes)
+        referenced = set()
+        batch_size = settings.DOCUMENT_DELETE_BATCH
+        for start in range(0, len(candidates), batch_size):
+            referenced.update(
+                content_hash
+                for (content_hash,) in self.db.query(Document.content_hash)
+                .filter(Document.content_hash.in_(candidates[start:start + batch_size]))
+                .distinct()
+            )
+        unreferenced = [content_hash for content_hash in candidates if content_hash not in referenced]
+        if not unreferenced:
+            return 0
+        return await run_in_thread_pool(self._remove_blobs, unreferenced, cutoff)
+
+    def _remove_files(self, document_ids: List[str]):
+        # Files stored before content addressing, and ingestion work dirs
+        for document_id in document_ids:
+            try:
+                os.remove(os.path.join(settings.UPLOAD_DIR, document_id))
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(IngestionPipeline.work_dir(document_id), ignore_errors=True)
+
+    def _remove_blobs(self, hashes: List[str], older_than: float) -> int:
+        return sum(self.blobs.remove(content_hash, older_than) for content_hash in hashes)
+
+    def _remove_orphaned_files(self, existing: set) -> int:
+        # Files younger than the grace period may belong to an upload whose
+        # row is not visible yet
+        cutoff = time.time() - settings.DOCUMENT_COMPACTION_GRACE
+        removed = 0
+        if not os.path.isdir(settings.UPLOAD_DIR):
+            return removed
+        with os.scandir(settings.UPLOAD_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name not in existing \
+                        and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        # Stage outputs of ingestion runs for documents deleted meanwhile
+        work_dir = os.path.join(settings.UPLOAD_DIR, WORK_DIR)
+        if os.path.isdir(work_dir):
+            with os.scandir(work_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir() and entry.name not in existing \
+                            and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+        return removed
+
+async def delete_in_background(document_ids: List[str], folders: List[Tuple[str, int]] = ()):
+    # Runs after the response is sent, so it uses its own session rather
+    # than the request's
+    db = SessionLocal()
+    try:
+        cleanup = DocumentCleanupService(db)
+        await cleanup.delete_documents(document_ids)
+        if folders:
+            cleanup.delete_folders(folders)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to delete documents: {str(e)}")
+    finally:
+        db.close()
+
+async def run_compaction():
+    while True:
+        await asyncio.sleep(settings.DOCUMENT_COMPACTION_INTERVAL)
+        db = SessionLocal()
+        try:
+            # Only one API process compacts per interval
+            acquired = await get_redis_client().set(
+                COMPACTION_LOCK,
+                datetime.now().isoformat(),
+                nx=True,
+                ex=settings.DOCUMENT_COMPACTION_INTERVAL,
+            )
+            if acquired:
+                await DocumentCleanupService(db).compact()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Document compaction failed: {str(e)}")
+        finally:
+            db.close()
@@ -1,25 +1,68 @@
+from typing import Optional
+from dataclasses import dataclass
 import aiofiles
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
+import hashlib
+import os
 import uuid
-from datetime import datetime
 
 from app.models.document import Document, Folder
-from app.services.vector_store import VectorStoreService
 from app.core.config import settings
 from app.schemas.document import FolderCreate
+from app.services.blob_store import BlobStore
+
+class UploadTooLargeError(Exception):
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"Upload exceeds the maximum size of {limit} bytes")
+
+@dataclass
+class StoredUpload:
+    path: str  # temporary path until moved into the blob store
+    size: int
+    content_hash: str  # sha256 of the file
 
 class DocumentProcessor:
     def __init__(self, db: Session):
         self.db = db
-        self.vector_store = VectorStoreService()
+        self.blobs = BlobStore()
+
+    async def create_document(
+        self,
+        file: UploadFile,
+        folder_id: str = None,
+        replace: bool = False,
+        upload: Optional[StoredUpload] = None,
+    ) -> Document:
+        size = upload.size if upload else 0
+        content_hash = upload.content_hash if upload else None
+        if replace:
+            # Re-uploads of the same file name into the same folder update the
+            # existing document, so unchanged chunks are not re-indexed
+            document = self.db.query(Document).filter(
+                Document.name == file.filename,
+                Document.folder_id == folder_id,
+                Document.status != "deleting",
+            ).first()
+            if document is not None:
+                if document.content_hash != content_hash:
+                    # New contents: the document has to be indexed again
+                    document.processed_at = None
+                document.type = file.content_type
+                document.size = size
+                document.content_hash = content_hash
+                document.status = "processing"
+                document.error = None
+                self.db.commit()
+                return document
 
-    async def create_document(self, file: UploadFile, folder_id: str = None) -> Document:
         document = Document(
             id=str(uuid.uuid4()),
             name=file.filename,
             type=file.content_type,
-            size=0,  # Will be updated after processing
+            size=size,
+            content_hash=content_hash,
             status="processing",
             folder_id=folder_id
         )
@@ -37,60 +80,31 @@ class DocumentProcessor:
         self.db.commit()
         return new_folder
 
-    async def process_document(self, document_id: str, file: UploadFile):
+    async def save_upload(self, file: UploadFile) -> StoredUpload:
+        # Streams the upload to disk in fixed-size blocks, hashing as it
+        # goes, and stops as soon as the size limit is crossed. Must run
+        # while the request is still open.
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4()}.part")
+        digest = hashlib.sha256()
+        size = 0
         try:
-            # Save file
-            file_path = f"{settings.UPLOAD_DIR}/{document_id}"
-            content = await file.read()
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(content)
-
-            # Extract text based on file type
-            text = await self.extract_text(file_path, file.content_type)
-
-            # Generate embedding and store in vector database
-            embedding_id = await self.vector_store.add_document(
-                document_id=document_id,
-                content=text,
-                metadata={
-                    "name": file.filename,
-                    "type": file.content_type
-                }
-            )
-
-            # Update document status
-            document = self.db.query(Document).filter(Document.id == document_id).first()
-            document.status = "ready"
-            document.processed_at = datetime.now()
-            document.size = len(content)
-            document.content = text
-            document.embedding_id = embedding_id
-            
-            # Generate summary and tags (implement your own logic)
-            document.summary = await self.generate_summary(text)
-            document.tags = await self.extract_tags(text)
-            
-            self.db.commit()
-
-        except Exception as e:
-            document = self.db.query(Document).filter(Document.id == document_id).first()
-            document.status = "error"
-            document.error = str(e)
-            self.db.commit()
+            async with aiofiles.open(path, 'wb') as f:
+                while True:
+                    block = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > settings.MAX_UPLOAD_SIZE:
+                        raise UploadTooLargeError(settings.MAX_UPLOAD_SIZE)
+                    digest.update(block)
+                    await f.write(block)
+        except BaseException:
+            os.remove(path)
             raise
+        return StoredUpload(path=path, size=size, content_hash=digest.hexdigest())
 
-    async def extract_text(self, file_path: str, content_type: str) -> str:
-        # Implement text extraction based on content type
-        # This is a placeholder - implement actual extraction logic
-        async with aiofiles.open(file_path, 'r') as f:
-            return await f.read()
-
-    async def generate_summary(self, text: str) -> str:
-        # Implement summary generation
-        # This is a placeholder - implement actual summarization logic
-        return text[:200] + "..."
-
-    async def extract_tags(self, text: str) -> List[str]:
-        # Implement tag extraction
-        # This is a placeholder - implement actual tag extraction logic
-        return ["document", "text"]
\ No newline at end of file
+    def store_upload(self, upload: StoredUpload) -> str:
+        # Identical files are stored once; call before the document row
+        # referencing the blob is committed
+        return self.blobs.put(upload.path, upload.content_hash)
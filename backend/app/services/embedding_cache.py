@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional
+from array import array
+from collections import OrderedDict
+import hashlib
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        max_entries: int = settings.EMBEDDING_CACHE_SIZE,
+        ttl: int = settings.EMBEDDING_CACHE_TTL,
+    ):
+        self.redis = redis
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, List[float]] = OrderedDict()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"embedding:{model}:{digest}"
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        return (await self.get_many(model, [text]))[0]
+
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        # Texts not in memory are looked up in Redis with one MGET
+        keys = [self.make_key(model, text) for text in texts]
+        embeddings: List[Optional[List[float]]] = []
+        remote = []
+        for position, key in enumerate(keys):
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                remote.append(position)
+            embeddings.append(embedding)
+
+        if remote and self.redis is not None:
+            try:
+                values = await self.redis.mget([keys[position] for position in remote])
+            except RedisError as e:
+                logger.warning(f"Embedding cache lookup failed: {str(e)}")
+                values = [None] * len(remote)
+            for position, raw in zip(remote, values):
+                if raw is not None:
+                    embeddings[position] = array("f", raw).tolist()
+                    self._remember(keys[position], embeddings[position])
+                    self.redis_hits += 1
+
+        self.misses += sum(1 for embedding in embeddings if embedding is None)
+        return embeddings
+
+    async def set(self, model: str, text: str, embedding: List[float]):
+        await self.set_many(model, {text: embedding})
+
+    async def set_many(self, model: str, embeddings: Dict[str, List[float]]):
+        # Written to Redis in one pipelined round trip
+        keys = {self.make_key(model, text): embedding for text, embedding in embeddings.items()}
+        for key, embedding in keys.items():
+            self._remember(key, embedding)
+
+        if keys and self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipeline:
+                    for key, embedding in keys.items():
+                        pipeline.set(key, array("f", embedding).tobytes(), ex=self.ttl)
+                    await pipeline.execute()
+            except RedisError as e:
+                logger.warning(f"Embedding cache store failed: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            redis=get_redis_client() if settings.EMBEDDING_CACHE_REDIS else None
+        )
+    return _embedding_cache
@@ -0,0 +1,81 @@
+from typing import Dict, List, Optional
+
+from app.services.chunker import Chunk
+from app.services.vector_store import VectorStoreService
+
+# Re-indexes a document against the chunks already stored for it. Chunks
+# whose text, position and metadata are unchanged are skipped, chunks whose
+# text only moved reuse their stored embedding, and only new text is
+# embedded. Writing the chunks, and deleting those past the new end of the
+# document, is left to the ingestion pipeline's index stage.
+class IncrementalChunkIndexer:
+    def __init__(self, vector_store: VectorStoreService, document_id: str, metadata: dict):
+        self.vector_store = vector_store
+        self.document_id = document_id
+        self.metadata = metadata
+        self.previous: Dict[str, dict] = {}  # chunk id -> stored metadata
+        self.by_hash: Dict[str, str] = {}  # content hash -> stored chunk id
+        self.saved: Dict[str, List[float]] = {}  # content hash -> embedding
+        self.skipped = 0
+        self.reused = 0
+        self.embedded = 0
+
+    async def load(self, previous_chunk_count: int):
+        ids = [
+            self.vector_store.chunk_id(self.document_id, index)
+            for index in range(previous_chunk_count)
+        ]
+        for item in await self.vector_store.get_chunks(ids):
+            self.previous[item["id"]] = item["metadata"]
+            if self._reusable(item["metadata"]):
+                self.by_hash.setdefault(item["metadata"]["content_hash"], item["id"])
+
+    def changed(self, chunks: List[Chunk]) -> List[Chunk]:
+        # The chunks of this batch that differ from what is stored
+        changed = []
+        for chunk in chunks:
+            id = self.vector_store.chunk_id(self.document_id, chunk.index)
+            expected = self.vector_store.chunk_metadata(self.document_id, chunk, self.metadata)
+            if self.previous.get(id) == expected:
+                self.skipped += 1
+            else:
+                changed.append(chunk)
+        return changed
+
+    async def embeddings(self, changed: List[Chunk]) -> List[List[float]]:
+        # Keep the embeddings of stored chunks that are about to be
+        # overwritten (their text may reappear further down) and fetch the
+        # ones whose text reappears in this batch.
+        fetch = set()
+        for chunk in changed:
+            id = self.vector_store.chunk_id(self.document_id, chunk.index)
+            if self._reusable(self.previous.get(id)):
+                fetch.add(id)
+            source = self.by_hash.get(chunk.content_hash)
+            if source is not None and chunk.content_hash not in self.saved:
+                fetch.add(source)
+        fetch = [
+            id for id in fetch
+            if self.previous[id]["content_hash"] not in self.saved
+        ]
+        if fetch:
+            for item in await self.vector_store.get_chunks(fetch, include_embeddings=True):
+                self.saved[item["metadata"]["content_hash"]] = item["embedding"]
+
+        embeddings = [self.saved.get(chunk.content_hash) for chunk in changed]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        self.reused += len(changed) - len(missing)
+        self.embedded += len(missing)
+        if missing:
+            computed = await self.vector_store.llm.generate_embeddings(
+                [changed[i].text for i in missing]
+            )
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _reusable(self, metadata: Optional[dict]) -> bool:
+        # Embeddings from another model cannot be mixed into the index
+        return bool(metadata) \
+            and "content_hash" in metadata \
+            and metadata.get("embedding_model") == self.vector_store.llm.embedding_model
@@ -0,0 +1,510 @@
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from datetime import datetime
+import aiofiles
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+from celery import chain
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import Session
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.thread_pool import run_in_thread_pool
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.services.chunker import Chunk, TextChunker
+from app.services.blob_store import BlobStore
+from app.services.corpus_statistics import CorpusStatistics
+from app.services.incremental_index import IncrementalChunkIndexer
+from app.services.llm import LLMService
+from app.services.response_cache import publish_document_indexed
+from app.services.scheduler import Priority
+from app.services.text_analysis import TextAnalyzer, document_terms
+from app.services.text_extraction import extract_to_file, get_extraction_engine
+from app.services.vector_store import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+# Stage outputs live next to the uploads, so every worker sees them
+WORK_DIR = ".ingest"
+
+# Ingestion in four stages: extract -> chunk -> embed -> index. Each stage
+# reads the previous stage's output from a work directory keyed on the
+# document and the sha256 of its file, and publishes its own output with an
+# atomic rename, so a retried or re-delivered stage either finds its output
+# already there or starts over from a complete input. Vectors are only
+# written by the index stage, which upserts and can simply run again.
+# Progress is written to Document.status as each stage starts.
+class IngestionPipeline:
+    def __init__(self, db: Session, vector_store: Optional[VectorStoreService] = None):
+        self.db = db
+        # Ingestion only uses LLM capacity interactive chat leaves unused
+        self.vector_store = vector_store or VectorStoreService(LLMService(priority=Priority.BULK))
+        self.blobs = BlobStore()
+        self.corpus = CorpusStatistics(db)
+        self.analyzer = TextAnalyzer()
+
+    @staticmethod
+    def work_dir(document_id: str, content_hash: Optional[str] = None) -> str:
+        path = os.path.join(settings.UPLOAD_DIR, WORK_DIR, document_id)
+        return os.path.join(path, content_hash) if content_hash else path
+
+    def text_path(self, document_id: str, content_hash: str) -> str:
+        return os.path.join(self.work_dir(document_id, content_hash), "text.txt")
+
+    def chunks_path(self, document_id: str, content_hash: str) -> str:
+        return os.path.join(self.work_dir(document_id, content_hash), "chunks.jsonl")
+
+    def embeddings_path(self, document_id: str, content_hash: str) -> str:
+        return os.path.join(self.work_dir(document_id, content_hash), "embeddings.jsonl")
+
+    async def run(self, document_id: str, content_hash: Optional[str] = None, force: bool = False):
+        # All stages in this process, for deployments without workers
+        content_hash = await self.begin(document_id, content_hash, force)
+        if content_hash is None:
+            return
+        await self.extract(document_id, content_hash)
+        await self.chunk(document_id, content_hash)
+        await self.embed(document_id, content_hash)
+        await self.index(document_id, content_hash)
+
+    async def begin(
+        self,
+        document_id: str,
+        content_hash: Optional[str] = None,
+        force: bool = False,
+    ) -> Optional[str]:
+        # Returns the hash of the file to index, or None if there is nothing
+        # to do; force re-indexes even if the file is unchanged since the
+        # last successful run
+        document = self._document(document_id)
+        if document is None:
+            return None
+        if not self.blobs.exists(document.content_hash):
+            await self._adopt_file(document)
+        if content_hash is not None and content_hash != document.content_hash:
+            # Superseded by a newer upload, which has a run of its own
+            return None
+        content_hash = document.content_hash
+        if not force and document.processed_at is not None:
+            # Same bytes as the last successful run: nothing to re-index
+            document.status = "ready"
+            self.db.commit()
+            return None
+        if not force and await self.reuse(document):
+            return None
+        if force:
+            # Stage outputs from an earlier run of the same file are reused
+            # unless a full re-index was asked for
+            shutil.rmtree(self.work_dir(document_id, content_hash), ignore_errors=True)
+        os.makedirs(self.work_dir(document_id, content_hash), exist_ok=True)
+        return content_hash
+
+    async def reuse(self, document: Document) -> bool:
+        # Another document with the same bytes is already indexed: copy its
+        # chunks with their embeddings, its text, summary and tags, instead
+        # of extracting and embedding the file again
+        source = self.db.query(Document).filter(
+            Document.content_hash == document.content_hash,
+            Document.id != document.id,
+            Document.status == "ready",
+            Document.processed_at.isnot(None),
+            Document.chunk_count > 0,
+        ).first()
+        if source is None:
+            return False
+
+        await self.vector_store.initialize()
+        ids = [self.vector_store.chunk_id(source.id, index) for index in range(source.chunk_count)]
+        stored = await self.vector_store.get_chunks(ids)
+        if len(stored) != len(ids) or any(
+            item["metadata"].get("embedding_model") != self.vector_store.llm.embedding_model
+            for item in stored
+        ):
+            # Incomplete, or embedded with another model: index from scratch
+            return False
+
+        document.status = "indexing"
+        self.db.commit()
+        metadata = self._metadata(document)
+        for start in range(0, len(ids), settings.CHUNK_INSERT_BATCH):
+            items = await self.vector_store.get_chunks(
+                ids[start:start + settings.CHUNK_INSERT_BATCH],
+                include_embeddings=True,
+            )
+            await self.vector_store.add_chunks(
+                document.id,
+                [
+                    Chunk(
+                        index=item["metadata"]["chunk_index"],
+                        text=item["content"],
+                        start=item["metadata"]["start"],
+                        end=item["metadata"]["end"],
+                    )
+                    for item in items
+                ],
+                metadata,
+                [item["embedding"] for item in items],
+            )
+        previous_chunk_count = document.chunk_count or 0
+        if previous_chunk_count > source.chunk_count:
+            await self.vector_store.delete_chunks(document.id, source.chunk_count, previous_chunk_count)
+
+        if source.content is not None:
+            await self._count_terms(document, await run_in_thread_pool(document_terms, source.content))
+        document.status = "ready"
+        document.processed_at = datetime.now()
+        document.content = source.content
+        document.summary = source.summary
+        document.tags = source.tags
+        document.embedding_id = document.id
+        document.chunk_count = source.chunk_count
+        self.db.commit()
+        logger.info(f"Indexed document {document.id} from identical document {source.id}")
+
+        await publish_document_indexed(document.id)
+        return True
+
+    async def extract(self, document_id: str, content_hash: str) -> bool:
+        document = self._start(document_id, content_hash, "extracting")
+        if document is None:
+            return False
+        path = self.text_path(document_id, content_hash)
+        if not os.path.exists(path):
+            # Parsing runs in the extraction process pool, which writes into
+            # the work directory so the output is published by a rename
+            partial = await get_extraction_engine().extract(
+                self.blobs.document_path(document),
+                document.type,
+                document.name,
+                output_dir=self.work_dir(document_id, content_hash),
+            )
+            try:
+                await run_in_thread_pool(os.replace, partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        return True
+
+    def extract_inline(self, document_id: str, content_hash: str) -> bool:
+        # Extraction in the calling process (a Celery worker, which is
+        # already isolated from the API); must run on the main thread, where
+        # the time limit's signal is delivered
+        document = self._start(document_id, content_hash, "extracting")
+        if document is None:
+            return False
+        path = self.text_path(document_id, content_hash)
+        if not os.path.exists(path):
+            partial = f"{path}.{uuid.uuid4()}.part"
+            try:
+                extract_to_file(
+                    self.blobs.document_path(document),
+                    partial,
+                    document.type,
+                    document.name,
+                )
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        return True
+
+    async def chunk(self, document_id: str, content_hash: str) -> bool:
+        if self._start(document_id, content_hash, "chunking") is None:
+            return False
+        path = self.chunks_path(document_id, content_hash)
+        if os.path.exists(path):
+            return True
+
+        chunker = TextChunker()
+        count = 0
+        async with _PublishedFile(path) as output:
+            async for block in self._read_blocks(self.text_path(document_id, content_hash)):
+                for chunk in chunker.feed(block):
+                    await output.write(self._dump_chunk(chunk))
+                    count += 1
+            for chunk in chunker.finish():
+                await output.write(self._dump_chunk(chunk))
+                count += 1
+        logger.info(f"Chunked document {document_id} into {count} chunks")
+        return True
+
+    async def embed(self, document_id: str, content_hash: str) -> bool:
+        document = self._start(document_id, content_hash, "embedding")
+        if document is None:
+            return False
+        path = self.embeddings_path(document_id, content_hash)
+        if os.path.exists(path):
+            return True
+
+        # Nothing is written to the index before this stage completes, so
+        # every stored embedding is still available for reuse here
+        await self.vector_store.initialize()
+        indexer = IncrementalChunkIndexer(self.vector_store, document_id, self._metadata(document))
+        await indexer.load(document.chunk_count or 0)
+        async with _PublishedFile(path) as output:
+            async for batch in self._read_chunks(document_id, content_hash):
+                changed = indexer.changed(batch)
+                if not changed:
+                    continue
+                for chunk, embedding in zip(changed, await indexer.embeddings(changed)):
+                    await output.write(json.dumps({"index": chunk.index, "embedding": embedding}) + "\n")
+        logger.info(
+            f"Embedded document {document_id}: {indexer.embedded} chunks embedded, "
+            f"{indexer.reused} reused, {indexer.skipped} unchanged"
+        )
+        return True
+
+    async def index(self, document_id: str, content_hash: str) -> bool:
+        document = self._start(document_id, content_hash, "indexing")
+        if document is None:
+            return False
+        await self.vector_store.initialize()
+        metadata = self._metadata(document)
+        embeddings = self._read_embeddings(self.embeddings_path(document_id, content_hash))
+        pending: Optional[Tuple[int, List[float]]] = await anext(embeddings, None)
+        chunk_count = 0
+        async for batch in self._read_chunks(document_id, content_hash):
+            chunk_count += len(batch)
+            changed = []
+            changed_embeddings = []
+            for chunk in batch:
+                if pending is not None and pending[0] == chunk.index:
+                    changed.append(chunk)
+                    changed_embeddings.append(pending[1])
+                    pending = await anext(embeddings, None)
+            if changed:
+                await self.vector_store.add_chunks(
+                    document_id,
+                    changed,
+                    metadata,
+                    changed_embeddings,
+                )
+
+        # Drop chunks left over from a longer previous version
+        previous_chunk_count = document.chunk_count or 0
+        if previous_chunk_count > chunk_count:
+            await self.vector_store.delete_chunks(document_id, chunk_count, previous_chunk_count)
+
+        text_parts = []
+        text_length = 0
+        async for block in self._read_blocks(self.text_path(document_id, content_hash)):
+            text_parts.append(block[:settings.DOCUMENT_CONTENT_MAX_CHARS - text_length])
+            text_length += len(text_parts[-1])
+            if text_length >= settings.DOCUMENT_CONTENT_MAX_CHARS:
+                break
+        text = "".join(text_parts)
+
+        # Weighted by the corpus as it stands, without this version of the
+        # document; its terms are only counted in the final transaction
+        terms = await run_in_thread_pool(document_terms, text)
+        frequencies, documents = self.corpus.frequencies(terms)
+        analysis = await run_in_thread_pool(self.analyzer.analyze, text, frequencies, documents)
+
+        await self._count_terms(document, terms)
+        document.status = "ready"
+        document.processed_at = datetime.now()
+        document.size = os.path.getsize(self.blobs.document_path(document))
+        document.content = text
+        document.embedding_id = document_id
+        document.chunk_count = chunk_count
+        document.summary = analysis.summary
+        document.tags = analysis.tags
+        self.db.commit()
+        logger.info(f"Indexed document {document_id}: {chunk_count} chunks")
+
+        # Answers citing the previous version of this document are stale
+        await publish_document_indexed(document_id)
+        self._remove_work_dir(document_id, content_hash)
+        return True
+
+    def mark_failed(self, document_id: str, error: Exception):
+        self.db.rollback()
+        document = self._document(document_id)
+        if document is None:
+            return
+        document.status = "error"
+        document.error = str(error)
+        self.db.commit()
+
+    async def _adopt_file(self, document: Document):
+        # Moves a file stored before content addressing into the blob store
+        path = self.blobs.document_path(document)
+        content_hash = await self.hash_file(path)
+        if document.content_hash != content_hash:
+            document.processed_at = None
+        self.blobs.put(path, content_hash)
+        document.content_hash = content_hash
+        self.db.commit()
+
+    async def hash_file(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        async with aiofiles.open(file_path, 'rb') as f:
+            while True:
+                block = await f.read(settings.TEXT_READ_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+        return digest.hexdigest()
+
+    async def _count_terms(self, document: Document, terms: Set[str]):
+        # Replaces the document's previous terms in the corpus statistics; a
+        # document has been counted once it has content
+        previous = None
+        if document.content is not None:
+            previous = await run_in_thread_pool(document_terms, document.content)
+        self.corpus.update_document(previous, terms)
+
+    def _document(self, document_id: str) -> Optional[Document]:
+        # None once the document is gone or queued for deletion, which ends
+        # the run at the next stage
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if document is None or document.status == "deleting":
+            return None
+        return document
+
+    def _start(self, document_id: str, content_hash: str, status: str) -> Optional[Document]:
+        # A run whose work directory is gone has already been indexed (this
+        # is a re-delivered stage) or was superseded by a newer file
+        if not os.path.isdir(self.work_dir(document_id, content_hash)):
+            return None
+        document = self._document(document_id)
+        if document is not None and document.content_hash != content_hash:
+            # The file was replaced while this run was in flight; the run
+            # for the new file owns the document now
+            self._remove_work_dir(document_id, content_hash)
+            return None
+        if document is not None:
+            document.status = status
+            document.error = None
+            self.db.commit()
+        return document
+
+    def _metadata(self, document: Document) -> dict:
+        return {"name": document.name, "type": document.type}
+
+    async def _read_blocks(self, path: str) -> AsyncIterator[str]:
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            while True:
+                block = await f.read(settings.TEXT_READ_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
+
+    async def _read_chunks(self, document_id: str, content_hash: str) -> AsyncIterator[List[Chunk]]:
+        batch: List[Chunk] = []
+        async with aiofiles.open(self.chunks_path(document_id, content_hash), 'r', encoding='utf-8') as f:
+            async for line in f:
+                batch.append(Chunk(**json.loads(line)))
+                if len(batch) >= settings.CHUNK_INSERT_BATCH:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    async def _read_embeddings(self, path: str) -> AsyncIterator[Tuple[int, List[float]]]:
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            async for line in f:
+                item = json.loads(line)
+                yield item["index"], item["embedding"]
+
+    def _remove_work_dir(self, document_id: str, content_hash: str):
+        shutil.rmtree(self.work_dir(document_id, content_hash), ignore_errors=True)
+        try:
+            # Only if no other run of this document is in flight
+            os.rmdir(self.work_dir(document_id))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _dump_chunk(chunk: Chunk) -> str:
+        return json.dumps({
+            "index": chunk.index,
+            "text": chunk.text,
+            "start": chunk.start,
+            "end": chunk.end,
+        }) + "\n"
+
+# Written under a temporary name and renamed into place on success, so a
+# stage's output exists only once it is complete
+class _PublishedFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.partial = f"{path}.{uuid.uuid4()}.part"
+        self._file = None
+
+    async def __aenter__(self):
+        self._file = await aiofiles.open(self.partial, 'w', encoding='utf-8')
+        return self._file
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self._file.close()
+        if exc_type is None:
+            os.replace(self.partial, self.path)
+        else:
+            os.remove(self.partial)
+
+def enqueue_ingestion(document_id: str, content_hash: Optional[str] = None, force: bool = False):
+    # Extract and chunk run on main-queue, embed and index on their own
+    # queues, so each stage is scaled by the workers consuming its queue
+    job = {"document_id": document_id, "content_hash": content_hash, "force": force}
+    chain(
+        celery_app.signature("app.worker.extract_document", args=(job,)),
+        celery_app.signature("app.worker.chunk_document"),
+        celery_app.signature("app.worker.embed_document"),
+        celery_app.signature("app.worker.index_document"),
+    ).apply_async()
+
+async def ingest_in_background(document_id: str, content_hash: Optional[str] = None, force: bool = False):
+    # Runs after the response is sent, so it uses its own session rather
+    # than the request's
+    db = SessionLocal()
+    pipeline = IngestionPipeline(db)
+    try:
+        await pipeline.run(document_id, content_hash, force)
+    except Exception as e:
+        pipeline.mark_failed(document_id, e)
+        logger.warning(f"Failed to ingest document {document_id}: {str(e)}")
+    finally:
+        db.close()
+
+async def schedule_ingestion(
+    background_tasks: BackgroundTasks,
+    document_id: str,
+    content_hash: Optional[str] = None,
+    force: bool = False,
+):
+    if settings.INGESTION_CELERY:
+        # Publishing to the broker is blocking I/O
+        await run_in_thread_pool(enqueue_ingestion, document_id, content_hash, force)
+    else:
+        background_tasks.add_task(ingest_in_background, document_id, content_hash, force)
+
+async def ingest_batch_in_background(jobs: List[Tuple[str, str]]):
+    # A bounded number of documents at a time, so a large import cannot
+    # monopolize the API process; the embedding requests of the documents
+    # in flight are still batched together
+    semaphore = asyncio.Semaphore(settings.BULK_INGEST_CONCURRENCY)
+
+    async def ingest(document_id: str, content_hash: str):
+        async with semaphore:
+            await ingest_in_background(document_id, content_hash)
+
+    await asyncio.gather(*(ingest(document_id, content_hash) for document_id, content_hash in jobs))
+
+def enqueue_ingestion_batch(jobs: List[Tuple[str, str]]):
+    # The workers' queues bound how many documents are processed at once
+    for document_id, content_hash in jobs:
+        enqueue_ingestion(document_id, content_hash)
+
+async def schedule_batch_ingestion(background_tasks: BackgroundTasks, jobs: List[Tuple[str, str]]):
+    if settings.INGESTION_CELERY:
+        await run_in_thread_pool(enqueue_ingestion_batch, jobs)
+    else:
+        background_tasks.add_task(ingest_batch_in_background, jobs)
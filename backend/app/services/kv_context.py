@@ -0,0 +1,84 @@
+from typing import List, Optional
+from array import array
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Stores the context token array Ollama returns from /api/generate per chat
+# Context, so the next turn can continue from it instead of re-sending (and
+# re-prefilling) the whole conversation.
+class KVContextStore:
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: int = settings.KV_CONTEXT_TTL,
+        max_tokens: int = settings.KV_CONTEXT_MAX_TOKENS,
+    ):
+        self.redis = redis or get_redis_client()
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+
+    async def get(
+        self,
+        context_id: str,
+        model: str,
+        message_id: Optional[str],
+    ) -> Optional[List[int]]:
+        # message_id is the newest message the caller has seen in the
+        # conversation; state recorded for any other message is stale.
+        try:
+            state = await self.redis.hgetall(self._key(context_id))
+        except RedisError as e:
+            logger.warning(f"KV context lookup failed: {str(e)}")
+            return None
+        if not state:
+            return None
+
+        if (
+            state.get(b"model", b"").decode() != model
+            or state.get(b"message_id", b"").decode() != message_id
+        ):
+            await self.delete(context_id)
+            return None
+        return array("i", state[b"tokens"]).tolist()
+
+    async def set(
+        self,
+        context_id: str,
+        model: str,
+        message_id: str,
+        tokens: List[int],
+    ):
+        # Oversized state is dropped; the next turn falls back to the
+        # token-budgeted prompt, which starts a fresh, shorter context.
+        if not tokens or len(tokens) > self.max_tokens:
+            await self.delete(context_id)
+            return
+
+        key = self._key(context_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={
+                    "model": model,
+                    "message_id": message_id,
+                    "tokens": array("i", tokens).tobytes(),
+                })
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"KV context store failed: {str(e)}")
+
+    async def delete(self, context_id: str):
+        try:
+            await self.redis.delete(self._key(context_id))
+        except RedisError as e:
+            logger.warning(f"KV context delete failed: {str(e)}")
+
+    def _key(self, context_id: str) -> str:
+        return f"kv_context:{context_id}"
@@ -0,0 +1,153 @@
+from typing import List, Optional, Set, Tuple
+import os
+import re
+import sqlite3
+import threading
+
+from app.core.config import settings
+
+SQL_BATCH = 500
+
+# Hyphens and underscores are part of tokens so identifiers such as part
+# numbers ("AB-1042") and error codes ("E_TIMEOUT") match exactly.
+TOKEN = re.compile(r"[\w\-]+", re.UNICODE)
+
+# BM25-ranked inverted index over chunk text, backed by SQLite FTS5. FTS5
+# keeps delta-encoded postings in b-tree segments that are merged
+# incrementally, so inserts and deletes stay cheap at millions of chunks.
+class LexicalIndex:
+    def __init__(self, path: str = settings.LEXICAL_INDEX_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                "content, tokenize = \"unicode61 tokenchars '-_'\")"
+            )
+            # chunk id -> FTS rowid, so deletes never scan the FTS table
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL, document_id TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_chunks_document_id ON chunks (document_id)"
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+
+    def add(self, items: List[Tuple[str, str, str]]):
+        # items are (chunk_id, document_id, text); existing ids are replaced
+        self.open()
+        with self._lock:
+            self._delete_locked([chunk_id for chunk_id, _, _ in items])
+            for chunk_id, document_id, text in items:
+                cursor = self._db.execute(
+                    "INSERT INTO chunks_fts (content) VALUES (?)", (text,)
+                )
+                self._db.execute(
+                    "INSERT INTO chunks (id, fts_rowid, document_id) VALUES (?, ?, ?)",
+                    (chunk_id, cursor.lastrowid, document_id),
+                )
+            self._db.commit()
+
+    def delete(self, chunk_ids: List[str]):
+        self.open()
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            self._db.commit()
+
+    def delete_documents(self, document_ids: List[str]):
+        self.open()
+        with self._lock:
+            chunk_ids = []
+            for batch in self._batches(document_ids):
+                chunk_ids.extend(
+                    id for (id,) in self._db.execute(
+                        "SELECT id FROM chunks "
+                        f"WHERE document_id IN ({','.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+            self._delete_locked(chunk_ids)
+            self._db.commit()
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[dict]:
+        terms = TOKEN.findall(query.lower())
+        if not terms:
+            return []
+        # Quote every term so user input can never be parsed as FTS5 syntax
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in dict.fromkeys(terms))
+        scope = ""
+        params = [match]
+        if document_ids is not None:
+            scope = f" AND c.document_id IN ({','.join('?' * len(document_ids))})"
+            params.extend(document_ids)
+        self.open()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.id, c.document_id, f.content, bm25(chunks_fts) AS rank "
+                "FROM chunks_fts f JOIN chunks c ON c.fts_rowid = f.rowid "
+                f"WHERE chunks_fts MATCH ?{scope} ORDER BY rank LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        # FTS5's bm25() is negated so that smaller is better
+        return [
+            {"id": id, "document_id": document_id, "content": content, "score": -rank}
+            for id, document_id, content, rank in rows
+        ]
+
+    def document_ids(self) -> Set[str]:
+        self.open()
+        with self._lock:
+            return {
+                document_id
+                for (document_id,) in self._db.execute("SELECT DISTINCT document_id FROM chunks")
+            }
+
+    def optimize(self):
+        # Merges all postings segments into one; worth running after bulk loads
+        self.open()
+        with self._lock:
+            self._db.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+            self._db.commit()
+
+    def _delete_locked(self, chunk_ids: List[str]):
+        for batch in self._batches(chunk_ids):
+            placeholders = ','.join('?' * len(batch))
+            self._db.execute(
+                "DELETE FROM chunks_fts WHERE rowid IN "
+                f"(SELECT fts_rowid FROM chunks WHERE id IN ({placeholders}))",
+                batch,
+            )
+            self._db.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+
+    @staticmethod
+    def _batches(values: list) -> List[list]:
+        values = list(values)
+        return [values[i:i + SQL_BATCH] for i in range(0, len(values), SQL_BATCH)]
+
+_lexical_index: Optional[LexicalIndex] = None
+
+def get_lexical_index() -> LexicalIndex:
+    global _lexical_index
+    if _lexical_index is None:
+        _lexical_index = LexicalIndex()
+    return _lexical_index
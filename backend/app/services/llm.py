@@ -1,41 +1,188 @@
-from typing import Optional
-import httpx
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import aclosing
+import asyncio
+import hashlib
+import json
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import get_embedding_cache
+from app.services.scheduler import Priority, get_scheduler
+from app.services.single_flight import SingleFlight
+
+# Per-(model, priority) coalescers shared by every LLMService instance
+_embedding_batchers: Dict[Tuple[str, Priority], EmbeddingBatcher] = {}
+
+# In-flight generations, keyed on (model, prompt, context)
+_generations: SingleFlight[dict] = SingleFlight()
 
 class LLMService:
-    def __init__(self):
+    def __init__(self, priority: Priority = Priority.INTERACTIVE):
         self.base_url = settings.OLLAMA_HOST
         self.default_model = settings.DEFAULT_MODEL
+        self.embedding_model = settings.EMBEDDING_MODEL or settings.DEFAULT_MODEL
+        self.priority = priority
 
     async def generate_response(
         self,
         prompt: str,
-        context: Optional[str] = None,
+        context: Optional[List[int]] = None,
         model: Optional[str] = None,
+        priority: Optional[Priority] = None,
     ) -> str:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        result = await self.generate(prompt, context, model, priority)
+        return result["response"]
+
+    async def generate(
+        self,
+        prompt: str,
+        context: Optional[List[int]] = None,
+        model: Optional[str] = None,
+        priority: Optional[Priority] = None,
+    ) -> dict:
+        # Returns Ollama's final chunk with the full response text, including
+        # the "context" token array that can continue this conversation.
+        tokens = []
+        result = {}
+        async with aclosing(
+            self.stream_response(prompt, context, model, priority)
+        ) as chunks:
+            async for chunk in chunks:
+                tokens.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    result = chunk
+        return {**result, "response": "".join(tokens)}
+
+    async def stream_response(
+        self,
+        prompt: str,
+        context: Optional[List[int]] = None,
+        model: Optional[str] = None,
+        priority: Optional[Priority] = None,
+    ) -> AsyncIterator[dict]:
+        # Identical concurrent requests share one upstream generation; each
+        # caller receives every chunk, including ones produced before it
+        # joined.
+        payload = {
+            "model": model or self.default_model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        }
+        if context:
+            payload["context"] = context
+        key = hashlib.sha256(
+            json.dumps([payload["model"], prompt, context], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        priority = self.priority if priority is None else priority
+        async with aclosing(
+            _generations.subscribe(key, lambda: self._stream_generate(payload, priority))
+        ) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def _stream_generate(
+        self,
+        payload: dict,
+        priority: Priority,
+    ) -> AsyncIterator[dict]:
+        # Yields Ollama's NDJSON chunks as they arrive. Closing the generator
+        # closes the upstream response, which aborts the generation.
+        async with get_scheduler().slot(payload["model"], priority):
+            async with get_http_client().stream(
+                "POST",
                 f"{self.base_url}/api/generate",
+                json=payload,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise ValueError(data["error"])
+                    yield data
+                    if data.get("done"):
+                        break
+
+    async def generate_embedding(self, text: str) -> list[float]:
+        cache = get_embedding_cache()
+        embedding = await cache.get(self.embedding_model, text)
+        if embedding is not None:
+            return embedding
+
+        # Concurrent callers are coalesced into one batched request
+        embedding = await self._get_batcher(self.embedding_model, self.priority).embed(text)
+        await cache.set(self.embedding_model, text, embedding)
+        return embedding
+
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        cache = get_embedding_cache()
+        unique = list(dict.fromkeys(texts))
+        embeddings: Dict[str, List[float]] = {}
+        missing = []
+        for text, embedding in zip(unique, await cache.get_many(self.embedding_model, unique)):
+            if embedding is None:
+                missing.append(text)
+            else:
+                embeddings[text] = embedding
+
+        # Misses go through the shared batcher: full batches are sent right
+        # away and the remainder is topped up with texts from concurrent
+        # callers (e.g. other documents being ingested by the same worker)
+        batcher = self._get_batcher(self.embedding_model, self.priority)
+        computed = await asyncio.gather(*(batcher.embed(text) for text in missing))
+        await cache.set_many(self.embedding_model, dict(zip(missing, computed)))
+        embeddings.update(zip(missing, computed))
+
+        return [embeddings[text] for text in texts]
+
+    async def _request_embeddings(
+        self,
+        texts: List[str],
+        model: str,
+        priority: Priority,
+    ) -> List[List[float]]:
+        async with get_scheduler().slot(model, priority):
+            response = await get_http_client().post(
+                f"{self.base_url}/api/embed",
                 json={
-                    "model": model or self.default_model,
-                    "prompt": prompt,
-                    "context": context,
-                    "stream": False,
+                    "model": model,
+                    "input": texts,
+                    "keep_alive": settings.OLLAMA_KEEP_ALIVE,
                 },
             )
             response.raise_for_status()
             data = response.json()
-            return data["response"]
+            return data["embeddings"]
 
-    async def generate_embedding(self, text: str) -> list[float]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/embeddings",
-                json={
-                    "model": self.default_model,
-                    "prompt": text,
-                },
+    def _get_batcher(self, model: str, priority: Priority) -> EmbeddingBatcher:
+        key = (model, priority)
+        if key not in _embedding_batchers:
+            _embedding_batchers[key] = EmbeddingBatcher(
+                lambda texts: self._request_embeddings(texts, model, priority),
+                max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+                max_wait=settings.EMBEDDING_BATCH_WAIT_MS / 1000,
+            )
+        return _embedding_batchers[key]
+
+    async def load_model(self, model: str, embedding: bool = False):
+        # Ollama loads a model on any request; an empty generate prompt (or a
+        # tiny embed input for embedding models) does nothing else.
+        if embedding:
+            path, payload = "/api/embed", {"model": model, "input": "warm-up"}
+        else:
+            path, payload = "/api/generate", {"model": model}
+        async with get_scheduler().slot(model, Priority.BACKGROUND):
+            response = await get_http_client().post(
+                f"{self.base_url}{path}",
+                json={**payload, "keep_alive": settings.OLLAMA_KEEP_ALIVE},
+                timeout=settings.OLLAMA_LOAD_TIMEOUT,
             )
             response.raise_for_status()
-            data = response.json()
-            return data["embedding"]
\ No newline at end of file
+
+    async def list_loaded_models(self) -> List[dict]:
+        response = await get_http_client().get(f"{self.base_url}/api/ps")
+        response.raise_for_status()
+        data = response.json()
+        return data.get("models", [])
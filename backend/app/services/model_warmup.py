@@ -0,0 +1,71 @@
+from typing import Dict, Optional
+from datetime import datetime
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.llm import LLMService
+
+logger = logging.getLogger(__name__)
+
+# Preloads the configured chat and embedding models at startup and re-touches
+# them periodically so Ollama's keep_alive never expires between requests.
+class ModelWarmupService:
+    def __init__(self, llm: Optional[LLMService] = None):
+        self.llm = llm or LLMService()
+        self.models: Dict[str, dict] = {
+            model: {"state": "pending", "loaded": False}
+            for model in self._configured_models()
+        }
+        self.last_run: Optional[datetime] = None
+
+    async def warm_up(self):
+        for model, embedding in self._configured_models().items():
+            state = self.models[model]
+            if not state["loaded"]:
+                state["state"] = "loading"
+            try:
+                await self.llm.load_model(model, embedding=embedding)
+                state.update(state="ready", error=None)
+            except Exception as e:
+                logger.warning(f"Failed to warm up model {model}: {str(e)}")
+                state.update(state="error", error=str(e))
+
+        try:
+            loaded = {m["name"]: m for m in await self.llm.list_loaded_models()}
+        except Exception as e:
+            logger.warning(f"Failed to list loaded models: {str(e)}")
+            loaded = None
+        if loaded is not None:
+            for model, state in self.models.items():
+                info = loaded.get(model) or loaded.get(f"{model}:latest")
+                state["loaded"] = info is not None
+                state["expires_at"] = info.get("expires_at") if info else None
+
+        self.last_run = datetime.now()
+
+    async def run(self):
+        while True:
+            await self.warm_up()
+            await asyncio.sleep(settings.MODEL_WARMUP_INTERVAL)
+
+    def status(self) -> dict:
+        return {
+            "ready": all(state["state"] == "ready" for state in self.models.values()),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "models": self.models,
+        }
+
+    def _configured_models(self) -> Dict[str, bool]:
+        # model name -> whether it is only used for embeddings
+        models = {self.llm.embedding_model: True}
+        models[self.llm.default_model] = False
+        return models
+
+_model_warmup: Optional[ModelWarmupService] = None
+
+def get_model_warmup() -> ModelWarmupService:
+    global _model_warmup
+    if _model_warmup is None:
+        _model_warmup = ModelWarmupService()
+    return _model_warmup
@@ -0,0 +1,37 @@
+from typing import List
+
+import numpy as np
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def maximal_marginal_relevance(
+    embeddings: List[List[float]],
+    relevance: List[float],
+    k: int,
+    lambda_mult: float = 0.7,
+) -> List[int]:
+    # Returns indexes into embeddings, in selection order. relevance is each
+    # candidate's score for the query on a 0..1 scale (cosine similarity, or
+    # normalized fused scores). All pairwise similarities come from a single
+    # matrix product; the greedy loop then only updates one vector per pick.
+    if not embeddings or k <= 0:
+        return []
+    vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(len(vectors), dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    selected = []
+    for _ in range(min(k, len(vectors))):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = similarity[best] if len(selected) == 1 else np.maximum(redundancy, similarity[best])
+
+    return selected
@@ -0,0 +1,197 @@
+from typing import Dict, Iterable, List, Optional, Set
+from dataclasses import dataclass, field
+from collections import OrderedDict
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.schemas.chat import ChatResponse
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "response-cache:invalidate"
+INVALIDATION_RETRY_DELAY = 5  # seconds before resubscribing after an error
+
+@dataclass
+class _CachedResponse:
+    scope: str
+    embedding: np.ndarray
+    response: ChatResponse
+    document_ids: List[str]
+    created_at: float = field(default_factory=time.monotonic)
+
+class _ScopeIndex:
+    def __init__(self):
+        self.keys: List[str] = []
+        self.matrix: Optional[np.ndarray] = None
+        self.dirty = True
+
+# In-process cache of answered queries, looked up by cosine similarity of the
+# query embedding within a retrieval scope. Every API process has its own;
+# changes to documents reach all of them through publish_invalidation.
+class SemanticResponseCache:
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl: int = settings.SEMANTIC_CACHE_TTL,
+        max_entries: int = settings.SEMANTIC_CACHE_SIZE,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _CachedResponse] = OrderedDict()
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._by_document: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, scope: str, embedding: List[float]) -> Optional[ChatResponse]:
+        index = self._scopes.get(scope)
+        if index is None:
+            self.misses += 1
+            return None
+
+        if index.dirty:
+            index.matrix = np.stack([self._entries[key].embedding for key in index.keys])
+            index.dirty = False
+
+        scores = index.matrix @ self._normalize(embedding)
+        best = int(np.argmax(scores))
+        key = index.keys[best]
+        entry = self._entries[key]
+
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response
+
+    def store(
+        self,
+        scope: str,
+        embedding: List[float],
+        response: ChatResponse,
+    ):
+        key = str(uuid.uuid4())
+        document_ids = response.context_documents or []
+        self._entries[key] = _CachedResponse(
+            scope=scope,
+            embedding=self._normalize(embedding),
+            response=response,
+            document_ids=document_ids,
+        )
+
+        index = self._scopes.setdefault(scope, _ScopeIndex())
+        index.keys.append(key)
+        index.dirty = True
+        for document_id in document_ids:
+            self._by_document.setdefault(document_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_documents(self, document_ids: Iterable[str]):
+        for document_id in document_ids:
+            for key in self._by_document.pop(document_id, set()):
+                self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._scopes.clear()
+        self._by_document.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        index = self._scopes[entry.scope]
+        index.keys.remove(key)
+        index.dirty = True
+        if not index.keys:
+            del self._scopes[entry.scope]
+
+        for document_id in entry.document_ids:
+            keys = self._by_document.get(document_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_document[document_id]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+_response_cache: Optional[SemanticResponseCache] = None
+
+def get_response_cache() -> SemanticResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = SemanticResponseCache()
+    return _response_cache
+
+async def publish_invalidation(document_ids: List[str]):
+    # Answers citing these documents are stale in every API process,
+    # including this one; ingestion workers publish here too
+    if document_ids:
+        await _publish({"documents": list(document_ids)})
+
+async def publish_document_indexed(document_id: str):
+    # New or changed text can answer queries whose cached answers never
+    # cited this document. Working out which scopes it falls into (folders
+    # with their subfolders, tags) is not worth it on every index, so
+    # every cached answer goes.
+    await _publish({"clear": True})
+
+async def _publish(invalidation: dict):
+    try:
+        await get_redis_client().publish(INVALIDATION_CHANNEL, json.dumps(invalidation))
+    except Exception as e:
+        # Stale answers still expire after SEMANTIC_CACHE_TTL
+        logger.warning(f"Failed to publish response cache invalidation: {str(e)}")
+
+def _apply(invalidation: dict):
+    if invalidation.get("clear"):
+        get_response_cache().clear()
+    else:
+        get_response_cache().invalidate_documents(invalidation.get("documents", []))
+
+async def listen_for_invalidations():
+    # Runs for the lifetime of an API process
+    while True:
+        pubsub = get_redis_client().pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Invalidations published while not subscribed are lost
+            get_response_cache().clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _apply(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Response cache invalidation listener failed: {str(e)}")
+            await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+        finally:
+            await pubsub.aclose()
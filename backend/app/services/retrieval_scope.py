@@ -0,0 +1,49 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session
+
+from app.models.document import Document, Folder
+from app.schemas.chat import Message
+
+class RetrievalScopeResolver:
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def is_scoped(message: Message) -> bool:
+        return bool(message.folder_ids or message.document_ids or message.tags)
+
+    @staticmethod
+    def scope_key(message: Message) -> str:
+        # Answers in a conversation depend on its history, so they are only
+        # reused within the same conversation
+        conversation = f"context:{message.context_id}|" if message.context_id else ""
+        if not RetrievalScopeResolver.is_scoped(message):
+            return conversation + ("documents" if message.context_id else "none")
+        return conversation + "|".join([
+            "folders:" + ",".join(sorted(message.folder_ids or [])),
+            "documents:" + ",".join(sorted(message.document_ids or [])),
+            "tags:" + ",".join(sorted(message.tags or [])),
+        ])
+
+    def resolve(self, message: Message) -> Optional[List[str]]:
+        # Ids of the ready documents matching every given filter, or None
+        # when retrieval is not scoped at all. Folders include subfolders.
+        if not self.is_scoped(message):
+            return None
+
+        query = self.db.query(Document.id).filter(Document.status == "ready")
+        if message.folder_ids:
+            folders = select(Folder.id)\
+                .where(Folder.id.in_(message.folder_ids))\
+                .cte("scope_folders", recursive=True)
+            folders = folders.union_all(
+                select(Folder.id).where(Folder.parent_id == folders.c.id)
+            )
+            query = query.filter(Document.folder_id.in_(select(folders.c.id)))
+        if message.document_ids:
+            query = query.filter(Document.id.in_(message.document_ids))
+        if message.tags:
+            query = query.filter(Document.tags.op("&&")(array(message.tags)))
+        return [document_id for (document_id,) in query.all()]
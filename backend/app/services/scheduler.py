@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from enum import IntEnum
+import asyncio
+import heapq
+import itertools
+import time
+
+from app.core.config import settings
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # chat over /ws and /messages
+    BACKGROUND = 1  # conversation summaries, warm-up
+    BULK = 2  # ingestion embeddings
+
+class LLMOverloadedError(Exception):
+    def __init__(self, model: str, priority: Priority, reason: str):
+        super().__init__(f"LLM queue for {model} ({priority.name.lower()}) {reason}")
+        self.model = model
+        self.priority = priority
+        self.retry_after = settings.LLM_RETRY_AFTER
+
+class _ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        # Heap of [priority, sequence, future]; FIFO within a priority
+        self.waiters: List[list] = []
+        self.queued: Dict[Priority, int] = defaultdict(int)
+
+class _WaitStats:
+    def __init__(self):
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+# Admission control in front of Ollama: per-model concurrency limits, strict
+# priority between classes, bounded queues and queue-time accounting. Slots
+# beyond LLM_INTERACTIVE_RESERVED are shared, so bulk work only ever uses
+# capacity interactive traffic is not using.
+class LLMScheduler:
+    def __init__(self):
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._sequence = itertools.count()
+        self._stats: Dict[Priority, _WaitStats] = {p: _WaitStats() for p in Priority}
+        self.queue_sizes = {
+            Priority.INTERACTIVE: settings.LLM_QUEUE_SIZE_INTERACTIVE,
+            Priority.BACKGROUND: settings.LLM_QUEUE_SIZE_BACKGROUND,
+            Priority.BULK: settings.LLM_QUEUE_SIZE_BULK,
+        }
+        self.queue_timeouts = {
+            Priority.INTERACTIVE: settings.LLM_QUEUE_TIMEOUT_INTERACTIVE,
+            Priority.BACKGROUND: settings.LLM_QUEUE_TIMEOUT_BACKGROUND,
+            Priority.BULK: settings.LLM_QUEUE_TIMEOUT_BULK,
+        }
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority = Priority.INTERACTIVE):
+        queue = self._get_queue(model)
+        await self._acquire(queue, model, priority)
+        try:
+            yield
+        finally:
+            queue.running -= 1
+            self._dispatch(queue)
+
+    def stats(self) -> dict:
+        return {
+            "models": {
+                model: {
+                    "running": queue.running,
+                    "limit": queue.limit,
+                    "queued": {p.name.lower(): queue.queued[p] for p in Priority},
+                }
+                for model, queue in self._queues.items()
+            },
+            "priorities": {
+                p.name.lower(): {
+                    "granted": s.granted,
+                    "rejected": s.rejected,
+                    "avg_wait_ms": 1000 * s.total_wait / s.granted if s.granted else 0.0,
+                    "max_wait_ms": 1000 * s.max_wait,
+                }
+                for p, s in self._stats.items()
+            },
+        }
+
+    async def _acquire(self, queue: _ModelQueue, model: str, priority: Priority):
+        stats = self._stats[priority]
+        if queue.queued[priority] >= self.queue_sizes[priority]:
+            stats.rejected += 1
+            raise LLMOverloadedError(model, priority, "is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.waiters, [priority, next(self._sequence), future])
+        queue.queued[priority] += 1
+        enqueued_at = time.monotonic()
+        try:
+            self._dispatch(queue)
+            if not future.done():
+                async with asyncio.timeout(self.queue_timeouts[priority]):
+                    await future
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted while we were being cancelled
+                queue.running -= 1
+                self._dispatch(queue)
+            future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                stats.rejected += 1
+                raise LLMOverloadedError(model, priority, "wait timed out") from e
+            raise
+        finally:
+            queue.queued[priority] -= 1
+
+        waited = time.monotonic() - enqueued_at
+        stats.granted += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+    def _dispatch(self, queue: _ModelQueue):
+        while queue.waiters:
+            priority, _, future = queue.waiters[0]
+            if future.done():
+                heapq.heappop(queue.waiters)
+                continue
+            if queue.running >= self._capacity(queue, priority):
+                break
+            heapq.heappop(queue.waiters)
+            queue.running += 1
+            future.set_result(None)
+
+    def _capacity(self, queue: _ModelQueue, priority: Priority) -> int:
+        if priority == Priority.INTERACTIVE:
+            return queue.limit
+        return max(1, queue.limit - settings.LLM_INTERACTIVE_RESERVED)
+
+    def _get_queue(self, model: str) -> _ModelQueue:
+        if model not in self._queues:
+            self._queues[model] = _ModelQueue(
+                settings.LLM_MODEL_CONCURRENCY.get(model, settings.OLLAMA_MAX_CONCURRENT_REQUESTS)
+            )
+        return self._queues[model]
+
+_scheduler: Optional[LLMScheduler] = None
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
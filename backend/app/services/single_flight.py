@@ -0,0 +1,78 @@
+from typing import AsyncIterator, Callable, Dict, Generic, List, Optional, TypeVar
+from contextlib import aclosing
+import asyncio
+
+T = TypeVar("T")
+
+class _Flight(Generic[T]):
+    def __init__(self, source: AsyncIterator[T]):
+        self.items: List[T] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[T]):
+        try:
+            async with aclosing(source):
+                async for item in source:
+                    self.items.append(item)
+                    self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def replay(self) -> AsyncIterator[T]:
+        # Late subscribers first receive everything produced so far
+        position = 0
+        while True:
+            if position < len(self.items):
+                yield self.items[position]
+                position += 1
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+# Shares one upstream async iterator between all concurrent callers using the
+# same key. The upstream is cancelled once its last subscriber goes away.
+class SingleFlight(Generic[T]):
+    def __init__(self):
+        self._flights: Dict[str, _Flight[T]] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def subscribe(
+        self,
+        key: str,
+        start: Callable[[], AsyncIterator[T]],
+    ) -> AsyncIterator[T]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(start())
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.subscribers += 1
+        try:
+            async for item in flight.replay():
+                yield item
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight[T]):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
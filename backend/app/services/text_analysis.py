@@ -0,0 +1,217 @@
+from typing import Dict, List, Sequence, Set, Tuple
+from collections import Counter
+from dataclasses import dataclass
+import re
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.chunker import BOUNDARY
+
+# Letters first, then letters/digits with inner apostrophes or hyphens
+TOKEN = re.compile(r"[^\W\d_](?:[\w'-]*[^\W_])?")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be
+because been before being below between both but by can cannot could did do
+does doing don't down during each either etc few for from further get gets got
+had has have having he her here hers herself him himself his how however i if
+in into is isn't it it's its itself just let like made make many may me might
+more most much must my myself neither no nor not now of off often on once one
+only or other others otherwise our ours ourselves out over own per rather same
+see seen shall she should since so some such than that that's the their theirs
+them themselves then there these they this those though through thus to too
+two under until up upon us use used using very via was wasn't way we well were
+what when where whether which while who whom whose why will with within
+without would yet you your yours yourself yourselves
+""".split())
+
+DAMPING = 0.85  # TextRank random-jump probability is 1 - DAMPING
+TEXTRANK_ITERATIONS = 50
+TEXTRANK_TOLERANCE = 1e-6
+MIN_SENTENCE_TERMS = 4  # shorter units (headings, list fragments) are not summary candidates
+
+@dataclass
+class TextAnalysis:
+    summary: str
+    tags: List[str]
+
+def tokenize(text: str) -> List[str]:
+    # Lower-cased content words, stopwords and one- or two-letter tokens dropped
+    return [
+        token for token in TOKEN.findall(text.lower())
+        if len(token) > 2 and token not in STOPWORDS
+    ]
+
+def document_terms(text: str) -> Set[str]:
+    # The terms a document contributes to the corpus document frequencies
+    return set(tokenize(text[:settings.TEXT_ANALYSIS_MAX_CHARS]))
+
+def split_sentences(text: str) -> List[str]:
+    # Same unit boundaries as the chunker
+    sentences = []
+    start = 0
+    for match in BOUNDARY.finditer(text):
+        sentence = " ".join(text[start:match.start()].split())
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    sentence = " ".join(text[start:].split())
+    if sentence:
+        sentences.append(sentence)
+    return sentences
+
+def idf(document_counts: np.ndarray, documents: int) -> np.ndarray:
+    # Smoothed, so terms unseen by the corpus still get a finite weight
+    return np.log((1 + documents) / (1 + document_counts)) + 1
+
+# Extractive summaries (TextRank over TF-IDF sentence vectors) and keyword
+# tags (TF-IDF over terms and adjacent-term phrases) for one document,
+# weighted by corpus document frequencies. Only the first
+# TEXT_ANALYSIS_MAX_CHARS characters of a document are analyzed.
+class TextAnalyzer:
+    def __init__(
+        self,
+        summary_sentences: int = settings.SUMMARY_SENTENCES,
+        summary_max_chars: int = settings.SUMMARY_MAX_CHARS,
+        max_sentences: int = settings.SUMMARY_MAX_SENTENCES,
+        tags: int = settings.DOCUMENT_TAGS,
+    ):
+        self.summary_sentences = summary_sentences
+        self.summary_max_chars = summary_max_chars
+        self.max_sentences = max_sentences
+        self.tags = tags
+
+    def analyze(self, text: str, document_frequencies: Dict[str, int], documents: int) -> TextAnalysis:
+        text = text[:settings.TEXT_ANALYSIS_MAX_CHARS]
+        sentences = split_sentences(text)[:self.max_sentences]
+        sentence_terms = [tokenize(sentence) for sentence in sentences]
+
+        vocabulary: Dict[str, int] = {}
+        for terms in sentence_terms:
+            for term in terms:
+                vocabulary.setdefault(term, len(vocabulary))
+        if not vocabulary:
+            return TextAnalysis(summary=self._truncate(" ".join(sentences)), tags=[])
+        weights = idf(
+            np.array([document_frequencies.get(term, 0) for term in vocabulary], dtype=np.float32),
+            documents,
+        ).astype(np.float32)
+
+        return TextAnalysis(
+            summary=self._summarize(sentences, sentence_terms, vocabulary, weights),
+            tags=self._tag(sentence_terms, vocabulary, weights),
+        )
+
+    def _summarize(
+        self,
+        sentences: List[str],
+        sentence_terms: List[List[str]],
+        vocabulary: Dict[str, int],
+        weights: np.ndarray,
+    ) -> str:
+        candidates = [i for i, terms in enumerate(sentence_terms) if len(terms) >= MIN_SENTENCE_TERMS]
+        if len(candidates) <= self.summary_sentences:
+            return self._join([sentences[i] for i in candidates] or sentences[:self.summary_sentences])
+
+        # Sentence x term TF-IDF matrix, built from (row, column) pairs
+        rows = np.concatenate([
+            np.full(len(sentence_terms[i]), row, dtype=np.int32)
+            for row, i in enumerate(candidates)
+        ])
+        columns = np.fromiter(
+            (vocabulary[term] for i in candidates for term in sentence_terms[i]),
+            dtype=np.int32,
+            count=len(rows),
+        )
+        # Term frequency per (sentence, term) pair
+        width = len(vocabulary)
+        keys, frequencies = np.unique(rows.astype(np.int64) * width + columns, return_counts=True)
+        rows, columns = keys // width, keys % width
+        values = frequencies * weights[columns]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(candidates)))
+
+        # Terms in a single sentence add nothing to any similarity; dropping
+        # them (after computing the norms) keeps the matrix narrow
+        shared = np.bincount(columns, minlength=width) > 1
+        keep = shared[columns]
+        compact = np.cumsum(shared) - 1
+        matrix = np.zeros((len(candidates), int(shared.sum())), dtype=np.float32)
+        matrix[rows[keep], compact[columns[keep]]] = values[keep] / norms[rows[keep]]
+
+        scores = textrank(matrix @ matrix.T)
+        # Ties (e.g. no shared terms at all) go to the earlier sentence
+        order = np.lexsort((np.arange(len(candidates)), -scores))
+        selected = sorted(candidates[i] for i in order[:self.summary_sentences])
+        return self._join([sentences[i] for i in selected])
+
+    def _tag(
+        self,
+        sentence_terms: List[List[str]],
+        vocabulary: Dict[str, int],
+        weights: np.ndarray,
+    ) -> List[str]:
+        terms = Counter(term for terms in sentence_terms for term in terms)
+        # Phrases: adjacent content words within a sentence, seen at least twice
+        phrases = Counter(
+            (first, second)
+            for terms in sentence_terms
+            for first, second in zip(terms, terms[1:])
+            if first != second
+        )
+
+        index = np.fromiter((vocabulary[term] for term in terms), dtype=np.int32, count=len(terms))
+        frequencies = np.fromiter(terms.values(), dtype=np.float32, count=len(terms))
+        # Sublinear term frequency, so one repeated word does not crowd out
+        # the rest
+        scores = (1 + np.log(frequencies)) * weights[index]
+        candidates: List[Tuple[float, str]] = list(zip(scores.tolist(), terms))
+
+        repeated = [(pair, count) for pair, count in phrases.items() if count > 1]
+        if repeated:
+            first = np.fromiter((vocabulary[pair[0]] for pair, _ in repeated), dtype=np.int32)
+            second = np.fromiter((vocabulary[pair[1]] for pair, _ in repeated), dtype=np.int32)
+            counts = np.fromiter((count for _, count in repeated), dtype=np.float32)
+            phrase_scores = (1 + np.log(counts)) * (weights[first] + weights[second])
+            candidates.extend(
+                (score, f"{pair[0]} {pair[1]}")
+                for score, (pair, _) in zip(phrase_scores.tolist(), repeated)
+            )
+
+        tags = []
+        covered: Set[str] = set()
+        for _, tag in sorted(candidates, key=lambda candidate: (-candidate[0], candidate[1])):
+            # Words already part of a chosen phrase are not repeated
+            words = tag.split(" ")
+            if len(words) == 1 and tag in covered:
+                continue
+            tags.append(tag)
+            covered.update(words)
+            if len(tags) == self.tags:
+                break
+        return tags
+
+    def _join(self, sentences: Sequence[str]) -> str:
+        return self._truncate(" ".join(sentences))
+
+    def _truncate(self, text: str) -> str:
+        if len(text) <= self.summary_max_chars:
+            return text
+        cut = text[:self.summary_max_chars].rsplit(" ", 1)[0]
+        return cut + "..."
+
+def textrank(similarity: np.ndarray) -> np.ndarray:
+    # PageRank by power iteration over the sentence similarity graph
+    n = len(similarity)
+    similarity = similarity.copy()
+    np.fill_diagonal(similarity, 0.0)
+    totals = similarity.sum(axis=1)
+    totals[totals == 0] = 1.0
+    transition = (similarity / totals[:, None]).T
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(TEXTRANK_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * (transition @ scores)
+        if np.abs(updated - scores).sum() < TEXTRANK_TOLERANCE:
+            return updated
+        scores = updated
+    return scores
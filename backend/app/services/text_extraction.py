@@ -0,0 +1,443 @@
+from typing import Callable, Dict, Iterator, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+import asyncio
+import codecs
+import csv
+import json
+import multiprocessing
+import os
+import re
+import resource
+import signal
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+from app.core.config import settings
+
+SNIFF_SIZE = 64 * 1024
+
+class ExtractionError(Exception):
+    pass
+
+class UnsupportedFormatError(ExtractionError):
+    pass
+
+class ExtractionLimitError(ExtractionError):
+    pass
+
+# Format detection
+
+MIME_FORMATS = {
+    "text/plain": "text",
+    "text/html": "html",
+    "application/xhtml+xml": "html",
+    "text/markdown": "markdown",
+    "text/x-markdown": "markdown",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/json": "json",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+EXTENSION_FORMATS = {
+    ".txt": "text", ".text": "text", ".log": "text", ".rst": "text",
+    ".html": "html", ".htm": "html", ".xhtml": "html",
+    ".md": "markdown", ".markdown": "markdown",
+    ".csv": "csv", ".tsv": "csv",
+    ".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl",
+    ".pdf": "pdf",
+    ".docx": "docx",
+}
+
+def detect_format(path: str, content_type: Optional[str], name: Optional[str]) -> str:
+    # The file's own signature wins for binary formats, then the declared
+    # content type, then the file name's extension
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_SIZE)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(path) as archive:
+            if "word/document.xml" in archive.namelist():
+                return "docx"
+        raise UnsupportedFormatError("Unsupported archive format")
+
+    mime = (content_type or "").split(";")[0].strip().lower()
+    format = MIME_FORMATS.get(mime)
+    if format is None and name:
+        format = EXTENSION_FORMATS.get(os.path.splitext(name)[1].lower())
+    if format is None:
+        if mime and not mime.startswith("text/") and _looks_binary(head):
+            raise UnsupportedFormatError(f"Unsupported content type: {mime}")
+        format = "text"
+    if format in ("text", "markdown", "csv", "json", "jsonl", "html") and _looks_binary(head):
+        raise UnsupportedFormatError("File looks binary, not text")
+    return format
+
+def _looks_binary(head: bytes) -> bool:
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return False
+    return b"\x00" in head
+
+def detect_encoding(head: bytes) -> str:
+    for bom, encoding in (
+        (codecs.BOM_UTF8, "utf-8-sig"),
+        (codecs.BOM_UTF32_LE, "utf-32"),
+        (codecs.BOM_UTF32_BE, "utf-32"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"),
+    ):
+        if head.startswith(bom):
+            return encoding
+    declared = re.search(rb"""<meta[^>]+charset=["']?([\w-]+)""", head[:4096], re.I)
+    if declared:
+        try:
+            return codecs.lookup(declared.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    try:
+        # An incomplete sequence at the end of the sample is still UTF-8
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+def _open_text(path: str):
+    with open(path, "rb") as f:
+        encoding = detect_encoding(f.read(SNIFF_SIZE))
+    return open(path, "r", encoding=encoding, errors="replace", newline="")
+
+def _read_text(path: str) -> Iterator[str]:
+    with _open_text(path) as f:
+        while True:
+            block = f.read(settings.TEXT_READ_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+# Extractors: generators yielding text blocks, so no format needs to hold
+# its whole output in memory (JSON documents are the exception, as the
+# standard parser is not incremental).
+
+def extract_plain(path: str) -> Iterator[str]:
+    for block in _read_text(path):
+        yield block.replace("\r\n", "\n")
+
+class _HTMLTextParser(HTMLParser):
+    SKIP = {"script", "style", "noscript", "template", "head", "svg"}
+    BLOCK = {
+        "p", "div", "section", "article", "header", "footer", "aside", "main",
+        "nav", "li", "ul", "ol", "table", "tr", "h1", "h2", "h3", "h4", "h5",
+        "h6", "pre", "blockquote", "br", "hr", "dd", "dt", "figcaption", "title",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag == "pre":
+            self._pre_depth += 1
+        if tag in self.BLOCK:
+            self.parts.append("\n\n")
+        elif tag in ("td", "th"):
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "pre":
+            self._pre_depth = max(0, self._pre_depth - 1)
+        if tag in self.BLOCK:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if not self._pre_depth:
+            data = re.sub(r"\s+", " ", data)
+        self.parts.append(data)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        # Collapse the blank lines block tags pile up
+        return re.sub(r"[ \t]*\n[\s]*\n\s*", "\n\n", text)
+
+def extract_html(path: str) -> Iterator[str]:
+    parser = _HTMLTextParser()
+    for block in _read_text(path):
+        parser.feed(block)
+        yield parser.take()
+    parser.close()
+    yield parser.take()
+
+MARKDOWN_RULES = [
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),  # images -> alt text
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),  # links -> link text
+    (re.compile(r"^\s{0,3}#{1,6}\s+"), ""),  # headings
+    (re.compile(r"^\s{0,3}>\s?"), ""),  # block quotes
+    (re.compile(r"(\*\*|__)(.+?)\1"), r"\2"),  # bold
+    (re.compile(r"(?<![\w*])([*_])(?!\s)(.+?)(?<!\s)\1(?![\w*])"), r"\2"),  # italics
+    (re.compile(r"`([^`]+)`"), r"\1"),  # inline code
+    (re.compile(r"<[^>\n]+>"), ""),  # inline HTML
+]
+
+def extract_markdown(path: str) -> Iterator[str]:
+    with _open_text(path) as f:
+        lines = []
+        for line in f:
+            line = line.rstrip("\r\n")
+            if re.match(r"^\s*(```|~~~)", line) or re.match(r"^\s*([-*_]\s*){3,}$", line):
+                # Fence and rule lines carry no text; fenced content is kept
+                lines.append("")
+                continue
+            for pattern, replacement in MARKDOWN_RULES:
+                line = pattern.sub(replacement, line)
+            lines.append(line)
+            if len(lines) >= 1000:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+def extract_csv(path: str) -> Iterator[str]:
+    # Each row becomes one "column: value" paragraph, so rows stay
+    # self-describing once chunked
+    with _open_text(path) as f:
+        sample = f.read(SNIFF_SIZE)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            rows.append(", ".join(
+                f"{column}: {value}" if column else value
+                for column, value in zip(header + [""] * (len(row) - len(header)), row)
+                if value.strip()
+            ))
+            if len(rows) >= 500:
+                yield "\n\n".join(rows) + "\n\n"
+                rows = []
+        if rows:
+            yield "\n\n".join(rows) + "\n\n"
+
+def _flatten_json(value, path: str = "") -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten_json(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _flatten_json(item, f"{path}[{index}]")
+    elif value is not None:
+        yield f"{path}: {value}" if path else str(value)
+
+def _json_record(value) -> str:
+    return "\n".join(_flatten_json(value)) + "\n\n"
+
+def extract_json(path: str) -> Iterator[str]:
+    with _open_text(path) as f:
+        value = json.load(f)
+    # Top-level arrays are usually lists of records: one paragraph each
+    for record in value if isinstance(value, list) else [value]:
+        yield _json_record(record)
+
+def extract_jsonl(path: str) -> Iterator[str]:
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield _json_record(json.loads(line))
+                except json.JSONDecodeError:
+                    yield line + "\n\n"
+
+def extract_pdf(path: str) -> Iterator[str]:
+    try:
+        # Optional: only deployments that ingest PDFs need it installed
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedFormatError("PDF extraction requires the pypdf package")
+    reader = PdfReader(path)
+    if reader.is_encrypted and reader.decrypt("") == 0:
+        raise UnsupportedFormatError("PDF is encrypted")
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text + "\n\n"
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def extract_docx(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as document:
+            parts = []
+            for _, element in ET.iterparse(document, events=("end",)):
+                if element.tag == f"{WORD_NS}t":
+                    parts.append(element.text or "")
+                elif element.tag == f"{WORD_NS}tab":
+                    parts.append("\t")
+                elif element.tag in (f"{WORD_NS}br", f"{WORD_NS}cr"):
+                    parts.append("\n")
+                elif element.tag == f"{WORD_NS}p":
+                    paragraph = "".join(parts).strip()
+                    parts = []
+                    element.clear()
+                    if paragraph:
+                        yield paragraph + "\n\n"
+
+EXTRACTORS: Dict[str, Callable[[str], Iterator[str]]] = {
+    "text": extract_plain,
+    "html": extract_html,
+    "markdown": extract_markdown,
+    "csv": extract_csv,
+    "json": extract_json,
+    "jsonl": extract_jsonl,
+    "pdf": extract_pdf,
+    "docx": extract_docx,
+}
+
+# Worker side
+
+def _raise_limit(signum, frame):
+    if signum == signal.SIGXCPU:
+        raise ExtractionLimitError("Extraction exceeded its CPU time limit")
+    raise ExtractionLimitError("Extraction exceeded its time limit")
+
+# Installed in every extraction process: the pool workers here and the
+# Celery ingestion workers
+def init_worker():
+    signal.signal(signal.SIGXCPU, _raise_limit)
+    signal.signal(signal.SIGALRM, _raise_limit)
+    if settings.EXTRACTION_MEMORY_LIMIT:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (settings.EXTRACTION_MEMORY_LIMIT, hard))
+
+def extract_to_file(
+    path: str,
+    output_path: str,
+    content_type: Optional[str] = None,
+    name: Optional[str] = None,
+) -> int:
+    # Writes the extracted UTF-8 text to output_path and returns the number
+    # of characters written. Runs inside a pool worker, where the CPU budget
+    # is relative to what the (reused) worker process has used so far.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(
+        resource.RLIMIT_CPU,
+        (int(usage.ru_utime + usage.ru_stime) + settings.EXTRACTION_CPU_LIMIT, hard),
+    )
+    signal.alarm(settings.EXTRACTION_TIMEOUT)
+    try:
+        extractor = EXTRACTORS[detect_format(path, content_type, name)]
+        written = 0
+        with open(output_path, "w", encoding="utf-8") as output:
+            for block in extractor(path):
+                block = block[:settings.EXTRACTION_MAX_CHARS - written]
+                output.write(block)
+                written += len(block)
+                if written >= settings.EXTRACTION_MAX_CHARS:
+                    break
+        return written
+    except MemoryError:
+        raise ExtractionLimitError("Extraction exceeded its memory limit")
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # Parser exceptions may not survive pickling back to the parent
+        raise ExtractionError(f"Failed to extract text: {str(e)}")
+    finally:
+        signal.alarm(0)
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+# API side
+
+# Runs extraction in a bounded pool of worker processes, so CPU-heavy
+# parsing never blocks the event loop, and a pathological file is stopped by
+# the worker's CPU, wall-clock and memory limits.
+class TextExtractionEngine:
+    def __init__(self, workers: int = settings.EXTRACTION_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked: workers start lean (the memory limit
+            # applies to their own address space) and never inherit the
+            # API process's threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return self._pool
+
+    async def extract(
+        self,
+        path: str,
+        content_type: Optional[str] = None,
+        name: Optional[str] = None,
+        output_dir: Optional[str] = None,
+    ) -> str:
+        # Returns the path of a temporary UTF-8 text file, in output_dir if
+        # given (so the caller can rename it into place atomically); the
+        # caller streams it and removes it
+        fd, output_path = tempfile.mkstemp(prefix="extract-", suffix=".part", dir=output_dir)
+        os.close(fd)
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._get_pool(), extract_to_file, path, output_path, content_type, name
+                ),
+                # The worker stops itself at EXTRACTION_TIMEOUT; this only
+                # guards against a worker that died without answering
+                settings.EXTRACTION_TIMEOUT + 30,
+            )
+        except BrokenProcessPool:
+            # A worker was killed (e.g. by the hard CPU limit); start over
+            self.close()
+            os.remove(output_path)
+            raise ExtractionLimitError("Extraction worker was terminated")
+        except BaseException:
+            os.remove(output_path)
+            raise
+        return output_path
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+_engine: Optional[TextExtractionEngine] = None
+
+def get_extraction_engine() -> TextExtractionEngine:
+    global _engine
+    if _engine is None:
+        _engine = TextExtractionEngine()
+    return _engine
+
+def close_extraction_engine():
+    global _engine
+    if _engine is not None:
+        _engine.close()
+    _engine = None
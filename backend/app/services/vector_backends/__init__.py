@@ -0,0 +1,29 @@
+from typing import Optional
+
+from app.core.config import settings
+from app.services.vector_backends.base import VectorBackend
+
+_backend: Optional[VectorBackend] = None
+
+def get_vector_backend() -> VectorBackend:
+    global _backend
+    if _backend is None:
+        # Imported lazily so each deployment only needs its backend's
+        # dependencies installed.
+        if settings.VECTOR_BACKEND == "local":
+            if settings.INGESTION_CELERY:
+                # The local index keeps its row count and lists in the
+                # memory of the process that opened it, so the Celery
+                # workers and the API cannot share it
+                raise ValueError(
+                    "VECTOR_BACKEND=local supports a single process only; "
+                    "set INGESTION_CELERY=false to ingest in the API process"
+                )
+            from app.services.vector_backends.local import LocalVectorBackend
+            _backend = LocalVectorBackend()
+        elif settings.VECTOR_BACKEND == "chroma":
+            from app.services.vector_backends.chroma import ChromaBackend
+            _backend = ChromaBackend()
+        else:
+            raise ValueError(f"Unknown vector backend: {settings.VECTOR_BACKEND}")
+    return _backend
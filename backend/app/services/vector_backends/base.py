@@ -0,0 +1,67 @@
+from typing import List, Optional, Set
+from abc import ABC, abstractmethod
+
+# Search hits and fetched items are plain dicts:
+# {"id": str, "content": str, "metadata": dict, "score": float}
+# where score is a cosine similarity (higher is closer). With
+# include_embeddings=True each item also carries its "embedding".
+# Passing document_ids to query() pre-filters the search to chunks whose
+# "document_id" metadata is in that list.
+class VectorBackend(ABC):
+    @abstractmethod
+    async def initialize(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+    @abstractmethod
+    async def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict],
+        documents: List[str],
+    ):
+        ...
+
+    @abstractmethod
+    async def query(
+        self,
+        embedding: List[float],
+        limit: int,
+        include_embeddings: bool = False,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def get(self, ids: List[str], include_embeddings: bool = False) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    async def delete_documents(self, document_ids: List[str]):
+        # Removes every chunk of the given documents
+        ...
+
+    @abstractmethod
+    async def document_ids(self) -> Set[str]:
+        # Ids of every document with stored vectors, for orphan compaction
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    async def heartbeat(self):
+        # Raises if the backend cannot serve requests; used by /health
+        await self.initialize()
+
+    async def get_or_none(self, id: str) -> Optional[dict]:
+        items = await self.get([id])
+        return items[0] if items else None
@@ -0,0 +1,166 @@
+from typing import List, Optional, Set
+import asyncio
+from chromadb import Collection, HttpClient
+from chromadb.api import ClientAPI
+
+from app.core.config import settings
+from app.core.thread_pool import run_in_thread_pool
+from app.services.vector_backends.base import VectorBackend
+
+# The chromadb client is synchronous (one pooled HTTP session per client), so
+# every call runs on the vector store thread pool instead of the event loop.
+class ChromaBackend(VectorBackend):
+    def __init__(self):
+        self.client: Optional[ClientAPI] = None
+        self.collection: Optional[Collection] = None
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self):
+        if self.collection is not None:
+            return
+        async with self._init_lock:
+            if self.collection is None:
+                self.collection = await run_in_thread_pool(self._connect)
+
+    def _connect(self) -> Collection:
+        self.client = HttpClient(host=settings.CHROMADB_HOST, port=str(settings.CHROMADB_PORT))
+
+        # Create or get collection
+        return self.client.get_or_create_collection(
+            name="documents",
+            metadata={"description": "Document embeddings", "hnsw:space": "cosine"}
+        )
+
+    async def heartbeat(self):
+        await self.initialize()
+        await run_in_thread_pool(self.client.heartbeat)
+
+    async def close(self):
+        self.client = None
+        self.collection = None
+
+    async def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict],
+        documents: List[str],
+    ):
+        await self.initialize()
+        size = settings.VECTOR_STORE_BATCH_SIZE
+        for start in range(0, len(ids), size):
+            await run_in_thread_pool(
+                self.collection.upsert,
+                ids=ids[start:start + size],
+                embeddings=embeddings[start:start + size],
+                metadatas=metadatas[start:start + size],
+                documents=documents[start:start + size]
+            )
+
+    async def query(
+        self,
+        embedding: List[float],
+        limit: int,
+        include_embeddings: bool = False,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[dict]:
+        await self.initialize()
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = await run_in_thread_pool(
+            self.collection.query,
+            query_embeddings=[embedding],
+            n_results=limit,
+            where=self._document_filter(document_ids),
+            include=include
+        )
+        items = [
+            {
+                "id": id,
+                "content": document,
+                "metadata": metadata or {},
+                "score": 1.0 - distance,
+            }
+            for id, document, metadata, distance in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+            )
+        ]
+        if include_embeddings:
+            for item, item_embedding in zip(items, results["embeddings"][0]):
+                item["embedding"] = list(item_embedding)
+        return items
+
+    async def get(self, ids: List[str], include_embeddings: bool = False) -> List[dict]:
+        await self.initialize()
+        include = ["documents", "metadatas"]
+        if include_embeddings:
+            include.append("embeddings")
+        items = []
+        for batch in self._batches(ids):
+            results = await run_in_thread_pool(self.collection.get, ids=batch, include=include)
+            batch_items = [
+                {"id": id, "content": document, "metadata": metadata or {}}
+                for id, document, metadata in zip(
+                    results["ids"],
+                    results["documents"],
+                    results["metadatas"],
+                )
+            ]
+            if include_embeddings:
+                for item, item_embedding in zip(batch_items, results["embeddings"]):
+                    item["embedding"] = list(item_embedding)
+            items.extend(batch_items)
+        return items
+
+    async def delete(self, ids: List[str]):
+        await self.initialize()
+        for batch in self._batches(ids):
+            await run_in_thread_pool(self.collection.delete, ids=batch)
+
+    async def delete_documents(self, document_ids: List[str]):
+        await self.initialize()
+        for batch in self._batches(document_ids):
+            # Whole-document entries use the document id as their own id
+            await run_in_thread_pool(self.collection.delete, ids=batch)
+            await run_in_thread_pool(
+                self.collection.delete,
+                where=self._document_filter(batch),
+            )
+
+    async def document_ids(self) -> Set[str]:
+        await self.initialize()
+        document_ids = set()
+        offset = 0
+        while True:
+            results = await run_in_thread_pool(
+                self.collection.get,
+                include=["metadatas"],
+                limit=settings.VECTOR_STORE_BATCH_SIZE,
+                offset=offset,
+            )
+            for id, metadata in zip(results["ids"], results["metadatas"]):
+                document_ids.add((metadata or {}).get("document_id", id))
+            if len(results["ids"]) < settings.VECTOR_STORE_BATCH_SIZE:
+                return document_ids
+            offset += len(results["ids"])
+
+    async def count(self) -> int:
+        await self.initialize()
+        return await run_in_thread_pool(self.collection.count)
+
+    @staticmethod
+    def _batches(values: List[str]) -> List[List[str]]:
+        size = settings.VECTOR_STORE_BATCH_SIZE
+        return [values[i:i + size] for i in range(0, len(values), size)]
+
+    @staticmethod
+    def _document_filter(document_ids: Optional[List[str]]) -> Optional[dict]:
+        if document_ids is None:
+            return None
+        if len(document_ids) == 1:
+            return {"document_id": document_ids[0]}
+        return {"$or": [{"document_id": document_id} for document_id in document_ids]}
@@ -0,0 +1,516 @@
+from typing import Dict, List, Optional, Set, Tuple
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.thread_pool import run_in_thread_pool
+from app.services.vector_backends.base import VectorBackend
+from app.services.vector_backends.quantization import Quantizer, create_quantizer
+
+UNASSIGNED = -1  # live row, index not trained yet
+DELETED = -2
+
+SQL_BATCH = 500  # stay well below SQLite's bound-parameter limit
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    # Spherical k-means: centroids stay unit length, assignment by dot product
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        empty = ~sums.any(axis=1)
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+# Inverted-file (IVF) index over unit-normalized float32 vectors. Vectors and
+# their list assignments live in memory-mapped files, ids/documents/metadata
+# in SQLite, so reopening the index does not rebuild anything. Until enough
+# vectors exist to train the coarse quantizer, search is an exact scan.
+# With quantization enabled, trained lists are scanned over compact codes
+# and only the shortlist touches the float32 vectors.
+class LocalVectorIndex:
+    def __init__(
+        self,
+        path: str,
+        nprobe: int = settings.VECTOR_INDEX_NPROBE,
+        min_train_size: int = settings.VECTOR_INDEX_MIN_TRAIN_SIZE,
+        quantization: str = settings.VECTOR_QUANTIZATION,
+        rescore_factor: int = settings.VECTOR_RESCORE_FACTOR,
+    ):
+        self.path = path
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.dim: Optional[int] = None
+        self.size = 0  # rows used, including deleted ones
+        self.live = 0  # rows in the items table
+        self.trained_size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.quantizer: Optional[Quantizer] = None
+        self._codes: Optional[np.memmap] = None
+        self._vectors: Optional[np.memmap] = None
+        self._assign: Optional[np.memmap] = None
+        self._lists: List[np.ndarray] = []
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def open(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(self.path, "meta.sqlite"),
+                check_same_thread=False,
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+                "document TEXT, metadata TEXT, document_id TEXT)"
+            )
+            columns = [column for _, column, *_ in self._db.execute("PRAGMA table_info(items)")]
+            if "document_id" not in columns:
+                # Indexes created before scoped search kept it only in metadata
+                self._db.execute("ALTER TABLE items ADD COLUMN document_id TEXT")
+                self._db.execute(
+                    "UPDATE items SET document_id = json_extract(metadata, '$.document_id')"
+                )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_items_document_id ON items (document_id)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._db.commit()
+            self.live = self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+            info = dict(self._db.execute("SELECT key, value FROM info").fetchall())
+            if "dim" not in info:
+                return
+            self.dim = int(info["dim"])
+            self.size = int(info["size"])
+            self.trained_size = int(info.get("trained_size", 0))
+            capacity = os.path.getsize(self._file("vectors.f32")) // (self.dim * 4)
+            self._vectors = np.memmap(
+                self._file("vectors.f32"), dtype=np.float32, mode="r+",
+                shape=(capacity, self.dim),
+            )
+            self._assign = np.memmap(
+                self._file("assign.i32"), dtype=np.int32, mode="r+", shape=(capacity,)
+            )
+            if os.path.exists(self._file("centroids.npy")):
+                self.centroids = np.load(self._file("centroids.npy"))
+                self._build_lists()
+                self._open_codes(capacity)
+
+    @property
+    def is_open(self) -> bool:
+        return self._db is not None
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+            self._vectors = None
+            self._assign = None
+            self._codes = None
+            self.quantizer = None
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict],
+        documents: List[str],
+    ):
+        if not ids:
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self._create(vectors.shape[1])
+            # Re-adding an id replaces it
+            self._delete_locked(ids)
+
+            start = self.size
+            rows = np.arange(start, start + len(ids))
+            self._ensure_capacity(start + len(ids))
+            self._vectors[rows] = vectors
+            if self.centroids is None:
+                self._assign[rows] = UNASSIGNED
+            else:
+                lists = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+                self._assign[rows] = lists
+                for list_id in np.unique(lists):
+                    self._lists[list_id] = np.concatenate(
+                        [self._lists[list_id], rows[lists == list_id]]
+                    )
+            if self.quantizer is not None:
+                self._codes[rows] = self.quantizer.encode(vectors)
+            self.size += len(ids)
+            self.live += len(ids)
+
+            self._db.executemany(
+                "INSERT INTO items (row, id, document, metadata, document_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(row), id, document, json.dumps(metadata or {}),
+                        (metadata or {}).get("document_id"),
+                    )
+                    for row, id, document, metadata in zip(rows, ids, documents, metadatas)
+                ],
+            )
+            self._set_info(size=self.size)
+            self._db.commit()
+            self._flush()
+
+            if self._should_train():
+                self.train()
+
+    def search(
+        self,
+        embedding: List[float],
+        limit: int,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        with self._lock:
+            if self.dim is None or self.size == 0:
+                return []
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+            if document_ids is not None:
+                # Pre-filtered: score exactly the rows of the given documents
+                rows = np.asarray(self._document_rows(document_ids), dtype=np.int64)
+            elif self.centroids is None:
+                rows = np.flatnonzero(self._assign[:self.size] == UNASSIGNED)
+            else:
+                nprobe = min(self.nprobe, len(self.centroids))
+                probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                rows = np.concatenate([self._lists[p] for p in probes])
+                # Deleted rows stay in their list until the next retrain
+                rows = rows[self._assign[rows] >= 0]
+            if len(rows) == 0:
+                return []
+
+            if self.quantizer is not None and document_ids is None:
+                # Shortlist on the codes, then re-score the shortlist exactly
+                approximate = self.quantizer.scores(query, self._codes[rows])
+                shortlist = min(limit * self.rescore_factor, len(rows))
+                rows = rows[np.argpartition(-approximate, shortlist - 1)[:shortlist]]
+
+            scores = self._vectors[rows] @ query
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def get_rows(self, rows: List[int], include_embeddings: bool = False) -> Dict[int, dict]:
+        with self._lock:
+            items = {}
+            for batch in self._batches(rows):
+                for row, id, document, metadata in self._db.execute(
+                    "SELECT row, id, document, metadata FROM items "
+                    f"WHERE row IN ({','.join('?' * len(batch))})",
+                    batch,
+                ):
+                    items[row] = {
+                        "id": id,
+                        "content": document,
+                        "metadata": json.loads(metadata),
+                    }
+                    if include_embeddings:
+                        items[row]["embedding"] = self._vectors[row].tolist()
+            return items
+
+    def get(self, ids: List[str], include_embeddings: bool = False) -> List[dict]:
+        with self._lock:
+            items = []
+            for batch in self._batches(ids):
+                for row, id, document, metadata in self._db.execute(
+                    "SELECT row, id, document, metadata FROM items "
+                    f"WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ):
+                    item = {
+                        "id": id,
+                        "content": document,
+                        "metadata": json.loads(metadata),
+                    }
+                    if include_embeddings:
+                        item["embedding"] = self._vectors[row].tolist()
+                    items.append(item)
+            return items
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            if self.dim is None:
+                return
+            self._delete_locked(ids)
+            self._db.commit()
+            self._flush()
+
+    def delete_documents(self, document_ids: List[str]):
+        with self._lock:
+            if self.dim is None:
+                return
+            self._delete_rows_locked(self._document_rows(document_ids))
+            self._delete_locked(document_ids)
+            self._db.commit()
+            self._flush()
+
+    def document_ids(self) -> Set[str]:
+        with self._lock:
+            return {
+                document_id or id
+                for id, document_id in self._db.execute("SELECT id, document_id FROM items")
+            }
+
+    def count(self) -> int:
+        with self._lock:
+            return self.live
+
+    def train(self):
+        with self._lock:
+            live = np.flatnonzero(self._assign[:self.size] != DELETED)
+            if len(live) == 0:
+                return
+            nlist = int(np.clip(np.sqrt(len(live)), 16, 4096))
+            nlist = min(nlist, len(live))
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= settings.VECTOR_INDEX_TRAIN_SAMPLE else \
+                rng.choice(live, settings.VECTOR_INDEX_TRAIN_SAMPLE, replace=False)
+            self.centroids = _kmeans(np.asarray(self._vectors[np.sort(sample)]), nlist)
+
+            # Assign every live row in blocks to bound memory use
+            for start in range(0, len(live), 65536):
+                block = live[start:start + 65536]
+                self._assign[block] = np.argmax(
+                    self._vectors[block] @ self.centroids.T, axis=1
+                )
+            np.save(self._file("centroids.npy"), self.centroids)
+            self._train_quantizer(live, np.sort(sample))
+            self.trained_size = len(live)
+            self._set_info(trained_size=self.trained_size)
+            self._db.commit()
+            self._flush()
+            self._build_lists()
+
+    def _train_quantizer(self, live: np.ndarray, sample: np.ndarray):
+        self.quantizer = create_quantizer(self.dim, self.quantization)
+        self._codes = None
+        if self.quantizer is None:
+            if os.path.exists(self._file("quantizer.npz")):
+                os.remove(self._file("quantizer.npz"))
+            return
+        self.quantizer.train(np.asarray(self._vectors[sample]))
+        self._codes = np.memmap(
+            self._file("codes.bin"), dtype=self.quantizer.dtype, mode="w+",
+            shape=(len(self._assign), self.quantizer.code_size),
+        )
+        for start in range(0, len(live), 65536):
+            block = live[start:start + 65536]
+            self._codes[block] = self.quantizer.encode(np.asarray(self._vectors[block]))
+        self._codes.flush()
+        self.quantizer.save(self._file("quantizer.npz"))
+
+    def _open_codes(self, capacity: int):
+        if self.quantization == "none":
+            return
+        if not os.path.exists(self._file("quantizer.npz")):
+            if self.quantization != "none":
+                # Quantization was switched on for an already trained index
+                self.train()
+            return
+        quantizer = Quantizer.load(self._file("quantizer.npz"))
+        if quantizer.kind != self.quantization:
+            self.train()
+            return
+        self.quantizer = quantizer
+        self._codes = np.memmap(
+            self._file("codes.bin"), dtype=quantizer.dtype, mode="r+",
+            shape=(capacity, quantizer.code_size),
+        )
+
+    def _should_train(self) -> bool:
+        if self.centroids is None:
+            return self.live >= self.min_train_size
+        # Retrain once the index has grown well past what it was trained on
+        return self.live > 4 * self.trained_size
+
+    def _build_lists(self):
+        assign = np.asarray(self._assign[:self.size])
+        live = np.flatnonzero(assign >= 0)
+        order = live[np.argsort(assign[live], kind="stable")]
+        bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def _document_rows(self, document_ids: List[str]) -> List[int]:
+        rows = []
+        for batch in self._batches(document_ids):
+            rows.extend(
+                row for (row,) in self._db.execute(
+                    "SELECT row FROM items "
+                    f"WHERE document_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return rows
+
+    def _delete_locked(self, ids: List[str]):
+        rows = []
+        for batch in self._batches(ids):
+            rows.extend(
+                row for (row,) in self._db.execute(
+                    f"SELECT row FROM items WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        self._delete_rows_locked(rows)
+
+    def _delete_rows_locked(self, rows: List[int]):
+        if not rows:
+            return
+        self._assign[rows] = DELETED
+        self.live -= len(rows)
+        for batch in self._batches(rows):
+            self._db.execute(
+                f"DELETE FROM items WHERE row IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+
+    def _create(self, dim: int):
+        self.dim = dim
+        capacity = 1024
+        self._vectors = np.memmap(
+            self._file("vectors.f32"), dtype=np.float32, mode="w+", shape=(capacity, dim)
+        )
+        self._assign = np.memmap(
+            self._file("assign.i32"), dtype=np.int32, mode="w+", shape=(capacity,)
+        )
+        self._set_info(dim=dim, size=0)
+        self._db.commit()
+
+    def _ensure_capacity(self, needed: int):
+        capacity = len(self._assign)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        self._flush()
+        self._vectors = self._grow("vectors.f32", np.float32, (capacity, self.dim))
+        self._assign = self._grow("assign.i32", np.int32, (capacity,))
+        if self._codes is not None:
+            self._codes = self._grow(
+                "codes.bin", self.quantizer.dtype, (capacity, self.quantizer.code_size)
+            )
+
+    def _grow(self, name: str, dtype, shape: tuple) -> np.memmap:
+        with open(self._file(name), "r+b") as f:
+            f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return np.memmap(self._file(name), dtype=dtype, mode="r+", shape=shape)
+
+    def _flush(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._assign.flush()
+        if self._codes is not None:
+            self._codes.flush()
+
+    def _set_info(self, **values):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()],
+        )
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _batches(values: list) -> List[list]:
+        values = list(values)
+        return [values[i:i + SQL_BATCH] for i in range(0, len(values), SQL_BATCH)]
+
+# Index calls hold a lock and touch disk, so they run on the vector store
+# thread pool rather than the event loop.
+class LocalVectorBackend(VectorBackend):
+    def __init__(self, path: str = settings.VECTOR_INDEX_DIR):
+        self.index = LocalVectorIndex(path)
+
+    async def initialize(self):
+        if not self.index.is_open:
+            await run_in_thread_pool(self.index.open)
+
+    async def close(self):
+        await run_in_thread_pool(self.index.close)
+
+    async def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict],
+        documents: List[str],
+    ):
+        await self.initialize()
+        await run_in_thread_pool(self.index.add, ids, embeddings, metadatas, documents)
+
+    async def query(
+        self,
+        embedding: List[float],
+        limit: int,
+        include_embeddings: bool = False,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[dict]:
+        await self.initialize()
+        return await run_in_thread_pool(
+            self._query, embedding, limit, include_embeddings, document_ids
+        )
+
+    def _query(
+        self,
+        embedding: List[float],
+        limit: int,
+        include_embeddings: bool,
+        document_ids: Optional[List[str]],
+    ) -> List[dict]:
+        hits = self.index.search(embedding, limit, document_ids)
+        items = self.index.get_rows([row for row, _ in hits], include_embeddings)
+        return [
+            {**items[row], "score": score}
+            for row, score in hits
+            if row in items
+        ]
+
+    async def get(self, ids: List[str], include_embeddings: bool = False) -> List[dict]:
+        await self.initialize()
+        return await run_in_thread_pool(self.index.get, ids, include_embeddings)
+
+    async def delete(self, ids: List[str]):
+        await self.initialize()
+        await run_in_thread_pool(self.index.delete, ids)
+
+    async def delete_documents(self, document_ids: List[str]):
+        await self.initialize()
+        await run_in_thread_pool(self.index.delete_documents, document_ids)
+
+    async def document_ids(self) -> Set[str]:
+        await self.initialize()
+        return await run_in_thread_pool(self.index.document_ids)
+
+    async def count(self) -> int:
+        await self.initialize()
+        return await run_in_thread_pool(self.index.count)
@@ -0,0 +1,159 @@
+from typing import Optional
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from app.core.config import settings
+
+# Compressed representations of unit-normalized float32 vectors. The index
+# scans codes to shortlist candidates and re-scores the shortlist exactly
+# against the full-precision vectors, which stay on disk.
+class Quantizer(ABC):
+    kind: str
+    dtype: type
+
+    @property
+    @abstractmethod
+    def code_size(self) -> int:
+        ...
+
+    @abstractmethod
+    def train(self, sample: np.ndarray):
+        ...
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Approximate dot products between the query and each code row
+        ...
+
+    @abstractmethod
+    def state(self) -> dict:
+        ...
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, kind=self.kind, **self.state())
+
+    @staticmethod
+    def load(path: str) -> "Quantizer":
+        state = dict(np.load(path))
+        kind = str(state.pop("kind"))
+        if kind == "int8":
+            quantizer = ScalarQuantizer(state["scale"].shape[0])
+            quantizer.scale = state["scale"]
+        elif kind == "pq":
+            codebooks = state["codebooks"]
+            quantizer = ProductQuantizer(codebooks.shape[0] * codebooks.shape[2], codebooks.shape[0])
+            quantizer.codebooks = codebooks
+        else:
+            raise ValueError(f"Unknown quantizer: {kind}")
+        return quantizer
+
+# int8 scalar quantization with a per-dimension scale: 4x smaller than float32
+class ScalarQuantizer(Quantizer):
+    kind = "int8"
+    dtype = np.int8
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.scale = np.ones(dim, dtype=np.float32)
+
+    @property
+    def code_size(self) -> int:
+        return self.dim
+
+    def train(self, sample: np.ndarray):
+        scale = np.abs(sample).max(axis=0).astype(np.float32)
+        scale[scale == 0] = 1.0
+        self.scale = scale
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale * 127), -127, 127).astype(np.int8)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ (query * self.scale / 127)
+
+    def state(self) -> dict:
+        return {"scale": self.scale}
+
+# Product quantization: the vector is split into `subvectors` slices and each
+# slice is replaced by the index of its nearest of 256 centroids, one byte per
+# slice, so a 768-dim float32 vector (3072 bytes) with 192 subvectors is
+# stored in 192 bytes.
+class ProductQuantizer(Quantizer):
+    kind = "pq"
+    dtype = np.uint8
+
+    def __init__(self, dim: int, subvectors: int):
+        # Use the largest divisor of dim not above the requested count
+        subvectors = max(1, min(subvectors, dim))
+        while dim % subvectors:
+            subvectors -= 1
+        self.dim = dim
+        self.subvectors = subvectors
+        self.codebooks: Optional[np.ndarray] = None  # (subvectors, 256, dim / subvectors)
+
+    @property
+    def code_size(self) -> int:
+        return self.subvectors
+
+    def train(self, sample: np.ndarray):
+        slices = self._split(sample)
+        k = min(256, len(sample))
+        codebooks = np.zeros((self.subvectors, 256, self.dim // self.subvectors), dtype=np.float32)
+        for m in range(self.subvectors):
+            codebooks[m, :k] = _kmeans_l2(slices[:, m], k, seed=m)
+        self.codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        slices = self._split(vectors)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for m in range(self.subvectors):
+            codes[:, m] = _nearest(slices[:, m], self.codebooks[m])
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Asymmetric distance computation: the query stays exact and each
+        # code looks up its slice's dot product from a (subvectors, 256) table
+        table = np.einsum("mcd,md->mc", self.codebooks, self._split(query[None])[0])
+        return table[np.arange(self.subvectors), codes].sum(axis=1)
+
+    def state(self) -> dict:
+        return {"codebooks": self.codebooks}
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subvectors, self.dim // self.subvectors)
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+    return np.argmax(data @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+
+def _kmeans_l2(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        counts[empty] = 1
+        centroids = sums / counts[:, None]
+    return centroids
+
+def create_quantizer(
+    dim: int,
+    kind: str = settings.VECTOR_QUANTIZATION,
+) -> Optional[Quantizer]:
+    if kind == "none":
+        return None
+    if kind == "int8":
+        return ScalarQuantizer(dim)
+    if kind == "pq":
+        return ProductQuantizer(dim, settings.VECTOR_PQ_SUBVECTORS)
+    raise ValueError(f"Unknown vector quantization: {kind}")
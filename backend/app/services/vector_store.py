@@ -1,63 +1,253 @@
-from typing import List, Optional
-from chromadb import Client, Collection
-from chromadb.config import Settings
+from typing import Dict, List, Optional, Set
 from app.core.config import settings
+from app.core.thread_pool import run_in_thread_pool
+from app.services.chunker import Chunk
+from app.services.lexical_index import LexicalIndex, get_lexical_index
+from app.services.llm import LLMService
+from app.services.reranker import maximal_marginal_relevance
+from app.services.vector_backends import VectorBackend, get_vector_backend
 
 class VectorStoreService:
-    def __init__(self):
-        self.client: Optional[Client] = None
-        self.collection: Optional[Collection] = None
+    def __init__(
+        self,
+        llm: Optional[LLMService] = None,
+        backend: Optional[VectorBackend] = None,
+        lexical: Optional[LexicalIndex] = None,
+    ):
+        self.llm = llm or LLMService()
+        self.backend = backend or get_vector_backend()
+        self.lexical = lexical or get_lexical_index()
 
     async def initialize(self):
-        self.client = Client(Settings(
-            chroma_api_impl="rest",
-            chroma_server_host=settings.CHROMADB_HOST,
-            chroma_server_http_port=settings.CHROMADB_PORT
-        ))
-        
-        # Create or get collection
-        self.collection = self.client.get_or_create_collection(
-            name="documents",
-            metadata={"description": "Document embeddings"}
-        )
+        await self.backend.initialize()
+        await run_in_thread_pool(self.lexical.open)
 
     async def cleanup(self):
-        # Add any cleanup logic here
-        pass
+        await self.backend.close()
+        await run_in_thread_pool(self.lexical.close)
 
     async def add_document(
         self,
         document_id: str,
         content: str,
         metadata: dict,
-        embedding: List[float]
+        embedding: Optional[List[float]] = None
     ):
-        await self.collection.add(
+        if embedding is None:
+            # Coalesced with other concurrent single-document inserts
+            embedding = await self.llm.generate_embedding(content)
+        await self.backend.add(
             ids=[document_id],
             embeddings=[embedding],
             metadatas=[metadata],
             documents=[content]
         )
+        await run_in_thread_pool(self.lexical.add, [(document_id, document_id, content)])
+        return document_id
+
+    async def add_documents(
+        self,
+        document_ids: List[str],
+        contents: List[str],
+        metadatas: List[dict],
+        embeddings: Optional[List[Optional[List[float]]]] = None,
+    ) -> List[str]:
+        # Only entries without a precomputed embedding are embedded
+        embeddings = list(embeddings or [None] * len(contents))
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = await self.llm.generate_embeddings([contents[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        await self.backend.add(
+            ids=document_ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=contents
+        )
+        await run_in_thread_pool(self.lexical.add, [
+            (id, metadata.get("document_id", id), content)
+            for id, metadata, content in zip(document_ids, metadatas, contents)
+        ])
+        return document_ids
+
+    async def add_chunks(
+        self,
+        document_id: str,
+        chunks: List[Chunk],
+        metadata: dict,
+        embeddings: Optional[List[Optional[List[float]]]] = None,
+    ) -> List[str]:
+        return await self.add_documents(
+            [self.chunk_id(document_id, chunk.index) for chunk in chunks],
+            [chunk.text for chunk in chunks],
+            [self.chunk_metadata(document_id, chunk, metadata) for chunk in chunks],
+            embeddings,
+        )
+
+    def chunk_metadata(self, document_id: str, chunk: Chunk, metadata: dict) -> dict:
+        # The content hash and embedding model let a re-index tell which
+        # stored chunks are still valid
+        return {
+            **metadata,
+            "document_id": document_id,
+            "chunk_index": chunk.index,
+            "start": chunk.start,
+            "end": chunk.end,
+            "content_hash": chunk.content_hash,
+            "embedding_model": self.llm.embedding_model,
+        }
+
+    async def delete_chunks(self, document_id: str, start: int, end: int):
+        # Removes chunk indexes in [start, end)
+        chunk_ids = [self.chunk_id(document_id, index) for index in range(start, end)]
+        await self.backend.delete(chunk_ids)
+        await run_in_thread_pool(self.lexical.delete, chunk_ids)
 
     async def search_similar(
         self,
         query: str,
-        limit: int = 5
+        limit: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        document_ids: Optional[List[str]] = None,
     ) -> List[dict]:
-        results = await self.collection.query(
-            query_texts=[query],
-            n_results=limit
+        # document_ids scopes the search; None searches every document
+        if document_ids is not None and not document_ids:
+            return []
+        if query_embedding is None:
+            query_embedding = await self.llm.generate_embedding(query)
+        candidates = limit * settings.CHUNK_SEARCH_OVERFETCH
+        if settings.RERANK_ENABLED:
+            candidates = max(candidates, settings.RERANK_CANDIDATES)
+
+        # Small scopes are pre-filtered inside the index. Large ones would
+        # make the filter itself the expensive part, so the unfiltered search
+        # over-fetches and foreign documents are dropped afterwards.
+        prefilter = None
+        allowed = None
+        if document_ids is not None:
+            if len(document_ids) <= settings.SCOPE_PREFILTER_MAX_DOCUMENTS:
+                prefilter = document_ids
+            else:
+                allowed = set(document_ids)
+                candidates *= settings.SCOPE_POSTFILTER_OVERFETCH
+
+        hits = await self.backend.query(
+            query_embedding,
+            candidates,
+            include_embeddings=settings.RERANK_ENABLED,
+            document_ids=prefilter,
         )
-        return results
+        lexical_hits = []
+        if settings.HYBRID_SEARCH_ENABLED:
+            lexical_hits = await run_in_thread_pool(
+                self.lexical.search, query, candidates, document_ids=prefilter
+            )
+        if settings.RERANK_ENABLED and settings.RERANK_MIN_SCORE is not None:
+            # A cosine cutoff only means something for vector hits; BM25 hits
+            # (exact identifiers) are kept whatever their embedding says
+            hits = [hit for hit in hits if hit["score"] >= settings.RERANK_MIN_SCORE]
+        if allowed is not None:
+            hits = [hit for hit in hits if self._document_id(hit) in allowed]
+            lexical_hits = [hit for hit in lexical_hits if hit["document_id"] in allowed]
+        if settings.HYBRID_SEARCH_ENABLED:
+            # Exact identifiers (part numbers, error codes) embed poorly;
+            # BM25 finds them and rank fusion merges both result lists.
+            hits = await self._fuse(hits, lexical_hits)
+        if settings.RERANK_ENABLED:
+            # Keep the `limit` most relevant chunks that are not near
+            # duplicates of each other, so the prompt carries less redundancy
+            # Relevance is the ranking so far: cosine similarity, or the fused
+            # scores scaled to 0..1 so they weigh against cosine redundancy
+            relevance = [hit["score"] for hit in hits]
+            if settings.HYBRID_SEARCH_ENABLED and hits:
+                relevance = [score / relevance[0] for score in relevance]
+            selected = maximal_marginal_relevance(
+                [hit["embedding"] for hit in hits],
+                relevance,
+                k=limit,
+                lambda_mult=settings.MMR_LAMBDA,
+            )
+            hits = [hits[i] for i in selected]
+        for hit in hits:
+            hit.pop("embedding", None)
+        return self._group_by_document(hits, limit)
 
     async def delete_document(self, document_id: str):
-        await self.collection.delete(ids=[document_id])
+        await self.delete_documents([document_id])
+
+    async def delete_documents(self, document_ids: List[str]):
+        # Removes the documents and all of their chunks in bulk
+        await self.backend.delete_documents(document_ids)
+        await run_in_thread_pool(self.lexical.delete_documents, document_ids)
+
+    async def document_ids(self) -> Set[str]:
+        # Every document id with vectors or lexical entries
+        return await self.backend.document_ids() \
+            | await run_in_thread_pool(self.lexical.document_ids)
+
+    async def optimize(self):
+        await run_in_thread_pool(self.lexical.optimize)
 
     async def get_document(self, document_id: str) -> Optional[dict]:
-        results = await self.collection.get(ids=[document_id])
-        if results and results['documents']:
-            return {
-                'content': results['documents'][0],
-                'metadata': results['metadatas'][0]
-            }
-        return None
\ No newline at end of file
+        return await self.backend.get_or_none(document_id)
+
+    async def get_chunks(
+        self,
+        chunk_ids: List[str],
+        include_embeddings: bool = False,
+    ) -> List[dict]:
+        return await self.backend.get(chunk_ids, include_embeddings)
+
+    @staticmethod
+    def chunk_id(document_id: str, index: int) -> str:
+        return f"{document_id}:{index}"
+
+    @staticmethod
+    def _document_id(hit: dict) -> str:
+        return hit["metadata"].get("document_id", hit["id"])
+
+    async def _fuse(self, vector_hits: List[dict], lexical_hits: List[dict]) -> List[dict]:
+        # Reciprocal rank fusion: score = sum of 1 / (k + rank) over both lists
+        scores: Dict[str, float] = {}
+        for hits in (vector_hits, lexical_hits):
+            for rank, hit in enumerate(hits):
+                scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (settings.RRF_K + rank + 1)
+
+        items = {hit["id"]: hit for hit in vector_hits}
+        missing = [hit["id"] for hit in lexical_hits if hit["id"] not in items]
+        if missing:
+            for item in await self.backend.get(
+                missing,
+                include_embeddings=settings.RERANK_ENABLED,
+            ):
+                items[item["id"]] = item
+
+        return [
+            {**items[id], "score": score}
+            for id, score in sorted(scores.items(), key=lambda item: -item[1])
+            if id in items
+        ]
+
+    def _group_by_document(self, hits: List[dict], limit: int) -> List[dict]:
+        # Hits arrive best-first, so a document's first hit is its best one.
+        # Each document's matching chunks are returned in reading order.
+        documents: Dict[str, dict] = {}
+        for hit in hits:
+            document_id = self._document_id(hit)
+            document = documents.get(document_id)
+            if document is None:
+                if len(documents) >= limit:
+                    continue
+                document = documents[document_id] = {
+                    "id": document_id,
+                    "score": hit["score"],
+                    "metadata": hit["metadata"],
+                    "chunks": [],
+                }
+            document["chunks"].append(hit)
+
+        for document in documents.values():
+            document["chunks"].sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+            document["content"] = "\n...\n".join(c["content"] for c in document["chunks"])
+        return list(documents.values())
@@ -1,29 +1,103 @@
+from typing import Optional
+import threading
+
 from celery import Task
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.worker_loop import close_worker_loop, run_async
 from app.db.session import SessionLocal
-from app.services.document_processor import DocumentProcessor
+from app.services.ingestion import IngestionPipeline
+from app.services.text_extraction import ExtractionError, init_worker
 from app.services.training import TrainingService
 
 class DBTask(Task):
-    _db = None
+    # One session per executing thread: a task instance is shared by every
+    # thread of a thread pool worker
+    _local = threading.local()
 
     @property
     def db(self):
-        if self._db is None:
-            self._db = SessionLocal()
-        return self._db
+        if getattr(self._local, "db", None) is None:
+            self._local.db = SessionLocal()
+        return self._local.db
 
     def after_return(self, *args, **kwargs):
-        if self._db is not None:
-            self._db.close()
-            self._db = None
+        if getattr(self._local, "db", None) is not None:
+            self._local.db.close()
+            self._local.db = None
 
-@celery_app.task(base=DBTask, bind=True)
-def process_document(self, document_id: str, file_path: str):
-    processor = DocumentProcessor(self.db)
-    return processor.process_document(document_id, file_path)
+# Ingestion stages pass a job dict ({document_id, content_hash, force}) down
+# the chain; a stage returns None to end the run early. Every stage is safe
+# to run again, so transient failures are retried with backoff and a worker
+# lost mid-task gets its message re-delivered. Extraction errors are
+# deterministic and not retried.
+class IngestionTask(DBTask):
+    acks_late = True
+    reject_on_worker_lost = True
+    ignore_result = True
+    autoretry_for = (Exception,)
+    dont_autoretry_for = (ExtractionError,)
+    max_retries = settings.INGESTION_MAX_RETRIES
+    retry_backoff = True
+    retry_backoff_max = settings.INGESTION_RETRY_BACKOFF_MAX
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        job = args[0] if args else None
+        if job is None:
+            return
+        db = SessionLocal()
+        try:
+            IngestionPipeline(db).mark_failed(job["document_id"], exc)
+        finally:
+            db.close()
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # Extraction limits for prefork pool processes
+    init_worker()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    close_worker_loop()
+
+@celery_app.task(base=IngestionTask, bind=True)
+def extract_document(self, job: Optional[dict]):
+    pipeline = IngestionPipeline(self.db)
+    content_hash = run_async(pipeline.begin(job["document_id"], job["content_hash"], job["force"]))
+    if content_hash is None:
+        return None
+    job = {**job, "content_hash": content_hash}
+    if threading.current_thread() is threading.main_thread():
+        extracted = pipeline.extract_inline(job["document_id"], content_hash)
+    else:
+        # The time limit's signal needs the main thread; a thread pool
+        # worker uses the extraction process pool instead
+        extracted = run_async(pipeline.extract(job["document_id"], content_hash))
+    return job if extracted else None
+
+@celery_app.task(base=IngestionTask, bind=True)
+def chunk_document(self, job: Optional[dict]):
+    if job is None:
+        return None
+    pipeline = IngestionPipeline(self.db)
+    return job if run_async(pipeline.chunk(job["document_id"], job["content_hash"])) else None
+
+@celery_app.task(base=IngestionTask, bind=True)
+def embed_document(self, job: Optional[dict]):
+    if job is None:
+        return None
+    pipeline = IngestionPipeline(self.db)
+    return job if run_async(pipeline.embed(job["document_id"], job["content_hash"])) else None
+
+@celery_app.task(base=IngestionTask, bind=True)
+def index_document(self, job: Optional[dict]):
+    if job is None:
+        return None
+    pipeline = IngestionPipeline(self.db)
+    return job if run_async(pipeline.index(job["document_id"], job["content_hash"])) else None
 
 @celery_app.task(base=DBTask, bind=True)
 def train_model(self, training_session_id: str):
     training_service = TrainingService(self.db)
-    return training_service.train(training_session_id)
\ No newline at end of file
+    return run_async(training_service.train(training_session_id))
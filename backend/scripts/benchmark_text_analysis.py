@@ -0,0 +1,69 @@
+"""Throughput of extractive summarization and keyword tagging.
+
+Runs TextAnalyzer over a set of documents on one core, with document
+frequencies counted over the same set, and reports documents per minute.
+
+    python -m scripts.benchmark_text_analysis --documents 1000
+    python -m scripts.benchmark_text_analysis --input docs/*.txt
+
+Summary length and tag count come from the environment (SUMMARY_SENTENCES,
+DOCUMENT_TAGS).
+"""
+from collections import Counter
+import argparse
+import time
+
+import numpy as np
+
+from app.services.text_analysis import TextAnalyzer, document_terms
+
+def synthetic_documents(count: int, vocabulary: int, sentences: int, seed: int = 0) -> list:
+    # Zipf-distributed words, like natural language term frequencies
+    rng = np.random.default_rng(seed)
+    words = [f"term{i}" for i in range(vocabulary)]
+    documents = []
+    for _ in range(count):
+        lengths = rng.integers(6, 25, size=rng.integers(sentences // 2, sentences * 2))
+        ranks = np.minimum(rng.zipf(1.3, size=int(lengths.sum())), vocabulary) - 1
+        tokens = [words[rank] for rank in ranks]
+        ends = np.cumsum(lengths)
+        documents.append(" ".join(
+            " ".join(tokens[end - length:end]).capitalize() + "."
+            for end, length in zip(ends, lengths)
+        ))
+    return documents
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", nargs="*", help="text files, one document each")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--sentences", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.input:
+        documents = []
+        for path in args.input:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                documents.append(f.read())
+    else:
+        documents = synthetic_documents(args.documents, args.vocabulary, args.sentences)
+
+    frequencies = Counter()
+    for document in documents:
+        frequencies.update(document_terms(document))
+
+    analyzer = TextAnalyzer()
+    started = time.perf_counter()
+    for document in documents:
+        # Term extraction is part of indexing a document, so it is timed too
+        document_terms(document)
+        analyzer.analyze(document, frequencies, len(documents))
+    elapsed = time.perf_counter() - started
+
+    characters = sum(len(document) for document in documents)
+    print(f"{len(documents)} documents, {characters / len(documents):.0f} characters on average")
+    print(f"{60 * len(documents) / elapsed:.0f} documents/minute, {1000 * elapsed / len(documents):.2f} ms/document")
+
+if __name__ == "__main__":
+    main()
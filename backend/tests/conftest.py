@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import ARRAY, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.chat import ChatMessage, Context
+from app.models.document import CorpusTerm, Document, DocumentBatch, Folder
+
+@compiles(ARRAY, "sqlite")
+def _compile_array(type_, compiler, **kw):
+    # Postgres arrays are stored as JSON in the SQLite test database
+    return "JSON"
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _functions(connection, record):
+        connection.create_function("greatest", 2, max)
+
+    Base.metadata.create_all(engine, tables=[
+        Folder.__table__,
+        DocumentBatch.__table__,
+        Document.__table__,
+        CorpusTerm.__table__,
+        Context.__table__,
+        ChatMessage.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    path = tmp_path / "uploads"
+    path.mkdir()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(path))
+    return path
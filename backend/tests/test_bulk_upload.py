@@ -0,0 +1,62 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from app.services.bulk_upload import BulkUploadService
+
+CENTRAL_DIRECTORY = b"PK\x01\x02"
+
+def _zip(files):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return bytearray(data.getvalue())
+
+def _patch_entry(data, entry, offset, value):
+    # Patches a field of the entry's central directory record
+    position = -1
+    for _ in range(entry + 1):
+        position = data.find(CENTRAL_DIRECTORY, position + 1)
+    data[position + offset] = value
+
+def _entries(service):
+    contents = {}
+    for entry in service.entries:
+        with open(entry.upload.path, "rb") as f:
+            contents[entry.name] = f.read()
+    return contents
+
+@pytest.fixture
+def service(db, upload_dir):
+    service = BulkUploadService(db)
+    yield service
+    service.discard()
+
+def test_entries_are_named_by_path(service):
+    data = _zip({"a/README.md": "one", "b/README.md": "two", "__MACOSX/._x": "", ".hidden": "x"})
+
+    service._add_archive(io.BytesIO(data), "docs.zip", "application/zip")
+
+    assert _entries(service) == {"a/README.md": b"one", "b/README.md": b"two"}
+    assert service.rejected == []
+
+def test_unreadable_zip_entries_are_rejected(service):
+    data = _zip({"encrypted.txt": "secret", "deflate64.txt": "packed", "plain.txt": "kept"})
+    _patch_entry(data, 0, 8, 0x01)  # general purpose flag: encrypted
+    _patch_entry(data, 1, 10, 9)  # compression method: deflate64
+
+    service._add_archive(io.BytesIO(data), "docs.zip", "application/zip")
+
+    assert _entries(service) == {"plain.txt": b"kept"}
+    assert [rejected.name for rejected in service.rejected] == ["encrypted.txt", "deflate64.txt"]
+
+def test_compressed_file_is_stored_decompressed(service):
+    data = gzip.compress(b"notes")
+
+    service._add_archive(io.BytesIO(data), "notes.txt.gz", "application/gzip")
+
+    assert _entries(service) == {"notes.txt": b"notes"}
+    assert service.entries[0].content_type == "text/plain"
@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.chunker import TextChunker
+
+def _chunk(text, blocks=1, chunk_size=200, overlap=40):
+    chunker = TextChunker(chunk_size=chunk_size, overlap=overlap)
+    step = -(-len(text) // blocks)
+    chunks = []
+    for start in range(0, len(text), step):
+        chunks.extend(chunker.feed(text[start:start + step]))
+    chunks.extend(chunker.finish())
+    return chunks
+
+TEXT = "".join(
+    f"Paragraph {p} sentence {s} has a few words in it. " + ("\n\n" if s == 4 else "")
+    for p in range(12)
+    for s in range(5)
+)
+
+def test_offsets_point_into_the_text():
+    chunks = _chunk(TEXT)
+
+    assert chunks
+    for chunk in chunks:
+        assert TEXT[chunk.start:chunk.end] == chunk.text
+        assert len(chunk.text) <= 200
+
+def test_chunks_cover_the_text_with_overlap():
+    chunks = _chunk(TEXT)
+
+    assert chunks[0].start == 0
+    assert chunks[-1].end == len(TEXT)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start <= previous.end
+        assert previous.end - chunk.start <= 40
+
+def test_feeding_in_blocks_does_not_change_chunks():
+    expected = [(c.index, c.start, c.end) for c in _chunk(TEXT)]
+
+    for blocks in (3, 17, len(TEXT)):
+        assert [(c.index, c.start, c.end) for c in _chunk(TEXT, blocks)] == expected
+
+def test_indexes_are_contiguous_without_whitespace_chunks():
+    # Runs of blank lines make whitespace-only units, which are dropped
+    text = "First paragraph here.\n\n" + " \n" * 300 + "\n\nLast paragraph here."
+    chunks = _chunk(text, blocks=7, chunk_size=50, overlap=10)
+
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.text.strip() for chunk in chunks)
+
+def test_text_without_boundaries_is_cut():
+    text = "x" * 1000
+    chunks = _chunk(text, blocks=9)
+
+    assert "".join(c.text for c in chunks) == text
+    assert all(len(c.text) <= 200 for c in chunks)
+
+def test_long_unit_is_cut_the_same_in_blocks():
+    text = " ".join(f"word{i}" for i in range(400))
+    expected = [(c.start, c.end) for c in _chunk(text, overlap=0)]
+
+    assert [(c.start, c.end) for c in _chunk(text, blocks=13, overlap=0)] == expected
+
+def test_edit_only_changes_nearby_chunks():
+    edited = TEXT.replace("Paragraph 6 sentence 2", "Paragraph six, sentence two")
+    before = {c.content_hash for c in _chunk(TEXT)}
+    after = [c.content_hash for c in _chunk(edited)]
+
+    changed = [h for h in after if h not in before]
+    assert 0 < len(changed) <= 2
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size=100, overlap=100)
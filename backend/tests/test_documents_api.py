@@ -0,0 +1,46 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import documents
+from app.models.document import Document
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    jobs = []
+
+    async def schedule_ingestion(background_tasks, document_id, content_hash, force=False):
+        jobs.append(document_id)
+
+    monkeypatch.setattr(documents, "schedule_ingestion", schedule_ingestion)
+    return jobs
+
+def _add(db, status):
+    db.add(Document(id="doc", name="a.txt", type="text/plain", size=1, status=status))
+    db.commit()
+
+@pytest.mark.asyncio
+async def test_reindex_schedules_ingestion(db, scheduled):
+    _add(db, "ready")
+
+    document = await documents.reindex_document("doc", db=db, current_user="user")
+
+    assert document.status == "processing"
+    assert scheduled == ["doc"]
+
+@pytest.mark.asyncio
+async def test_reindex_leaves_deleting_document_alone(db, scheduled):
+    _add(db, "deleting")
+
+    with pytest.raises(HTTPException) as e:
+        await documents.reindex_document("doc", db=db, current_user="user")
+
+    assert e.value.status_code == 409
+    assert db.query(Document).one().status == "deleting"
+    assert scheduled == []
+
+@pytest.mark.asyncio
+async def test_reindex_missing_document(db, scheduled):
+    with pytest.raises(HTTPException) as e:
+        await documents.reindex_document("doc", db=db, current_user="user")
+
+    assert e.value.status_code == 404
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        self.redis.values.update(self.commands)
+        return [True] * len(self.commands)
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.round_trips = 0
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+@pytest.mark.asyncio
+async def test_many_texts_take_one_round_trip_each_way():
+    redis = FakeRedis()
+    writer = EmbeddingCache(redis=redis, max_entries=10, ttl=60)
+
+    await writer.set_many("m", {"a": [1.0, 2.0], "b": [3.0, 4.0]})
+    assert redis.round_trips == 1
+
+    # A fresh process has nothing in memory
+    reader = EmbeddingCache(redis=redis, max_entries=10, ttl=60)
+    assert await reader.get_many("m", ["a", "c", "b"]) == [[1.0, 2.0], None, [3.0, 4.0]]
+    assert redis.round_trips == 2
+    assert reader.stats()["redis_hits"] == 2
+    assert reader.stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_memory_hits_skip_redis():
+    redis = FakeRedis()
+    cache = EmbeddingCache(redis=redis, max_entries=10, ttl=60)
+    await cache.set("m", "a", [1.0])
+
+    assert await cache.get_many("m", ["a"]) == [[1.0]]
+    assert redis.round_trips == 1
+    assert cache.stats()["memory_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_keys_are_per_model():
+    cache = EmbeddingCache(max_entries=10, ttl=60)
+    await cache.set("m", "a", [1.0])
+
+    assert await cache.get("other", "a") is None
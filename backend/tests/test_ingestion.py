@@ -0,0 +1,50 @@
+import hashlib
+import os
+
+import pytest
+
+from app.models.document import Document
+from app.services.blob_store import BlobStore
+from app.services.ingestion import IngestionPipeline
+from app.services.text_extraction import close_extraction_engine
+
+TEXT = "First paragraph.\n\nSecond paragraph.\n"
+
+@pytest.fixture
+def document(db, upload_dir):
+    upload = upload_dir / "upload.part"
+    upload.write_text(TEXT)
+    content_hash = hashlib.sha256(TEXT.encode()).hexdigest()
+    BlobStore().put(str(upload), content_hash)
+    document = Document(
+        id="doc",
+        name="notes.txt",
+        type="text/plain",
+        size=len(TEXT),
+        status="processing",
+        content_hash=content_hash,
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+@pytest.mark.asyncio
+async def test_extract_publishes_text_in_the_work_dir(db, document):
+    pipeline = IngestionPipeline(db, vector_store=object())
+    work_dir = pipeline.work_dir(document.id, document.content_hash)
+    os.makedirs(work_dir)
+    try:
+        assert await pipeline.extract(document.id, document.content_hash)
+    finally:
+        close_extraction_engine()
+    with open(pipeline.text_path(document.id, document.content_hash)) as f:
+        assert f.read() == TEXT
+    assert os.listdir(work_dir) == ["text.txt"]
+    assert document.status == "extracting"
+
+@pytest.mark.asyncio
+async def test_extract_skips_a_superseded_run(db, document):
+    pipeline = IngestionPipeline(db, vector_store=object())
+    os.makedirs(pipeline.work_dir(document.id, "0" * 64))
+    assert not await pipeline.extract(document.id, "0" * 64)
+    assert not os.path.exists(pipeline.work_dir(document.id, "0" * 64))
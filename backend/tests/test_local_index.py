@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.services.vector_backends.local import LocalVectorIndex
+
+def _vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).tolist()
+
+def _add(index, ids, document_id="doc", seed=0):
+    index.add(
+        ids,
+        _vectors(len(ids), seed=seed),
+        [{"document_id": document_id} for _ in ids],
+        ids,
+    )
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "index"), min_train_size=40, quantization="none")
+    index.open()
+    yield index
+    index.close()
+
+def test_count_follows_adds_and_deletes(index, tmp_path):
+    _add(index, [f"a{i}" for i in range(10)], "a")
+    _add(index, [f"b{i}" for i in range(5)], "b")
+    assert index.count() == 15
+
+    # Re-adding an id replaces it
+    _add(index, ["a0", "a1"], "a", seed=1)
+    assert index.count() == 15
+
+    index.delete(["b0", "missing"])
+    index.delete_documents(["a"])
+    assert index.count() == 4
+
+    index.close()
+    reopened = LocalVectorIndex(str(tmp_path / "index"), min_train_size=40, quantization="none")
+    reopened.open()
+    assert reopened.count() == 4
+    reopened.close()
+
+def test_trains_once_enough_rows_are_live(index):
+    _add(index, [f"a{i}" for i in range(39)])
+    index.delete(["a0"])
+    _add(index, ["b0"], seed=1)
+    assert index.centroids is None
+
+    _add(index, ["b1"], seed=2)
+    assert index.centroids is not None
+    assert index.trained_size == 40
+
+def test_search_finds_the_nearest_vector(index):
+    ids = [f"a{i}" for i in range(100)]
+    _add(index, ids)
+
+    query = _vectors(100)[7]
+    row, score = index.search(query, 1, document_ids=["doc"])[0]
+
+    assert index.get_rows([row])[row]["id"] == "a7"
+    assert score == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.vector_backends.local import LocalVectorIndex, _normalize
+from app.services.vector_backends.quantization import (
+    ProductQuantizer,
+    Quantizer,
+    ScalarQuantizer,
+    create_quantizer,
+)
+
+DIM = 32
+
+@pytest.fixture
+def vectors():
+    return _normalize(np.random.default_rng(0).normal(size=(2000, DIM)).astype(np.float32))
+
+def _recall(quantizer, vectors, queries=20, shortlist=20):
+    # Share of queries whose exact nearest neighbour is in the shortlist
+    codes = quantizer.encode(vectors)
+    found = 0
+    for query in vectors[:queries]:
+        exact = int(np.argmax(vectors @ query))
+        approximate = np.argsort(-quantizer.scores(query, codes))[:shortlist]
+        found += exact in approximate
+    return found / queries
+
+def test_int8_scores_are_close_to_exact(vectors):
+    quantizer = ScalarQuantizer(DIM)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.int8 and codes.shape == (2000, DIM)
+    error = quantizer.scores(vectors[0], codes) - vectors @ vectors[0]
+    assert np.abs(error).max() < 0.02
+
+def test_product_quantizer_codes_are_one_byte_per_subvector(vectors):
+    quantizer = ProductQuantizer(DIM, 8)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.uint8 and codes.shape == (2000, 8)
+    assert _recall(quantizer, vectors) >= 0.9
+
+def test_product_quantizer_uses_a_divisor_of_dim():
+    assert ProductQuantizer(DIM, 12).subvectors == 8
+    assert ProductQuantizer(DIM, 100).subvectors == DIM
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_saved_quantizer_scores_the_same(kind, vectors, tmp_path):
+    quantizer = create_quantizer(DIM, kind)
+    quantizer.train(vectors)
+    quantizer.save(str(tmp_path / "quantizer.npz"))
+
+    loaded = Quantizer.load(str(tmp_path / "quantizer.npz"))
+
+    assert loaded.kind == kind
+    assert loaded.code_size == quantizer.code_size
+    codes = quantizer.encode(vectors[:10])
+    np.testing.assert_array_equal(loaded.encode(vectors[:10]), codes)
+    np.testing.assert_allclose(loaded.scores(vectors[0], codes), quantizer.scores(vectors[0], codes))
+
+def test_unknown_quantization_is_rejected():
+    assert create_quantizer(DIM, "none") is None
+    with pytest.raises(ValueError):
+        create_quantizer(DIM, "int4")
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_index_rescores_quantized_shortlist(kind, vectors, tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "index"), nprobe=64, min_train_size=500, quantization=kind)
+    index.open()
+    try:
+        ids = [str(i) for i in range(len(vectors))]
+        index.add(ids, vectors.tolist(), [{"document_id": "doc"}] * len(ids), ids)
+        assert index.quantizer is not None
+
+        row, score = index.search(vectors[42].tolist(), 1)[0]
+        # Scores come from the float32 vectors, not the codes
+        assert index.get_rows([row])[row]["id"] == "42"
+        assert score == pytest.approx(1.0, abs=1e-5)
+    finally:
+        index.close()
@@ -0,0 +1,21 @@
+from app.services.reranker import maximal_marginal_relevance
+
+def test_most_relevant_candidate_comes_first():
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    assert maximal_marginal_relevance(embeddings, [0.2, 0.9, 0.5], k=1) == [1]
+
+def test_near_duplicates_are_skipped():
+    embeddings = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+    relevance = [1.0, 0.95, 0.6]
+    assert maximal_marginal_relevance(embeddings, relevance, k=2, lambda_mult=0.5) == [0, 2]
+
+def test_relevance_is_taken_as_given():
+    # The fused ranking decides, not the embeddings' similarity to anything
+    embeddings = [[1.0, 0.0], [0.0, 1.0]]
+    assert maximal_marginal_relevance(embeddings, [0.1, 1.0], k=2) == [1, 0]
+
+def test_k_larger_than_candidates():
+    assert maximal_marginal_relevance([[1.0, 0.0]], [1.0], k=5) == [0]
+
+def test_no_candidates():
+    assert maximal_marginal_relevance([], [], k=3) == []
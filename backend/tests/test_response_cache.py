@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+from app.schemas.chat import ChatResponse, Message
+from app.services import response_cache
+from app.services.response_cache import (
+    INVALIDATION_CHANNEL,
+    SemanticResponseCache,
+    get_response_cache,
+    listen_for_invalidations,
+    publish_document_indexed,
+    publish_invalidation,
+)
+from app.services.retrieval_scope import RetrievalScopeResolver
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.setdefault(channel, []).append(self.queue)
+        self.redis.subscribed.set()
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        pass
+
+class FakeRedis:
+    def __init__(self):
+        self.subscribers = {}
+        self.subscribed = asyncio.Event()
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "data": data})
+
+def _response(*document_ids):
+    return ChatResponse(content="answer", context_documents=list(document_ids))
+
+def test_lookup_is_per_scope():
+    cache = SemanticResponseCache(threshold=0.9, ttl=60, max_entries=10)
+    cache.store("a", [1.0, 0.0], _response("d1"))
+
+    assert cache.lookup("a", [2.0, 0.1]).content == "answer"
+    assert cache.lookup("a", [0.0, 1.0]) is None
+    assert cache.lookup("b", [1.0, 0.0]) is None
+
+def test_invalidate_documents_drops_citing_answers():
+    cache = SemanticResponseCache(threshold=0.9, ttl=60, max_entries=10)
+    cache.store("a", [1.0, 0.0], _response("d1"))
+    cache.store("a", [0.0, 1.0], _response("d2"))
+
+    cache.invalidate_documents(["d1"])
+
+    assert cache.lookup("a", [1.0, 0.0]) is None
+    assert cache.lookup("a", [0.0, 1.0]) is not None
+
+def test_scope_key_separates_conversations():
+    first = Message(content="q", context_id="c1")
+    second = Message(content="q", context_id="c2")
+    scoped = Message(content="q", context_id="c1", tags=["x"])
+
+    keys = {RetrievalScopeResolver.scope_key(m) for m in (first, second, scoped)}
+
+    assert len(keys) == 3
+    assert RetrievalScopeResolver.scope_key(Message(content="q")) == "none"
+
+@pytest.mark.asyncio
+async def test_invalidations_reach_listener(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(response_cache, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(response_cache, "_response_cache", SemanticResponseCache(0.9, 60, 10))
+    cache = get_response_cache()
+
+    listener = asyncio.create_task(listen_for_invalidations())
+    await redis.subscribed.wait()
+    try:
+        cache.store("a", [1.0, 0.0], _response("d1"))
+        cache.store("b", [0.0, 1.0], _response("d2"))
+
+        await publish_invalidation(["d1"])
+        await asyncio.sleep(0)
+        assert cache.stats()["entries"] == 1
+
+        # A newly indexed document can answer any scope
+        await publish_document_indexed("d3")
+        await asyncio.sleep(0)
+        assert cache.stats()["entries"] == 0
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+@pytest.mark.asyncio
+async def test_publish_without_documents_is_skipped(monkeypatch):
+    redis = FakeRedis()
+    queue = asyncio.Queue()
+    redis.subscribers[INVALIDATION_CHANNEL] = [queue]
+    monkeypatch.setattr(response_cache, "get_redis_client", lambda: redis)
+
+    await publish_invalidation([])
+    await publish_invalidation(["d1"])
+
+    assert json.loads((await queue.get())["data"]) == {"documents": ["d1"]}
+    assert queue.empty()
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.scheduler import LLMOverloadedError, LLMScheduler, Priority
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MODEL_CONCURRENCY", {"small": 1, "large": 3})
+    monkeypatch.setattr(settings, "LLM_INTERACTIVE_RESERVED", 1)
+    return LLMScheduler()
+
+async def _hold(scheduler, model, priority, started, release, name=None):
+    async with scheduler.slot(model, priority):
+        started.append(name or priority)
+        await release.wait()
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_interactive_goes_before_queued_bulk(scheduler):
+    started = []
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "small", Priority.BULK, started, release, "holder"))
+    await _settle()
+
+    waiters = [
+        asyncio.create_task(_hold(scheduler, "small", priority, started, release, name))
+        for priority, name in [
+            (Priority.BULK, "bulk"),
+            (Priority.BACKGROUND, "background"),
+            (Priority.INTERACTIVE, "interactive"),
+        ]
+    ]
+    await _settle()
+    assert started == ["holder"]
+
+    release.set()
+    await asyncio.gather(holder, *waiters)
+    assert started == ["holder", "interactive", "background", "bulk"]
+
+@pytest.mark.asyncio
+async def test_reserved_slots_are_left_to_interactive(scheduler):
+    started = []
+    release = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_hold(scheduler, "large", Priority.BULK, started, release, i))
+        for i in range(3)
+    ]
+    await _settle()
+    assert len(started) == 2
+
+    tasks.append(asyncio.create_task(_hold(scheduler, "large", Priority.INTERACTIVE, started, release, "chat")))
+    await _settle()
+    assert started[-1] == "chat"
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.stats()["models"]["large"]["running"] == 0
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected(scheduler):
+    scheduler.queue_sizes[Priority.BULK] = 1
+    started = []
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "small", Priority.BULK, started, release))
+    await _settle()
+    waiter = asyncio.create_task(_hold(scheduler, "small", Priority.BULK, started, release))
+    await _settle()
+
+    with pytest.raises(LLMOverloadedError) as e:
+        async with scheduler.slot("small", Priority.BULK):
+            pass
+    assert e.value.priority == Priority.BULK
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert scheduler.stats()["priorities"]["bulk"]["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_wait_times_out(scheduler):
+    scheduler.queue_timeouts[Priority.INTERACTIVE] = 0.01
+    started = []
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "small", Priority.INTERACTIVE, started, release))
+    await _settle()
+
+    with pytest.raises(LLMOverloadedError):
+        async with scheduler.slot("small", Priority.INTERACTIVE):
+            pass
+
+    release.set()
+    await holder
+    stats = scheduler.stats()
+    assert stats["models"]["small"]["queued"]["interactive"] == 0
+    assert stats["priorities"]["interactive"]["granted"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_keep_a_slot(scheduler):
+    started = []
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "small", Priority.INTERACTIVE, started, release, "holder"))
+    await _settle()
+    cancelled = asyncio.create_task(_hold(scheduler, "small", Priority.INTERACTIVE, started, release, "cancelled"))
+    await _settle()
+
+    cancelled.cancel()
+    release.set()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    async with scheduler.slot("small", Priority.INTERACTIVE):
+        pass
+    assert started == ["holder"]
+    assert scheduler.stats()["models"]["small"]["running"] == 0
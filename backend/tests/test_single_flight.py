@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+class Upstream:
+    def __init__(self, items, fail=False):
+        self.items = items
+        self.fail = fail
+        self.starts = 0
+        self.closed = False
+        self.step = asyncio.Event()
+
+    def start(self):
+        self.starts += 1
+        return self._run()
+
+    async def _run(self):
+        try:
+            for item in self.items:
+                await self.step.wait()
+                self.step.clear()
+                yield item
+            if self.fail:
+                raise RuntimeError("upstream failed")
+        finally:
+            self.closed = True
+
+async def _collect(flights, key, upstream, into):
+    async for item in flights.subscribe(key, upstream.start):
+        into.append(item)
+
+async def _advance(upstream):
+    upstream.step.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_upstream():
+    flights = SingleFlight()
+    upstream = Upstream(["a", "b", "c"])
+    first, late = [], []
+
+    first_task = asyncio.create_task(_collect(flights, "k", upstream, first))
+    await _advance(upstream)
+    # A late subscriber is replayed what was produced so far
+    late_task = asyncio.create_task(_collect(flights, "k", upstream, late))
+    for _ in range(2):
+        await _advance(upstream)
+    await asyncio.gather(first_task, late_task)
+
+    assert upstream.starts == 1
+    assert first == late == ["a", "b", "c"]
+    assert flights.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_different_keys_do_not_share():
+    flights = SingleFlight()
+    first, second = Upstream(["a"]), Upstream(["b"])
+    results = [], []
+
+    tasks = [
+        asyncio.create_task(_collect(flights, "one", first, results[0])),
+        asyncio.create_task(_collect(flights, "two", second, results[1])),
+    ]
+    await _advance(first)
+    await _advance(second)
+    await asyncio.gather(*tasks)
+
+    assert results == (["a"], ["b"])
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_subscriber():
+    flights = SingleFlight()
+    upstream = Upstream(["a"], fail=True)
+
+    tasks = [
+        asyncio.create_task(_collect(flights, "k", upstream, [])),
+        asyncio.create_task(_collect(flights, "k", upstream, [])),
+    ]
+    await _advance(upstream)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert [str(result) for result in results] == ["upstream failed"] * 2
+    assert flights.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_upstream_is_cancelled_with_its_last_subscriber():
+    flights = SingleFlight()
+    upstream = Upstream(["a", "b", "c"])
+    tasks = [
+        asyncio.create_task(_collect(flights, "k", upstream, [])),
+        asyncio.create_task(_collect(flights, "k", upstream, [])),
+    ]
+    await _advance(upstream)
+
+    tasks[0].cancel()
+    await _advance(upstream)
+    assert not upstream.closed
+
+    tasks[1].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert upstream.closed
+    assert flights.in_flight() == 0
+
+    # The next caller starts a new upstream
+    again = Upstream(["c"])
+    items = []
+    task = asyncio.create_task(_collect(flights, "k", again, items))
+    await _advance(again)
+    await task
+    assert items == ["c"]
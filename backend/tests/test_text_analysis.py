@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.models.document import CorpusTerm
+from app.services.corpus_statistics import CorpusStatistics
+from app.services.text_analysis import (
+    TextAnalyzer,
+    document_terms,
+    split_sentences,
+    textrank,
+    tokenize,
+)
+
+TEXT = """Vector databases.
+
+Vector databases store embeddings for similarity search over documents.
+Approximate nearest neighbour search keeps similarity search fast on large collections.
+The weather was pleasant on the day the office moved buildings.
+Product quantization compresses embeddings so similarity search needs less memory.
+Embeddings of related documents end up close together in vector databases.
+"""
+
+def test_tokenize_drops_stopwords_and_short_tokens():
+    assert tokenize("The DB's query-planner isn't at 2x speed, it's OK") == ["db's", "query-planner", "speed"]
+
+def test_split_sentences_uses_chunk_boundaries():
+    assert split_sentences("Heading\n\nFirst one. Second  one!\nThird") == [
+        "Heading", "First one.", "Second one!", "Third",
+    ]
+
+def test_textrank_favours_the_central_node():
+    similarity = np.array([
+        [0, 1, 1, 1],
+        [1, 0, 0, 0],
+        [1, 0, 0, 0],
+        [1, 0, 0, 0],
+    ], dtype=np.float32)
+
+    scores = textrank(similarity)
+
+    assert int(np.argmax(scores)) == 0
+    assert scores.sum() == pytest.approx(1.0, abs=1e-4)
+
+def test_summary_keeps_central_sentences_in_order():
+    analysis = TextAnalyzer(summary_sentences=2, tags=3).analyze(TEXT, {}, 0)
+
+    assert "weather" not in analysis.summary
+    sentences = split_sentences(analysis.summary)
+    assert len(sentences) == 2
+    assert TEXT.index(sentences[0]) < TEXT.index(sentences[1])
+
+def test_tags_prefer_repeated_phrases():
+    analysis = TextAnalyzer(summary_sentences=2, tags=3).analyze(TEXT, {}, 0)
+
+    assert analysis.tags[0] in ("similarity search", "vector databases")
+    # Words of a chosen phrase are not tagged again on their own
+    assert "similarity" not in analysis.tags and "vector" not in analysis.tags
+
+def test_common_corpus_terms_are_weighted_down():
+    frequencies = {"similarity": 100, "search": 100, "vector": 100, "databases": 100}
+    analysis = TextAnalyzer(tags=1).analyze(TEXT, frequencies, 100)
+
+    assert analysis.tags == ["embeddings"]
+
+def test_text_without_terms():
+    analysis = TextAnalyzer().analyze("It is. Or not!", {}, 0)
+
+    assert analysis.summary == "It is. Or not!"
+    assert analysis.tags == []
+
+def test_summary_is_truncated_on_a_word():
+    analysis = TextAnalyzer(summary_sentences=1, summary_max_chars=30).analyze(TEXT, {}, 0)
+
+    assert analysis.summary.endswith("...")
+    assert len(analysis.summary) <= 33
+
+def _counts(db):
+    return dict(db.query(CorpusTerm.term, CorpusTerm.document_count))
+
+def test_corpus_statistics_follow_documents(db):
+    statistics = CorpusStatistics(db)
+    first = document_terms("Vector search over embeddings.")
+    second = document_terms("Keyword search over text.")
+
+    statistics.update_document(None, first)
+    statistics.update_document(None, second)
+    frequencies, documents = statistics.frequencies(["search", "vector", "missing"])
+    assert documents == 2
+    assert frequencies == {"search": 2, "vector": 1}
+
+    # Re-indexing only applies the difference
+    statistics.update_document(first, document_terms("Vector search over images."))
+    statistics.remove_documents([second])
+    counts = _counts(db)
+    assert counts["embeddings"] == 0 and counts["images"] == 1
+    assert counts["search"] == 1 and counts[""] == 1
+
+def test_removing_uncounted_documents_does_not_go_negative(db):
+    CorpusStatistics(db).remove_documents([{"legacy"}])
+
+    assert _counts(db) == {"legacy": 0, "": 0}
@@ -0,0 +1,60 @@
+import pytest
+
+from app.core.config import settings
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_backends.local import LocalVectorBackend
+from app.services.vector_store import VectorStoreService
+
+QUERY = [1.0, 0.0, 0.0]
+
+class FakeLLM:
+    embedding_model = "test"
+
+    async def generate_embedding(self, text):
+        return QUERY
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_ENABLED", True)
+    monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", True)
+    monkeypatch.setattr(settings, "RERANK_MIN_SCORE", 0.5)
+    return VectorStoreService(
+        FakeLLM(),
+        LocalVectorBackend(str(tmp_path / "vectors")),
+        LexicalIndex(str(tmp_path / "lexical.sqlite")),
+    )
+
+async def add(store, document_id, text, embedding):
+    await store.add_documents(
+        [f"{document_id}:0"],
+        [text],
+        [{"document_id": document_id, "chunk_index": 0}],
+        [embedding],
+    )
+
+@pytest.mark.asyncio
+async def test_lexical_hits_survive_the_cosine_cutoff(store):
+    await add(store, "manual", "How to reset the device", [1.0, 0.1, 0.0])
+    await add(store, "errors", "Error XJ9001 means the fan failed", [0.0, 0.0, 1.0])
+    results = await store.search_similar("XJ9001", limit=5)
+    assert "errors" in [result["id"] for result in results]
+    await store.cleanup()
+
+@pytest.mark.asyncio
+async def test_vector_hits_below_the_cutoff_are_dropped(store):
+    await add(store, "close", "alpha", [1.0, 0.0, 0.0])
+    await add(store, "far", "beta", [0.0, 1.0, 0.0])
+    results = await store.search_similar("nothing matches lexically", limit=5)
+    assert [result["id"] for result in results] == ["close"]
+    await store.cleanup()
+
+@pytest.mark.asyncio
+async def test_fuse_ranks_hits_found_by_both_searches_first(store):
+    vector_hits = [
+        {"id": "a", "content": "", "metadata": {}, "score": 0.9, "embedding": QUERY},
+        {"id": "b", "content": "", "metadata": {}, "score": 0.8, "embedding": QUERY},
+    ]
+    lexical_hits = [{"id": "b", "document_id": "b", "content": "", "score": 3.0}]
+    fused = await store._fuse(vector_hits, lexical_hits)
+    assert [hit["id"] for hit in fused] == ["b", "a"]
+    assert fused[0]["score"] == pytest.approx(1 / (settings.RRF_K + 2) + 1 / (settings.RRF_K + 1))